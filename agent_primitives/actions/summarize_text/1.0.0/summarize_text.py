@@ -1,5 +1,6 @@
 import google.generativeai as genai
 from prp_compiler.config import configure_gemini, get_model_name
+from prp_compiler.ratelimit import estimate_tokens, get_rate_limiter
 
 def run(text: str) -> str:
     """Summarize the given text using the configured summarizer Gemini model."""
@@ -12,7 +13,10 @@ def run(text: str) -> str:
     try:
         model = genai.GenerativeModel(model_name)
         prompt = f"Summarize the following text in a concise paragraph:\n\n{text}"
-        response = model.generate_content(prompt)
+        limiter = get_rate_limiter("summarizer")
+        with limiter.limit(estimate_tokens(prompt)) as slot:
+            response = model.generate_content(prompt)
+            slot.settle(response)
         return response.text.strip()
     except Exception as e:
         return f"[ERROR] Gemini summarization failed for model {model_name}: {e}"
@@ -1,5 +1,23 @@
+import asyncio
+import inspect
 import re
-from typing import Any
+from typing import Any, Callable, Optional, TypeVar
+
+from ..ratelimit import estimate_tokens, get_rate_limiter
+from ..resilience import (
+    RetryPolicy,
+    acall_with_retry,
+    call_with_retry,
+    get_circuit_breaker,
+)
+from .response_cache import NAMESPACE as RESPONSE_NAMESPACE
+from .response_cache import (
+    CachedResponse,
+    response_cache_key,
+    serialize_response,
+)
+
+T = TypeVar("T")
 
 try:
     import google.generativeai as genai
@@ -31,13 +49,150 @@ except Exception:  # pragma: no cover - allow tests without package
 class BaseAgent:
     """Base class for all agents, handling API configuration and common utilities."""
 
-    def __init__(self, model_name: str = "gemini-1.5-flash"):
+    def __init__(
+        self, model_name: str = "gemini-1.5-flash", role: Optional[str] = None
+    ):
         # Configuration is now handled in main.py
         self.model = genai.GenerativeModel(model_name)
         self.debug = True  # Enable debug logging by default
+        # Agents of the same role share one process-wide rate limiter and
+        # circuit breaker.
+        self.rate_limiter = get_rate_limiter(role or "default")
+        self.circuit_breaker = get_circuit_breaker(role or "default")
+        self.retry_policy = RetryPolicy()
+        self.model_name = model_name
+        # A ResultCache here memoizes non-streamed responses (see
+        # ``llm_cache_enabled``); ``None`` always asks the model.
+        self.response_cache: Optional[Any] = None
 
     def generate_content(self, prompt: str, **kwargs):
-        """Wrapper around model.generate_content with debug logging."""
+        """Wrapper around model.generate_content with rate limiting, retries and
+        debug logging.
+
+        Transient failures are retried with jittered exponential backoff and
+        each attempt carries a ``request_options`` timeout. For streamed
+        responses only opening the stream is retried.
+        """
+        cached = self._cached_response(prompt, kwargs)
+        if cached is not None:
+            return cached
+        self._with_deadline(kwargs)
+        self._log_request(prompt, kwargs)
+        try:
+            response = call_with_retry(
+                lambda: self._call_model(prompt, **kwargs),
+                self.retry_policy,
+                self.circuit_breaker,
+                on_retry=self._log_retry,
+            )
+        except Exception as e:
+            self._log_error(e)
+            raise
+        # A streamed response has no content until it is iterated.
+        if not kwargs.get("stream"):
+            self._log_response(response)
+            self._remember_response(prompt, kwargs, response)
+        return response
+
+    async def agenerate_content(self, prompt: str, **kwargs):
+        """Async counterpart of :meth:`generate_content`.
+
+        Uses the SDK's native ``generate_content_async`` when the model offers
+        one and otherwise runs the blocking call in a worker thread, so the
+        event loop is never held up by a model round-trip. Each attempt is
+        also bounded by :func:`asyncio.wait_for`.
+        """
+        cached = self._cached_response(prompt, kwargs)
+        if cached is not None:
+            return cached
+        self._with_deadline(kwargs)
+        self._log_request(prompt, kwargs)
+        try:
+            response = await acall_with_retry(
+                lambda: self._alimited_call(prompt, **kwargs),
+                self.retry_policy,
+                self.circuit_breaker,
+                on_retry=self._log_retry,
+            )
+        except Exception as e:
+            self._log_error(e)
+            raise
+        self._log_response(response)
+        self._remember_response(prompt, kwargs, response)
+        return response
+
+    def _response_key(self, prompt: str, kwargs: dict[str, Any]) -> Optional[str]:
+        if self.response_cache is None or kwargs.get("stream"):
+            return None
+        return response_cache_key(self.model_name, prompt, kwargs)
+
+    def _cached_response(
+        self, prompt: str, kwargs: dict[str, Any]
+    ) -> Optional[CachedResponse]:
+        key = self._response_key(prompt, kwargs)
+        if key is None or self.response_cache is None:
+            return None
+        payload = self.response_cache.get(key, namespace=RESPONSE_NAMESPACE)
+        if payload is None:
+            return None
+        self._log_debug("Serving model response from cache", {"key": key})
+        return CachedResponse(payload)
+
+    def _remember_response(
+        self, prompt: str, kwargs: dict[str, Any], response: Any
+    ) -> None:
+        key = self._response_key(prompt, kwargs)
+        if key is None or isinstance(response, CachedResponse):
+            return
+        payload = serialize_response(response)
+        if payload is not None and self.response_cache is not None:
+            self.response_cache.set(key, payload, namespace=RESPONSE_NAMESPACE)
+
+    def discard_cached_response(self, prompt: str, **kwargs) -> None:
+        """Forgets the memoized response to ``prompt`` so the next identical
+        request reaches the model again."""
+        key = self._response_key(prompt, kwargs)
+        if key is not None and self.response_cache is not None:
+            self.response_cache.delete(key)
+
+    def _parse_response(
+        self, parse: Callable[[Any], T], response: Any, prompt: str, **kwargs
+    ) -> T:
+        """Runs ``parse(response)``; a response the caller rejects is dropped
+        from the response cache so that a retry is not served the same one."""
+        try:
+            return parse(response)
+        except Exception:
+            self.discard_cached_response(prompt, **kwargs)
+            raise
+
+    def _with_deadline(self, kwargs: dict[str, Any]) -> None:
+        if self.retry_policy.timeout is not None and "request_options" not in kwargs:
+            kwargs["request_options"] = {"timeout": self.retry_policy.timeout}
+
+    def _call_model(self, prompt: str, **kwargs):
+        with self.rate_limiter.limit(estimate_tokens(prompt)) as slot:
+            response = self.model.generate_content(prompt, **kwargs)
+            # A streamed response has no usage metadata until it is consumed.
+            if not kwargs.get("stream"):
+                slot.settle(response)
+        return response
+
+    async def _alimited_call(self, prompt: str, **kwargs):
+        async with self.rate_limiter.alimit(estimate_tokens(prompt)) as slot:
+            response = await asyncio.wait_for(
+                self._acall_model(prompt, **kwargs), self.retry_policy.timeout
+            )
+            slot.settle(response)
+        return response
+
+    async def _acall_model(self, prompt: str, **kwargs):
+        generate_async = getattr(self.model, "generate_content_async", None)
+        if inspect.iscoroutinefunction(generate_async):
+            return await generate_async(prompt, **kwargs)
+        return await asyncio.to_thread(self.model.generate_content, prompt, **kwargs)
+
+    def _log_request(self, prompt: str, kwargs: dict[str, Any]) -> None:
         self._log_debug(
             "Sending request to Gemini API",
             {
@@ -51,76 +206,77 @@ class BaseAgent:
             },
         )
 
+    def _log_response(self, response: Any) -> None:
+        # Safely retrieve the response text as some Gemini SDK versions
+        # raise an exception when ``response.text`` is accessed on
+        # function-call results.
+        response_text = None
         try:
-            response = self.model.generate_content(prompt, **kwargs)
+            response_text = response.text
+        except Exception as exc:  # pragma: no cover - depends on SDK behaviour
+            response_text = f"[text unavailable: {exc}]"
 
-            # Safely retrieve the response text as some Gemini SDK versions
-            # raise an exception when ``response.text`` is accessed on
-            # function-call results.
-            response_text = None
-            try:
-                response_text = response.text
-            except Exception as exc:  # pragma: no cover - depends on SDK behaviour
-                response_text = f"[text unavailable: {exc}]"
+        # Log the raw response
+        self._log_debug(
+            "Received response from Gemini API",
+            {
+                "type": type(response).__name__,
+                "text": response_text,
+                "has_candidates": hasattr(response, "candidates")
+                and bool(response.candidates),
+                "candidates_count": len(response.candidates)
+                if hasattr(response, "candidates")
+                else 0,
+            },
+        )
 
-            # Log the raw response
+        # Log details about the first candidate if available
+        if hasattr(response, "candidates") and response.candidates:
+            candidate = response.candidates[0]
             self._log_debug(
-                "Received response from Gemini API",
+                "First candidate details",
                 {
-                    "type": type(response).__name__,
-                    "text": response_text,
-                    "has_candidates": hasattr(response, "candidates")
-                    and bool(response.candidates),
-                    "candidates_count": len(response.candidates)
-                    if hasattr(response, "candidates")
+                    "content_type": type(candidate.content).__name__
+                    if hasattr(candidate, "content")
+                    else "No content",
+                    "has_parts": hasattr(candidate.content, "parts")
+                    and bool(candidate.content.parts),
+                    "parts_count": len(candidate.content.parts)
+                    if hasattr(candidate.content, "parts")
                     else 0,
                 },
             )
 
-            # Log details about the first candidate if available
-            if hasattr(response, "candidates") and response.candidates:
-                candidate = response.candidates[0]
+            if hasattr(candidate.content, "parts") and candidate.content.parts:
+                part = candidate.content.parts[0]
                 self._log_debug(
-                    "First candidate details",
+                    "First part details",
                     {
-                        "content_type": type(candidate.content).__name__
-                        if hasattr(candidate, "content")
-                        else "No content",
-                        "has_parts": hasattr(candidate.content, "parts")
-                        and bool(candidate.content.parts),
-                        "parts_count": len(candidate.content.parts)
-                        if hasattr(candidate.content, "parts")
-                        else 0,
+                        "type": type(part).__name__,
+                        "has_function_call": hasattr(part, "function_call"),
+                        "function_call_type": type(part.function_call).__name__
+                        if hasattr(part, "function_call")
+                        else "No function_call",
+                        "function_call_attrs": dir(part.function_call)
+                        if hasattr(part, "function_call") and part.function_call
+                        else "No function_call",
                     },
                 )
 
-                if hasattr(candidate.content, "parts") and candidate.content.parts:
-                    part = candidate.content.parts[0]
-                    self._log_debug(
-                        "First part details",
-                        {
-                            "type": type(part).__name__,
-                            "has_function_call": hasattr(part, "function_call"),
-                            "function_call_type": type(part.function_call).__name__
-                            if hasattr(part, "function_call")
-                            else "No function_call",
-                            "function_call_attrs": dir(part.function_call)
-                            if hasattr(part, "function_call") and part.function_call
-                            else "No function_call",
-                        },
-                    )
-
-            return response
+    def _log_retry(self, error: BaseException, attempt: int, delay: float) -> None:
+        self._log_debug(
+            f"Model call attempt {attempt} failed, retrying in {delay:.2f}s",
+            {"error_type": type(error).__name__, "error": str(error)},
+        )
 
-        except Exception as e:
-            self._log_debug(
-                f"Error in generate_content: {str(e)}",
-                {
-                    "error_type": type(e).__name__,
-                    "error_args": getattr(e, "args", "No args"),
-                },
-            )
-            raise
+    def _log_error(self, error: Exception) -> None:
+        self._log_debug(
+            f"Error in generate_content: {str(error)}",
+            {
+                "error_type": type(error).__name__,
+                "error_args": getattr(error, "args", "No args"),
+            },
+        )
 
     def _log_debug(self, message: str, data: Any = None):
         """Helper method for debug logging."""
@@ -162,4 +318,4 @@ class BaseAgent:
             return result
         except ValueError:
             self._log_debug("No JSON object found in text", text)
-            return text  # Return original text if no JSON object is found
\ No newline at end of file
+            return text  # Return original text if no JSON object is found
@@ -43,7 +43,7 @@ class PlannerAgent(BaseAgent):
     def __init__(self, primitive_loader: PrimitiveLoader, model_name: str = None):
         if model_name is None:
             model_name = get_model_name("planner")
-        super().__init__(model_name=model_name)
+        super().__init__(model_name=model_name, role="planner")
         self.primitive_loader = primitive_loader
         self.actions_schema = self._create_schema_for_type("actions")
         self.strategies_schema = self._create_schema_for_type("strategies", for_selection=True)
@@ -182,78 +182,113 @@ class PlannerAgent(BaseAgent):
 
     def select_strategy(self, user_goal: str, constitution: str) -> str:
         try:
-            print("\n=== DEBUG: Starting select_strategy ===")
-            print(f"User goal: {user_goal}")
-            
-            # Format the prompt
-            prompt = constitution + "\n\n" + STRATEGY_SELECTION_PROMPT.format(
-                user_goal=user_goal,
-                strategies_json_schema=json.dumps(self.strategies_schema, indent=2).replace("{", "{{").replace("}", "}}"),
-            )
-            
-            print("\n=== DEBUG: Sending prompt to Gemini API ===")
-            print(f"Prompt length: {len(prompt)} characters")
-            print(f"First 500 chars: {prompt[:500]}...")
-            
-            print("\n=== DEBUG: Sending tools to Gemini API ===")
-            print(f"Tools schema: {json.dumps(self.strategies_schema, indent=2)}")
-            
+            prompt = self._build_strategy_prompt(user_goal, constitution)
             # Call the parent's generate_content method
             response = super().generate_content(prompt, tools=self.strategies_schema)
-            
-            print("\n=== DEBUG: Received response from Gemini API ===")
-            print(f"Response type: {type(response)}")
-            
-            # Debug the response structure
-            if not hasattr(response, 'candidates') or not response.candidates:
-                raise ValueError("No candidates in response")
-                
-            print(f"Number of candidates: {len(response.candidates)}")
-            
-            candidate = response.candidates[0]
-            if not hasattr(candidate, 'content') or not hasattr(candidate.content, 'parts') or not candidate.content.parts:
-                raise ValueError("Invalid response format: missing content or parts")
-                
-            print(f"Number of parts: {len(candidate.content.parts)}")
-            
-            part = candidate.content.parts[0]
-            if not hasattr(part, 'function_call'):
-                print(f"\n=== DEBUG: Part attributes ===")
-                print(f"Part type: {type(part)}")
-                print(f"Part attributes: {dir(part)}")
-                if hasattr(part, 'text'):
-                    print(f"Part text: {part.text}")
-                raise ValueError("No function call in response")
-                
-            fc = part.function_call
-            print(f"\n=== DEBUG: Function call details ===")
-            print(f"Function name: {getattr(fc, 'name', 'N/A')}")
-            print(f"Function args: {getattr(fc, 'args', {})}")
-            
-            if fc.name != "select_strategy":
-                raise ValueError(f"Unexpected function call: {fc.name}")
-                
-            if not hasattr(fc, 'args') or 'strategy_name' not in fc.args:
-                print(f"\n=== DEBUG: Function call args ===")
-                print(f"Args: {getattr(fc, 'args', 'No args')}")
-                raise ValueError("No strategy_name in function call arguments")
-                
-            strategy_name = fc.args["strategy_name"]
-            print(f"\n=== DEBUG: Selected strategy ===")
-            print(f"Strategy name: {strategy_name}")
-            
-            return strategy_name
-            
+            return self._parse_response(
+                self._parse_strategy_response,
+                response,
+                prompt,
+                tools=self.strategies_schema,
+            )
         except Exception as e:
-            print(f"\n=== DEBUG: Error in select_strategy ===")
-            print(f"Error type: {type(e).__name__}")
-            print(f"Error message: {str(e)}")
-            print("\n=== DEBUG: Full traceback ===")
-            import traceback
-            traceback.print_exc()
-            print("==========================\n")
+            self._log_strategy_error(e)
             raise
 
+    async def aselect_strategy(self, user_goal: str, constitution: str) -> str:
+        """Async counterpart of :meth:`select_strategy`."""
+        try:
+            prompt = self._build_strategy_prompt(user_goal, constitution)
+            response = await self.agenerate_content(
+                prompt, tools=self.strategies_schema
+            )
+            return self._parse_response(
+                self._parse_strategy_response,
+                response,
+                prompt,
+                tools=self.strategies_schema,
+            )
+        except Exception as e:
+            self._log_strategy_error(e)
+            raise
+
+    def _build_strategy_prompt(self, user_goal: str, constitution: str) -> str:
+        print("\n=== DEBUG: Starting select_strategy ===")
+        print(f"User goal: {user_goal}")
+
+        # Format the prompt
+        prompt = constitution + "\n\n" + STRATEGY_SELECTION_PROMPT.format(
+            user_goal=user_goal,
+            strategies_json_schema=json.dumps(self.strategies_schema, indent=2)
+            .replace("{", "{{")
+            .replace("}", "}}"),
+        )
+
+        print("\n=== DEBUG: Sending prompt to Gemini API ===")
+        print(f"Prompt length: {len(prompt)} characters")
+        print(f"First 500 chars: {prompt[:500]}...")
+
+        print("\n=== DEBUG: Sending tools to Gemini API ===")
+        print(f"Tools schema: {json.dumps(self.strategies_schema, indent=2)}")
+        return prompt
+
+    def _parse_strategy_response(self, response: Any) -> str:
+        print("\n=== DEBUG: Received response from Gemini API ===")
+        print(f"Response type: {type(response)}")
+
+        # Debug the response structure
+        if not hasattr(response, 'candidates') or not response.candidates:
+            raise ValueError("No candidates in response")
+
+        print(f"Number of candidates: {len(response.candidates)}")
+
+        candidate = response.candidates[0]
+        if (
+            not hasattr(candidate, 'content')
+            or not hasattr(candidate.content, 'parts')
+            or not candidate.content.parts
+        ):
+            raise ValueError("Invalid response format: missing content or parts")
+
+        print(f"Number of parts: {len(candidate.content.parts)}")
+
+        part = candidate.content.parts[0]
+        if not hasattr(part, 'function_call'):
+            print("\n=== DEBUG: Part attributes ===")
+            print(f"Part type: {type(part)}")
+            print(f"Part attributes: {dir(part)}")
+            if hasattr(part, 'text'):
+                print(f"Part text: {part.text}")
+            raise ValueError("No function call in response")
+
+        fc = part.function_call
+        print("\n=== DEBUG: Function call details ===")
+        print(f"Function name: {getattr(fc, 'name', 'N/A')}")
+        print(f"Function args: {getattr(fc, 'args', {})}")
+
+        if fc.name != "select_strategy":
+            raise ValueError(f"Unexpected function call: {fc.name}")
+
+        if not hasattr(fc, 'args') or 'strategy_name' not in fc.args:
+            print("\n=== DEBUG: Function call args ===")
+            print(f"Args: {getattr(fc, 'args', 'No args')}")
+            raise ValueError("No strategy_name in function call arguments")
+
+        strategy_name = fc.args["strategy_name"]
+        print("\n=== DEBUG: Selected strategy ===")
+        print(f"Strategy name: {strategy_name}")
+
+        return strategy_name
+
+    def _log_strategy_error(self, e: Exception) -> None:
+        print("\n=== DEBUG: Error in select_strategy ===")
+        print(f"Error type: {type(e).__name__}")
+        print(f"Error message: {str(e)}")
+        print("\n=== DEBUG: Full traceback ===")
+        import traceback
+        traceback.print_exc()
+        print("==========================\n")
+
     def plan_step(
         self,
         user_goal: str,
@@ -262,6 +297,73 @@ class PlannerAgent(BaseAgent):
         history: List[str],
     ) -> ReActStep:
         """Perform a single ReAct planning step using the provided strategy template."""
+        return self.plan_steps(user_goal, constitution, strategy_content, history)[0]
+
+    def plan_steps(
+        self,
+        user_goal: str,
+        constitution: str,
+        strategy_content: str,
+        history: List[str],
+    ) -> List[ReActStep]:
+        """Plans one turn, returning a step for every function call in the response.
+
+        The model may answer with several independent tool calls at once; each
+        becomes its own :class:`ReActStep`, in the order they were emitted.
+        """
+        prompt = self._build_step_prompt(
+            user_goal, constitution, strategy_content, history
+        )
+        try:
+            # Use the parent class's generate_content method to ensure debug logging
+            response = super().generate_content(prompt, tools=self.actions_schema)
+            return self._parse_response(
+                self._parse_step_response, response, prompt, tools=self.actions_schema
+            )
+        except Exception as e:
+            self._log_step_error(e)
+            raise  # Re-raise the exception after logging
+
+    async def aplan_step(
+        self,
+        user_goal: str,
+        constitution: str,
+        strategy_content: str,
+        history: List[str],
+    ) -> ReActStep:
+        """Async counterpart of :meth:`plan_step`."""
+        steps = await self.aplan_steps(
+            user_goal, constitution, strategy_content, history
+        )
+        return steps[0]
+
+    async def aplan_steps(
+        self,
+        user_goal: str,
+        constitution: str,
+        strategy_content: str,
+        history: List[str],
+    ) -> List[ReActStep]:
+        """Async counterpart of :meth:`plan_steps`."""
+        prompt = self._build_step_prompt(
+            user_goal, constitution, strategy_content, history
+        )
+        try:
+            response = await self.agenerate_content(prompt, tools=self.actions_schema)
+            return self._parse_response(
+                self._parse_step_response, response, prompt, tools=self.actions_schema
+            )
+        except Exception as e:
+            self._log_step_error(e)
+            raise
+
+    def _build_step_prompt(
+        self,
+        user_goal: str,
+        constitution: str,
+        strategy_content: str,
+        history: List[str],
+    ) -> str:
         # Provide the agent with a list of available patterns and schemas to prevent hallucination.
         patterns = self.primitive_loader.get_all("patterns")
         
@@ -313,96 +415,104 @@ class PlannerAgent(BaseAgent):
         print(prompt[:1000] + "..." if len(prompt) > 1000 else prompt)
         print("=== END PROMPT ===\n")
 
+        return prompt
+
+    def _parse_step_response(self, response: Any) -> List[ReActStep]:
+        # Debug: Print the raw response
+        print("\n=== DEBUG: Raw response from Gemini API ===")
+        print(f"Response type: {type(response)}")
+        print(f"Response dir: {dir(response)}")
+        if hasattr(response, 'candidates'):
+            candidates = response.candidates or []
+            print(f"Number of candidates: {len(candidates)}")
+            if candidates:
+                print(f"First candidate type: {type(candidates[0])}")
+                print(f"First candidate dir: {dir(candidates[0])}")
+                if hasattr(candidates[0], 'content'):
+                    content = candidates[0].content
+                    print(f"Content type: {type(content)}")
+                    print(f"Content dir: {dir(content)}")
+                    if hasattr(content, 'parts'):
+                        parts = content.parts or []
+                        print(f"Number of parts: {len(parts)}")
+                        if parts:
+                            print(f"First part type: {type(parts[0])}")
+                            print(f"First part dir: {dir(parts[0])}")
+        print("=== END RESPONSE ===\n")
+
+        if not hasattr(response, 'candidates') or not response.candidates:
+            raise ValueError("No candidates in response from Gemini API")
+
+        # Collect every part that carries a function call; text parts may be
+        # interleaved and the model can emit several calls in one turn.
+        fc_parts = [
+            part
+            for part in response.candidates[0].content.parts
+            if part.function_call and part.function_call.name
+        ]
+
+        if not fc_parts:
+            # Debug: Print the actual content of the part to help diagnose the issue
+            print("\n=== DEBUG: No function_call in response part ===")
+            for i, p in enumerate(response.candidates[0].content.parts):
+                print(f"Part {i}: {p}")
+            print("=== END DEBUG ===\n")
+            raise ValueError(
+                "Planner Agent did not return a function call. "
+                "Check the debug output for the actual response."
+            )
+
+        return [self._step_from_function_call(part.function_call) for part in fc_parts]
+
+    def _step_from_function_call(self, fc: Any) -> ReActStep:
+        # Debug: Print the function call details
+        print("\n=== DEBUG: Function call details ===")
+        print(f"Function call object type: {type(fc)}")
+        print(f"Function call attributes: {dir(fc)}")
+        print(f"Function name: {getattr(fc, 'name', 'N/A')}")
+        print(f"Function args type: {type(getattr(fc, 'args', {}))}")
+        print(f"Function args: {getattr(fc, 'args', {})}")
+        print("=== END DEBUG ===\n")
+
+        # Extract function name and arguments with better error handling
         try:
-            # Use the parent class's generate_content method to ensure debug logging
-            response = super().generate_content(prompt, tools=self.actions_schema)
-            
-            # Debug: Print the raw response
-            print("\n=== DEBUG: Raw response from Gemini API ===")
-            print(f"Response type: {type(response)}")
-            print(f"Response dir: {dir(response)}")
-            if hasattr(response, 'candidates'):
-                print(f"Number of candidates: {len(response.candidates) if response.candidates else 0}")
-                if response.candidates:
-                    print(f"First candidate type: {type(response.candidates[0])}")
-                    print(f"First candidate dir: {dir(response.candidates[0])}")
-                    if hasattr(response.candidates[0], 'content'):
-                        print(f"Content type: {type(response.candidates[0].content)}")
-                        print(f"Content dir: {dir(response.candidates[0].content)}")
-                        if hasattr(response.candidates[0].content, 'parts'):
-                            print(f"Number of parts: {len(response.candidates[0].content.parts) if response.candidates[0].content.parts else 0}")
-                            if response.candidates[0].content.parts:
-                                print(f"First part type: {type(response.candidates[0].content.parts[0])}")
-                                print(f"First part dir: {dir(response.candidates[0].content.parts[0])}")
-            print("=== END RESPONSE ===\n")
-
-            if not hasattr(response, 'candidates') or not response.candidates:
-                raise ValueError("No candidates in response from Gemini API")
-                
-            # Find the part that contains the function call, as it may not be the first one.
-            fc_part = None
-            for part in response.candidates[0].content.parts:
-                if part.function_call and part.function_call.name:
-                    fc_part = part
-                    break
-
-            if not fc_part:
-                # Debug: Print the actual content of the part to help diagnose the issue
-                print("\n=== DEBUG: No function_call in response part ===")
-                for i, p in enumerate(response.candidates[0].content.parts):
-                    print(f"Part {i}: {p}")
-                print("=== END DEBUG ===\n")
-                raise ValueError("Planner Agent did not return a function call. Check the debug output for the actual response.")
-                
-            fc = fc_part.function_call
-            
-            # Debug: Print the function call details
-            print("\n=== DEBUG: Function call details ===")
-            print(f"Function call object type: {type(fc)}")
-            print(f"Function call attributes: {dir(fc)}")
-            print(f"Function name: {getattr(fc, 'name', 'N/A')}")
-            print(f"Function args type: {type(getattr(fc, 'args', {}))}")
-            print(f"Function args: {getattr(fc, 'args', {})}")
+            func_name = getattr(fc, 'name', None)
+            if not func_name:
+                raise ValueError("Function name not found in function call")
+
+            action_args = dict(getattr(fc, 'args', {}))
+            reasoning = action_args.pop("reasoning", "")
+            criticism = action_args.pop("criticism", "")
+
+            # Debug: Print the action and thought before creating objects
+            print("\n=== DEBUG: Creating Action and Thought objects ===")
+            print(f"Action - tool_name: {func_name}, arguments: {action_args}")
+            print(f"Thought - reasoning: {reasoning}, criticism: {criticism}")
             print("=== END DEBUG ===\n")
-            
-            # Extract function name and arguments with better error handling
-            try:
-                func_name = getattr(fc, 'name', None)
-                if not func_name:
-                    raise ValueError("Function name not found in function call")
-                
-                action_args = dict(getattr(fc, 'args', {}))
-                reasoning = action_args.pop("reasoning", "")
-                criticism = action_args.pop("criticism", "")
-                
-                # Debug: Print the action and thought before creating objects
-                print("\n=== DEBUG: Creating Action and Thought objects ===")
-                print(f"Action - tool_name: {func_name}, arguments: {action_args}")
-                print(f"Thought - reasoning: {reasoning}, criticism: {criticism}")
-                print("=== END DEBUG ===\n")
-                
-                # Create the Action and Thought objects
-                action = Action(tool_name=func_name, arguments=action_args)
-                thought = Thought(reasoning=reasoning, criticism=criticism, next_action=action)
-                
-                # Debug: Print the ReActStep before returning
-                print("\n=== DEBUG: Created ReActStep ===")
-                print(f"ReActStep - thought: {thought}")
-                print("=== END DEBUG ===\n")
-                
-                return ReActStep(thought=thought)
-                
-            except Exception as e:
-                print("\n=== DEBUG: Error creating Action/Thought ===")
-                print(f"Error type: {type(e).__name__}")
-                print(f"Error message: {str(e)}")
-                print("=== END DEBUG ===\n")
-                raise
-            
+
+            # Create the Action and Thought objects
+            action = Action(tool_name=func_name, arguments=action_args)
+            thought = Thought(
+                reasoning=reasoning, criticism=criticism, next_action=action
+            )
+
+            # Debug: Print the ReActStep before returning
+            print("\n=== DEBUG: Created ReActStep ===")
+            print(f"ReActStep - thought: {thought}")
+            print("=== END DEBUG ===\n")
+
+            return ReActStep(thought=thought)
+
         except Exception as e:
-            # Debug: Print the full error details
-            print("\n=== DEBUG: Error in plan_step ===")
+            print("\n=== DEBUG: Error creating Action/Thought ===")
             print(f"Error type: {type(e).__name__}")
             print(f"Error message: {str(e)}")
             print("=== END DEBUG ===\n")
-            raise  # Re-raise the exception after logging
+            raise
+
+    def _log_step_error(self, e: Exception) -> None:
+        # Debug: Print the full error details
+        print("\n=== DEBUG: Error in plan_step ===")
+        print(f"Error type: {type(e).__name__}")
+        print(f"Error message: {str(e)}")
+        print("=== END DEBUG ===\n")
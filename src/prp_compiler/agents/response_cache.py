@@ -0,0 +1,96 @@
+"""Memoization of Gemini responses in the result cache.
+
+Responses are stored under the ``llm`` namespace, keyed by model name, prompt
+hash and a hash of the tool declarations and other request options, and are
+replayed as lightweight objects exposing the parts of the SDK response the
+agents read: ``text`` and ``candidates[0].content.parts[*].function_call``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Mapping, Sequence
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+NAMESPACE = "llm"
+# Request options that do not change what the model answers.
+_IGNORED_KWARGS = {"request_options", "stream"}
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def response_cache_key(model_name: str, prompt: str, kwargs: Dict[str, Any]) -> str:
+    options = {k: v for k, v in kwargs.items() if k not in _IGNORED_KWARGS}
+    tools = options.pop("tools", None)
+    tools_hash = _sha256(json.dumps(tools, sort_keys=True, default=str))
+    options_hash = _sha256(json.dumps(options, sort_keys=True, default=str))
+    return "llm:" + _sha256(
+        "\n".join([model_name, _sha256(prompt), tools_hash, options_hash])
+    )
+
+
+def _plain(value: Any) -> Any:
+    """Converts SDK containers (``MapComposite`` etc.) to JSON-ready values."""
+    if isinstance(value, Mapping):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def serialize_response(response: Any) -> Optional[Dict[str, Any]]:
+    """Captures text and function calls, or ``None`` if the response has
+    neither in a form that can be replayed."""
+    try:
+        text = response.text
+    except Exception:  # function-call responses raise on ``.text``
+        text = None
+    if not isinstance(text, str):
+        text = None
+
+    function_calls: List[Dict[str, Any]] = []
+    candidates = getattr(response, "candidates", None) or []
+    if isinstance(candidates, Sequence) and candidates:
+        parts = getattr(getattr(candidates[0], "content", None), "parts", None) or []
+        for part in parts if isinstance(parts, Sequence) else []:
+            fc = getattr(part, "function_call", None)
+            name = getattr(fc, "name", None)
+            if isinstance(name, str) and name:
+                function_calls.append(
+                    {"name": name, "args": _plain(getattr(fc, "args", None) or {})}
+                )
+
+    if text is None and not function_calls:
+        return None
+    payload = {"text": text, "function_calls": function_calls}
+    try:
+        json.dumps(payload)
+    except (TypeError, ValueError):
+        return None
+    return payload
+
+
+class CachedResponse:
+    """Stand-in for a ``GenerateContentResponse`` replayed from the cache."""
+
+    usage_metadata = None
+
+    def __init__(self, payload: Dict[str, Any]):
+        self._text = payload.get("text")
+        parts = [
+            SimpleNamespace(function_call=SimpleNamespace(**call), text="")
+            for call in payload.get("function_calls", [])
+        ]
+        if self._text is not None:
+            parts.append(SimpleNamespace(function_call=None, text=self._text))
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(parts=parts))]
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            raise ValueError("Could not convert `part.function_call` to text.")
+        return self._text
@@ -1,7 +1,9 @@
 import json
+from typing import Any
 
 from jsonschema import ValidationError, validate
 
+from ..json_stream import IncrementalJSONObjectParser, PropertyValidator
 from .base_agent import BaseAgent
 
 SYNTHESIZER_PROMPT_TEMPLATE = """
@@ -24,13 +26,66 @@ class SynthesizerAgent(BaseAgent):
         if model_name is None:
             from ..config import get_model_name
             model_name = get_model_name("synthesizer")
-        super().__init__(model_name=model_name)
+        super().__init__(model_name=model_name, role="synthesizer")
 
     def synthesize(
+        self,
+        schema: dict,
+        context: str,
+        constitution: str,
+        max_retries: int = 2,
+        stream: bool = False,
+    ) -> dict:
+        """Generates the final PRP JSON, validating it against the schema and retrying.
+
+        With ``stream=True`` the response is consumed chunk by chunk and each
+        top-level property is validated as soon as it closes; the first
+        violation abandons the stream and counts as a failed attempt.
+        """
+        prompt = self._build_prompt(schema, context, constitution)
+
+        for attempt in range(max_retries):
+            if stream:
+                response_text, violation = self._stream_attempt(prompt, schema)
+                if violation:
+                    prompt = self._reject_attempt(
+                        violation, response_text, prompt, attempt
+                    )
+                    continue
+            else:
+                response_text = self.generate_content(prompt).text
+            generated_json, prompt = self._check_attempt(
+                response_text, schema, prompt, attempt
+            )
+            if generated_json is not None:
+                return generated_json
+
+        raise RuntimeError(
+            f"Synthesizer failed to produce a valid PRP JSON after {max_retries} attempts."
+        )
+
+    async def asynthesize(
         self, schema: dict, context: str, constitution: str, max_retries: int = 2
     ) -> dict:
-        """Generates the final PRP JSON, validating it against the schema and retrying."""
-        prompt = (
+        """Async counterpart of :meth:`synthesize`, without streaming: the
+        async paths (``serve``, ``daemon``, ``compile-batch``) always validate
+        the complete response."""
+        prompt = self._build_prompt(schema, context, constitution)
+
+        for attempt in range(max_retries):
+            response = await self.agenerate_content(prompt)
+            generated_json, prompt = self._check_attempt(
+                response.text, schema, prompt, attempt
+            )
+            if generated_json is not None:
+                return generated_json
+
+        raise RuntimeError(
+            f"Synthesizer failed to produce a valid PRP JSON after {max_retries} attempts."
+        )
+
+    def _build_prompt(self, schema: dict, context: str, constitution: str) -> str:
+        return (
             constitution
             + "\n\n"
             + SYNTHESIZER_PROMPT_TEMPLATE.format(
@@ -39,29 +94,60 @@ class SynthesizerAgent(BaseAgent):
             )
         )
 
-        for attempt in range(max_retries):
-            response = self.model.generate_content(prompt)
-            cleaned_response_text = self._clean_json_response(response.text)
+    def _check_attempt(
+        self, response_text: str, schema: dict, prompt: str, attempt: int
+    ) -> tuple[dict | None, str]:
+        """Validates one attempt, returning the JSON or the self-correction prompt."""
+        cleaned_response_text = self._clean_json_response(response_text)
 
-            try:
-                generated_json = json.loads(cleaned_response_text)
-                validate(instance=generated_json, schema=schema)
-                print(
-                    f"Synthesizer output validated successfully on attempt {attempt + 1}."
-                )
-                return generated_json
-            except (json.JSONDecodeError, ValidationError) as e:
-                print(
-                    f"[WARNING] Synthesizer output validation failed on attempt "
-                    f"{attempt + 1}: {e}"
-                )
-                # Append error to prompt for self-correction
-                prompt += (
-                    f"\n\nPREVIOUS ATTEMPT FAILED. DO NOT REPEAT THE MISTAKE. "
-                    f"Error: {e}. Raw Response: {cleaned_response_text}. "
-                    f"Please correct the JSON output to strictly conform to the schema."
-                )
+        try:
+            generated_json = json.loads(cleaned_response_text)
+            validate(instance=generated_json, schema=schema)
+            print(
+                f"Synthesizer output validated successfully on attempt {attempt + 1}."
+            )
+            return generated_json, prompt
+        except (json.JSONDecodeError, ValidationError) as e:
+            return None, self._reject_attempt(e, cleaned_response_text, prompt, attempt)
 
-        raise RuntimeError(
-            f"Synthesizer failed to produce a valid PRP JSON after {max_retries} attempts."
+    def _reject_attempt(
+        self, error: Any, response_text: str, prompt: str, attempt: int
+    ) -> str:
+        print(
+            f"[WARNING] Synthesizer output validation failed on attempt "
+            f"{attempt + 1}: {error}"
+        )
+        # A memoized response would fail the same way on every later run.
+        self.discard_cached_response(prompt)
+        # Append error to prompt for self-correction
+        return prompt + (
+            f"\n\nPREVIOUS ATTEMPT FAILED. DO NOT REPEAT THE MISTAKE. "
+            f"Error: {error}. Raw Response: {response_text}. "
+            f"Please correct the JSON output to strictly conform to the schema."
         )
+
+    def _stream_attempt(self, prompt: str, schema: dict) -> tuple[str, str | None]:
+        """Streams one generation, checking each top-level property as it closes.
+
+        Returns the text received so far and the first violation, if any. On a
+        violation the remaining chunks are never requested, so we stop paying
+        for tokens of an output that would be thrown away.
+        """
+        response = self.generate_content(prompt, stream=True)
+        parser = IncrementalJSONObjectParser()
+        validator = PropertyValidator(schema)
+        received = []
+        for chunk in response:
+            received.append(chunk.text)
+            try:
+                members = parser.feed(chunk.text)
+            except ValueError as e:
+                return "".join(received), str(e)
+            for key, value in members:
+                violation = validator.check(key, value)
+                if violation:
+                    print(f"[WARNING] Aborting synthesizer stream: {violation}")
+                    return "".join(received), violation
+            if parser.complete:
+                break
+        return "".join(received), None
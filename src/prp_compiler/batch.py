@@ -0,0 +1,149 @@
+"""Bulk compilation of goal files with bounded concurrency and resumable progress."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import typer
+
+from .service import CompilerRuntime
+
+
+@dataclass
+class BatchItem:
+    id: str
+    goal: str
+    strategy: Optional[str] = None
+
+
+@dataclass
+class BatchReport:
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.completed} compiled, {self.failed} failed, "
+            f"{self.skipped} already done, in {self.elapsed:.1f}s"
+        )
+
+
+def load_goals(goals_file: Path) -> List[BatchItem]:
+    """Reads a JSONL goal file.
+
+    Each line is either a JSON string (the goal) or an object with a ``goal``
+    and optional ``id`` and ``strategy``. Items without an ``id`` get one
+    derived from the goal text, so re-running the same file resumes cleanly.
+    An id names its output file, so it may not contain path separators.
+    """
+    items = []
+    seen: Set[str] = set()
+    for lineno, line in enumerate(goals_file.read_text().splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{goals_file}:{lineno}: invalid JSON: {e}") from e
+        if isinstance(entry, str):
+            entry = {"goal": entry}
+        if not isinstance(entry, dict) or not entry.get("goal"):
+            raise ValueError(f"{goals_file}:{lineno}: expected a 'goal'")
+        item_id = str(
+            entry.get("id") or hashlib.sha256(entry["goal"].encode()).hexdigest()[:12]
+        )
+        # The id names the output file; it must not reach outside the out dir.
+        if item_id in (".", "..") or any(c in item_id for c in "/\\\0"):
+            raise ValueError(f"{goals_file}:{lineno}: invalid id '{item_id}'")
+        if item_id in seen:
+            raise ValueError(f"{goals_file}:{lineno}: duplicate id '{item_id}'")
+        seen.add(item_id)
+        items.append(BatchItem(item_id, entry["goal"], entry.get("strategy")))
+    return items
+
+
+def load_completed(summary_file: Path) -> Set[str]:
+    """Returns the ids a previous run recorded as successfully compiled."""
+    if not summary_file.exists():
+        return set()
+    completed = set()
+    for line in summary_file.read_text().splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue  # a line cut short by an interruption
+        if record.get("status") == "ok":
+            completed.add(record["id"])
+        else:
+            completed.discard(record.get("id"))
+    return completed
+
+
+async def run_batch(
+    runtime: CompilerRuntime,
+    items: List[BatchItem],
+    out_dir: Path,
+    summary_file: Path,
+    concurrency: int = 4,
+) -> BatchReport:
+    """Compiles ``items`` into ``out_dir`` with at most ``concurrency`` in flight.
+
+    One JSON line per finished goal is appended (and flushed) to
+    ``summary_file`` as soon as it completes, so an interrupted batch resumes
+    from the goals that have not succeeded yet.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+    report = BatchReport()
+    started = time.monotonic()
+    done = load_completed(summary_file)
+    pending = [item for item in items if item.id not in done]
+    report.skipped = len(items) - len(pending)
+
+    queue: asyncio.Queue[Optional[BatchItem]] = asyncio.Queue()
+    for item in pending:
+        queue.put_nowait(item)
+    for _ in range(concurrency):
+        queue.put_nowait(None)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    summary_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(summary_file, "a") as summary:
+
+        def record(entry: dict) -> None:
+            summary.write(json.dumps(entry) + "\n")
+            summary.flush()
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                item_started = time.monotonic()
+                out_path = out_dir / f"{item.id}.json"
+                entry: Dict[str, Any] = {"id": item.id, "goal": item.goal}
+                try:
+                    await runtime.acompile(item.goal, out_path, item.strategy)
+                except Exception as e:
+                    report.failed += 1
+                    entry.update(status="error", error=f"{type(e).__name__}: {e}")
+                    typer.secho(f"✗ {item.id}: {e}", fg=typer.colors.RED)
+                else:
+                    report.completed += 1
+                    entry.update(status="ok", output=str(out_path))
+                    typer.echo(f"✓ {item.id} -> {out_path}")
+                entry["elapsed"] = round(time.monotonic() - item_started, 3)
+                record(entry)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    report.elapsed = time.monotonic() - started
+    return report
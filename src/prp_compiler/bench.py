@@ -0,0 +1,100 @@
+"""Benchmarks the knowledge store backends against each other.
+
+Builds each backend over the same synthetic knowledge primitive with mock
+embeddings, so that only the stores themselves are measured, and reports
+build time, the time to open the persisted store and query latency::
+
+    USE_MOCK_EMBEDDINGS=true python -m prp_compiler.bench --chunks 5000
+"""
+
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import typer
+
+from .knowledge import (
+    VECTOR_BACKENDS,
+    Chroma,
+    ChromaKnowledgeStore,
+    NumpyKnowledgeStore,
+    VectorStore,
+)
+
+app = typer.Typer()
+
+_STORES: Dict[str, Callable[..., VectorStore]] = {
+    "chroma": ChromaKnowledgeStore,
+    "numpy": NumpyKnowledgeStore,
+}
+_TOPICS = ["fixtures", "packaging", "typing", "asyncio", "logging", "testing", "cli"]
+
+
+def _write_corpus(root: Path, chunks: int) -> Dict[str, str]:
+    """Writes a knowledge primitive with ``chunks`` level-2 sections."""
+    base = root / "knowledge" / "bench" / "1.0.0"
+    (base / "chunks").mkdir(parents=True)
+    per_file = 50
+    for start in range(0, chunks, per_file):
+        sections = [
+            f"## Section {i}\n\nNotes on {_TOPICS[i % len(_TOPICS)]}, item {i}.\n"
+            for i in range(start, min(start + per_file, chunks))
+        ]
+        (base / "chunks" / f"part_{start // per_file:04d}.md").write_text(
+            "# Bench\n\n" + "\n".join(sections)
+        )
+    return {"name": "bench", "version": "1.0.0", "base_path": str(base)}
+
+
+def _time(fn) -> float:
+    # The stores log every call; keep that out of the report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+
+@app.command()
+def main(
+    chunks: int = typer.Option(2000, help="Chunks in the synthetic corpus."),
+    queries: int = typer.Option(200, help="Queries timed per backend."),
+    k: int = typer.Option(5, help="Chunks retrieved per query."),
+    backends: List[str] = typer.Option(
+        list(VECTOR_BACKENDS), "--backend", help="Backends to compare."
+    ),
+):
+    """Times build, load and retrieve for each vector backend."""
+    os.environ.setdefault("USE_MOCK_EMBEDDINGS", "true")
+    # The synthetic queries match their chunk exactly, which would put every one
+    # on the keyword fast path; time the vector search itself.
+    os.environ["PRP_RETRIEVAL_MODE"] = "vector"
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        primitive = _write_corpus(root, chunks)
+        for backend in backends:
+            if backend == "chroma" and Chroma is object:
+                typer.echo("chroma: skipped, chromadb/langchain not installed")
+                continue
+            path = root / f"{backend}_db"
+            build_seconds = _time(lambda: _STORES[backend](path).build([primitive]))
+            store = _STORES[backend](path)
+            load_seconds = _time(store.load)
+            latencies = [
+                _time(lambda i=i: store.retrieve(f"notes on {_TOPICS[i % 7]} {i}", k=k))
+                for i in range(queries)
+            ]
+            typer.echo(
+                f"{backend}: build {build_seconds:.2f}s, "
+                f"load {load_seconds * 1e3:.1f} ms, "
+                f"retrieve p50 {statistics.median(latencies) * 1e3:.2f} ms, "
+                f"max {max(latencies) * 1e3:.2f} ms over {queries} queries"
+            )
+
+
+if __name__ == "__main__":
+    app()
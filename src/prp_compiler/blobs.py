@@ -0,0 +1,127 @@
+"""Content-addressed, compressed storage for large cached strings.
+
+Large string values inside a cached result are replaced by a reference to a
+list of chunks. Chunk boundaries are content-defined (they fall after lines
+whose hash matches a mask), so the same observation cut into the same chunks
+whether it is cached on its own or embedded in a run's ``final_context``, and
+each chunk is stored once, keyed by its SHA-256.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, List, Tuple
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Strings shorter than this stay inline in the cached JSON.
+BLOB_MIN_CHARS = 4096
+# Chunk size bounds in characters; a boundary is taken after roughly one
+# line in ``1 / (BOUNDARY_MASK + 1)`` once a chunk has reached the minimum.
+CHUNK_MIN_CHARS = 1024
+CHUNK_MAX_CHARS = 64 * 1024
+BOUNDARY_MASK = 0x1F
+# Key marking a chunked string in the stored JSON.
+BLOB_MARKER = "__blob__"
+
+
+def default_codec() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError(
+                "Cache blob is zstd-compressed but zstandard is not installed"
+            )
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def digest(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode()).hexdigest()
+
+
+def split_chunks(text: str) -> List[str]:
+    """Splits ``text`` at content-defined line boundaries."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        # Overlong lines (minified pages, base64) are cut at fixed offsets.
+        while len(line) > CHUNK_MAX_CHARS:
+            if current:
+                chunks.append("".join(current))
+                current, size = [], 0
+            chunks.append(line[:CHUNK_MAX_CHARS])
+            line = line[CHUNK_MAX_CHARS:]
+        current.append(line)
+        size += len(line)
+        at_boundary = zlib.crc32(line.encode()) & BOUNDARY_MASK == 0
+        if size >= CHUNK_MAX_CHARS or (size >= CHUNK_MIN_CHARS and at_boundary):
+            chunks.append("".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def encode_value(value: Any, chunks: Dict[str, str]) -> Any:
+    """Returns ``value`` with every large string replaced by a chunk reference.
+
+    The referenced chunks are added to ``chunks`` (digest -> text).
+    """
+    if isinstance(value, str):
+        if len(value) < BLOB_MIN_CHARS:
+            return value
+        digests = []
+        for chunk in split_chunks(value):
+            key = digest(chunk)
+            chunks[key] = chunk
+            digests.append(key)
+        return {BLOB_MARKER: digests}
+    if isinstance(value, dict):
+        return {k: encode_value(v, chunks) for k, v in value.items()}
+    if isinstance(value, list):
+        return [encode_value(v, chunks) for v in value]
+    return value
+
+
+def referenced_digests(value: Any) -> List[str]:
+    """All chunk digests referenced by an encoded value."""
+    if isinstance(value, dict):
+        if set(value) == {BLOB_MARKER}:
+            return list(value[BLOB_MARKER])
+        return [d for v in value.values() for d in referenced_digests(v)]
+    if isinstance(value, list):
+        return [d for v in value for d in referenced_digests(v)]
+    return []
+
+
+def decode_value(value: Any, chunks: Dict[str, str]) -> Any:
+    """Inverse of :func:`encode_value`; raises ``KeyError`` for a missing chunk."""
+    if isinstance(value, dict):
+        if set(value) == {BLOB_MARKER}:
+            return "".join(chunks[d] for d in value[BLOB_MARKER])
+        return {k: decode_value(v, chunks) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode_value(v, chunks) for v in value]
+    return value
+
+
+def encode_result(result: Any) -> Tuple[str, Dict[str, str]]:
+    """Encodes ``result`` to its stored JSON form and the chunks it needs."""
+    chunks: Dict[str, str] = {}
+    return json.dumps(encode_value(result, chunks)), chunks
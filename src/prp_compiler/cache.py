@@ -1,37 +1,982 @@
+import atexit
 import json
+import math
+import os
 import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional, Sequence, TypeVar
+
+import typer
+
+from . import blobs
+
+T = TypeVar("T")
+
+# Attempts made when SQLite still reports a lock after ``busy_timeout``.
+LOCKED_RETRIES = 5
+# Rows deleted per transaction during garbage collection, so that writers
+# from other threads and processes get the lock between batches.
+GC_BATCH_SIZE = 500
+# Seconds read bookkeeping (access times, hit counts, lookup counters) may
+# wait in memory when nothing else needs committing, so that read-only
+# traffic does not turn into a write transaction every commit interval.
+ACCESS_FLUSH_INTERVAL = 30.0
+DEFAULT_NAMESPACE = "default"
+# ``expires_at`` of entries set with an infinite TTL.
+NEVER_EXPIRES = datetime.max.isoformat()
+EVICTION_POLICIES = {
+    "lru": "last_access ASC",
+    "lfu": "hits ASC, last_access ASC",
+}
+
+# Columns added after the original (cache_key, result_json, timestamp) table.
+_MIGRATED_COLUMNS = {
+    "namespace": f"TEXT NOT NULL DEFAULT '{DEFAULT_NAMESPACE}'",
+    "last_access": "TEXT",
+    "hits": "INTEGER NOT NULL DEFAULT 0",
+    "size_bytes": "INTEGER",
+    # Set for entries with their own TTL; NULL means the namespace's TTL.
+    "expires_at": "TEXT",
+}
+_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_cache_namespace_timestamp "
+    "ON cache (namespace, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache (last_access)",
+    "CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (expires_at)",
+    "CREATE INDEX IF NOT EXISTS idx_cache_blobs_digest ON cache_blobs (digest)",
+]
+# Compressed, content-addressed chunks of large values (see ``blobs``) and
+# which cache entries reference them.
+_BLOB_TABLES = [
+    "CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, codec TEXT NOT NULL, "
+    "data BLOB NOT NULL, size INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS cache_blobs (cache_key TEXT NOT NULL, "
+    "digest TEXT NOT NULL, PRIMARY KEY (cache_key, digest)) WITHOUT ROWID",
+]
+# Lookup counters per namespace, accumulated across processes and runs.
+_STATS_COLUMNS = [
+    "hits",
+    "misses",
+    "expired",
+    "sets",
+    "bytes_saved",
+    "bytes_written",
+    "lookup_seconds",
+]
+_STATS_TABLE = (
+    "CREATE TABLE IF NOT EXISTS cache_stats (namespace TEXT PRIMARY KEY, "
+    + ", ".join(f"{column} NUMERIC NOT NULL DEFAULT 0" for column in _STATS_COLUMNS)
+    + ", since TEXT)"
+)
+# Auxiliary tables registered with ``add_table``, so that every process
+# deleting entries also deletes the rows that belong to them.
+_TABLES_TABLE = (
+    "CREATE TABLE IF NOT EXISTS cache_tables (name TEXT PRIMARY KEY, key_column TEXT)"
+)
+
+
+@dataclass
+class TierStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class NamespaceStats:
+    """Lookup and write counters for one namespace.
+
+    ``expired`` counts lookups that found only a stale entry; ``bytes_saved``
+    is the size of the values served instead of being recomputed.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    sets: int = 0
+    bytes_saved: int = 0
+    bytes_written: int = 0
+    lookup_seconds: float = 0.0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses + self.expired
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    @property
+    def mean_lookup_ms(self) -> float:
+        return 1000 * self.lookup_seconds / self.lookups if self.lookups else 0.0
+
+    def add(self, other: "NamespaceStats") -> None:
+        for column in _STATS_COLUMNS:
+            setattr(self, column, getattr(self, column) + getattr(other, column))
+
+
+@dataclass
+class StatsReport:
+    """What ``cache stats`` shows: counters and sizes per namespace, and the
+    most frequently read entries."""
+
+    since: Optional[str]
+    file_bytes: int
+    namespaces: dict[str, dict[str, Any]]
+    top_entries: list[dict[str, Any]]
+
+
+@dataclass
+class GCReport:
+    expired: int = 0
+    evicted: int = 0
+    blobs: int = 0
+    file_bytes_before: int = 0
+    file_bytes_after: int = 0
+
+    @property
+    def removed(self) -> int:
+        return self.expired + self.evicted
+
+    def summary(self) -> str:
+        reclaimed = max(self.file_bytes_before - self.file_bytes_after, 0)
+        return (
+            f"{self.expired} expired and {self.evicted} evicted entries and "
+            f"{self.blobs} unreferenced blobs removed; "
+            f"{self.file_bytes_after / 1e6:.1f} MB on disk "
+            f"({reclaimed / 1e6:.1f} MB reclaimed)"
+        )
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU bounded by both entry count and total size.
+
+    Each entry is stored with its size in bytes (the length of its serialized
+    form); the least recently used entries are evicted until both limits hold.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: int) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[1]
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+            self._entries[key] = (value, size)
+            self.size_bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self.size_bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
 
 
 class ResultCache:
-    """Simple SQLite-backed cache for compilation results."""
+    """
+    SQLite-backed cache for compilation results.
+
+    The database runs in WAL mode, so readers never wait on the writer and any
+    number of threads, ``serve`` processes and batch jobs can share one file.
+    Each thread gets its own connection. Writes are buffered and committed
+    together in a single transaction at most ``commit_interval`` seconds after
+    they are made (or on :meth:`flush`/:meth:`close`); this process sees its
+    own buffered writes immediately.
+
+    A bounded in-memory LRU sits in front of SQLite (read-through and
+    write-through), so repeated lookups skip the query and the JSON decode.
+    Values returned from it are shared and must be treated as read-only.
+
+    Entries belong to a namespace (``run``, ``action``, ``llm``, ...) whose TTL
+    comes from ``ttl_hours`` and optional size cap from ``namespace_max_bytes``
+    (see :mod:`prp_compiler.config`); :meth:`set` can override the TTL of a
+    single entry.
+    Reads record access time and hit counts, which :meth:`gc` uses to evict
+    entries when the database grows past a size cap.
 
-    def __init__(self, db_path: Path) -> None:
+    Large strings inside a value are stored as compressed, content-addressed
+    chunks shared by every entry that contains them, so an observation cached
+    under its action key and again inside a run's ``final_context`` is kept
+    on disk once.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        commit_interval: float = 0.5,
+        busy_timeout: float = 5.0,
+        memory_entries: int = 1024,
+        memory_bytes: int = 64 * 1024 * 1024,
+        ttl_hours: Optional[dict[str, float]] = None,
+        namespace_max_bytes: Optional[dict[str, int]] = None,
+    ) -> None:
+        from .config import get_cache_namespace_caps, get_cache_ttls
+
+        if ttl_hours is None:
+            ttl_hours = get_cache_ttls()
+        if namespace_max_bytes is None:
+            namespace_max_bytes = get_cache_namespace_caps()
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.execute(
-            "CREATE TABLE IF NOT EXISTS cache (cache_key TEXT PRIMARY KEY, result_json TEXT, timestamp TEXT)"
-        )
-        self.conn.commit()
+        self.commit_interval = commit_interval
+        self.busy_timeout = busy_timeout
+        self.ttl_hours = ttl_hours
+        self.namespace_max_bytes = namespace_max_bytes
+        self.memory = LRUCache(memory_entries, memory_bytes)
+        self.tier_stats = {"memory": TierStats(), "sqlite": TierStats()}
+        # Counters since this object was created; ``_stat_deltas`` holds the
+        # part not yet added to the ``cache_stats`` table.
+        self.namespace_stats: dict[str, NamespaceStats] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._gc_stop: Optional[threading.Event] = None
+        self._reset_process_state()
+        self._with_retry(self._migrate)
+        atexit.register(_flush_at_exit, weakref.ref(self))
+
+    def _reset_process_state(self) -> None:
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._pending: dict[str, tuple[str, str, str, Optional[str]]] = {}
+        self._flushing: dict[str, tuple[str, str, str, Optional[str]]] = {}
+        self._touched: dict[str, tuple[int, str]] = {}
+        self._stat_deltas: dict[str, NamespaceStats] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._timer_due = 0.0
+
+    def _check_fork(self) -> None:
+        if self._pid != os.getpid():
+            # SQLite handles must not cross a fork; the child starts afresh
+            # and leaves the parent's buffered writes to the parent.
+            self._reset_process_state()
+
+    def _connection(self) -> sqlite3.Connection:
+        self._check_fork()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,  # only so close() can run on any thread
+            )
+            # Only takes effect on a new, empty database; lets gc() hand
+            # freed pages back to the filesystem without a full VACUUM.
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(cache_key TEXT PRIMARY KEY, result_json TEXT, timestamp TEXT)"
+            )
+            for statement in _BLOB_TABLES:
+                conn.execute(statement)
+            conn.execute(_STATS_TABLE)
+            conn.execute(_TABLES_TABLE)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+            for name, declaration in _MIGRATED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE cache ADD COLUMN {name} {declaration}")
+            if "size_bytes" not in columns:
+                conn.execute(
+                    "UPDATE cache SET size_bytes = length(result_json), "
+                    "last_access = timestamp"
+                )
+            for statement in _INDEXES:
+                conn.execute(statement)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _with_retry(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        attempt = 0
+        while True:
+            try:
+                return fn(self._connection())
+            except sqlite3.OperationalError as e:
+                attempt += 1
+                locked = "locked" in str(e) or "busy" in str(e)
+                if not locked or attempt >= LOCKED_RETRIES:
+                    raise
+                time.sleep(0.05 * 2**attempt)
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Runs ``fn`` inside one write transaction, retrying on lock errors."""
+
+        def run(conn: sqlite3.Connection) -> T:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+        return self._with_retry(run)
 
-    def get(self, cache_key: str, max_age_hours: int = 24) -> Optional[dict[str, Any]]:
-        cur = self.conn.execute(
-            "SELECT result_json, timestamp FROM cache WHERE cache_key=?", (cache_key,)
+    def add_table(
+        self, name: str, columns: str, key_column: Optional[str] = None
+    ) -> None:
+        """
+        Creates an auxiliary table for data kept alongside cache entries,
+        e.g. the semantic cache's goal index. Rows whose ``key_column`` holds
+        a cache key are removed together with that entry, whether by
+        :meth:`delete`, expiry or eviction.
+        """
+
+        def create(conn: sqlite3.Connection) -> None:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {name} ({columns})")
+            conn.execute(
+                "REPLACE INTO cache_tables (name, key_column) VALUES (?, ?)",
+                (name, key_column),
+            )
+
+        self._transaction(create)
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Runs one write statement on an auxiliary table in its own
+        transaction and returns the number of rows changed."""
+        return self._transaction(lambda conn: conn.execute(sql, params).rowcount)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> list[tuple]:
+        """Runs a read-only query and returns every row."""
+        return self._with_retry(lambda conn: conn.execute(sql, params).fetchall())
+
+    def ttl_for(self, namespace: str) -> float:
+        """Lifetime in hours of entries in ``namespace``."""
+        return self.ttl_hours.get(namespace, self.ttl_hours.get(DEFAULT_NAMESPACE, 24))
+
+    def get(
+        self,
+        cache_key: str,
+        max_age_hours: Optional[float] = None,
+        namespace: str = DEFAULT_NAMESPACE,
+    ) -> Optional[dict[str, Any]]:
+        """Returns the cached result, or ``None`` if missing, past the entry's
+        own expiry or older than ``max_age_hours`` (by default the namespace's
+        TTL, which does not apply to entries set with their own)."""
+        self._check_fork()
+        started = time.perf_counter()
+        result, size, outcome = self._lookup(cache_key, max_age_hours, namespace)
+        self._record(
+            namespace,
+            **{outcome: 1},
+            bytes_saved=size,
+            lookup_seconds=time.perf_counter() - started,
         )
-        row = cur.fetchone()
-        if not row:
-            return None
-        result_json, timestamp_str = row
-        timestamp = datetime.fromisoformat(timestamp_str)
-        if datetime.utcnow() - timestamp > timedelta(hours=max_age_hours):
-            return None
-        return json.loads(result_json)
-
-    def set(self, cache_key: str, result: dict[str, Any]) -> None:
-        self.conn.execute(
-            "REPLACE INTO cache (cache_key, result_json, timestamp) VALUES (?, ?, ?)",
-            (cache_key, json.dumps(result), datetime.utcnow().isoformat()),
+        return result
+
+    def _lookup(
+        self, cache_key: str, max_age_hours: Optional[float], namespace: str
+    ) -> tuple[Optional[dict[str, Any]], int, str]:
+        """Returns ``(result, size, outcome)``; ``outcome`` is ``hits``,
+        ``misses`` or ``expired``."""
+        stale = False
+        in_memory = self.memory.get(cache_key)
+        if in_memory is not None:
+            result, timestamp, expires_at, size = in_memory
+            if self._is_fresh(timestamp, expires_at, max_age_hours, namespace):
+                self._count("memory", "hits")
+                self._touch(cache_key)
+                return result, size, "hits"
+            stale = True
+        self._count("memory", "misses")
+
+        with self._lock:
+            buffered = self._pending.get(cache_key) or self._flushing.get(cache_key)
+        entry: Optional[tuple[Any, int, str, Optional[str]]]
+        if buffered is not None:
+            entry = json.loads(buffered[0]), len(buffered[0]), buffered[1], buffered[3]
+        else:
+            entry = self._with_retry(lambda conn: self._read_entry(conn, cache_key))
+        if entry is not None:
+            result, size, timestamp_str, expires_at = entry
+            timestamp = datetime.fromisoformat(timestamp_str)
+            if self._is_fresh(timestamp, expires_at, max_age_hours, namespace):
+                self._count("sqlite", "hits")
+                self._touch(cache_key)
+                self.memory.put(cache_key, (result, timestamp, expires_at, size), size)
+                return result, size, "hits"
+            stale = True
+        self._count("sqlite", "misses")
+        return None, 0, "expired" if stale else "misses"
+
+    def _is_fresh(
+        self,
+        timestamp: datetime,
+        expires_at: Optional[str],
+        max_age_hours: Optional[float],
+        namespace: str,
+    ) -> bool:
+        now = datetime.utcnow()
+        if expires_at is not None:
+            if now.isoformat() > expires_at:
+                return False
+            if max_age_hours is None:
+                return True
+        elif max_age_hours is None:
+            max_age_hours = self.ttl_for(namespace)
+        if math.isinf(max_age_hours):
+            return True
+        return now - timestamp <= timedelta(hours=max_age_hours)
+
+    def _read_entry(
+        self, conn: sqlite3.Connection, cache_key: str
+    ) -> Optional[tuple[Any, int, str, Optional[str]]]:
+        """Reads and reassembles one entry:
+        ``(result, size, timestamp, expires_at)``."""
+        # One read transaction, so gc cannot drop chunks between the queries.
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute(
+                "SELECT result_json, timestamp, expires_at FROM cache "
+                "WHERE cache_key=?",
+                (cache_key,),
+            ).fetchone()
+            if row is None:
+                return None
+            stored_json, timestamp, expires_at = row
+            stored = json.loads(stored_json)
+            if blobs.BLOB_MARKER not in stored_json:
+                return stored, len(stored_json), timestamp, expires_at
+            digests = sorted(set(blobs.referenced_digests(stored)))
+            placeholders = ", ".join("?" * len(digests))
+            chunks = {
+                digest: blobs.decompress(data, codec).decode()
+                for digest, codec, data in conn.execute(
+                    "SELECT digest, codec, data FROM blobs "
+                    f"WHERE digest IN ({placeholders})",
+                    digests,
+                )
+            }
+        finally:
+            conn.execute("COMMIT")
+        try:
+            result = blobs.decode_value(stored, chunks)
+        except KeyError:
+            return None  # a chunk went missing; treat as a miss
+        size = len(stored_json) + sum(map(len, chunks.values()))
+        return result, size, timestamp, expires_at
+
+    def _count(self, tier: str, outcome: str) -> None:
+        with self._lock:
+            counts = self.tier_stats[tier]
+            setattr(counts, outcome, getattr(counts, outcome) + 1)
+
+    def _record(self, namespace: str, **counts: Any) -> None:
+        delta = NamespaceStats(**counts)
+        with self._lock:
+            self.namespace_stats.setdefault(namespace, NamespaceStats()).add(delta)
+            self._stat_deltas.setdefault(namespace, NamespaceStats()).add(delta)
+            self._schedule_flush(ACCESS_FLUSH_INTERVAL)
+
+    def _touch(self, cache_key: str) -> None:
+        # Access bookkeeping rides along with the next batched commit.
+        with self._lock:
+            hits, _ = self._touched.get(cache_key, (0, ""))
+            self._touched[cache_key] = (hits + 1, datetime.utcnow().isoformat())
+            self._schedule_flush(ACCESS_FLUSH_INTERVAL)
+
+    def set(
+        self,
+        cache_key: str,
+        result: dict[str, Any],
+        namespace: str = DEFAULT_NAMESPACE,
+        ttl_hours: Optional[float] = None,
+    ) -> None:
+        """Stores ``result``. ``ttl_hours`` gives this entry its own lifetime
+        (``math.inf`` for one that never expires) in place of the namespace's.
+        """
+        now = datetime.utcnow()
+        expires_at = None
+        if ttl_hours is not None:
+            if math.isinf(ttl_hours):
+                expires_at = NEVER_EXPIRES
+            else:
+                expires_at = (now + timedelta(hours=ttl_hours)).isoformat()
+        result_json = json.dumps(result)
+        row = (result_json, now.isoformat(), namespace, expires_at)
+        self._check_fork()
+        # Round-trip so the memory tier never aliases the caller's object.
+        size = len(result_json)
+        entry = (json.loads(result_json), now, expires_at, size)
+        self.memory.put(cache_key, entry, size)
+        with self._lock:
+            self._pending[cache_key] = row
+            self._schedule_flush()
+        self._record(namespace, sets=1, bytes_written=size)
+
+    def delete(self, cache_key: str) -> None:
+        """Removes an entry from every tier."""
+        self._check_fork()
+        # Waits for a flush in progress, which may be writing this very key.
+        with self._flush_lock:
+            self.memory.discard(cache_key)
+            with self._lock:
+                self._pending.pop(cache_key, None)
+                self._touched.pop(cache_key, None)
+            self._delete_keys([cache_key])
+
+    def _schedule_flush(self, delay: Optional[float] = None) -> None:
+        # Called with ``_lock`` held. A timer due sooner is kept; one due
+        # later is replaced, so writes are never held back by bookkeeping.
+        if delay is None:
+            delay = self.commit_interval
+        due = time.monotonic() + delay
+        if self._timer is not None:
+            if self._timer_due <= due:
+                return
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._flush_in_background)
+        self._timer.daemon = True
+        self._timer_due = due
+        self._timer.start()
+
+    def flush(self) -> None:
+        """Commits all buffered writes in one transaction."""
+        self._check_fork()
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                pending, self._pending = self._pending, {}
+                touched, self._touched = self._touched, {}
+                stat_deltas, self._stat_deltas = self._stat_deltas, {}
+                self._flushing = pending
+            if not pending and not touched and not stat_deltas:
+                return
+            touches = [(hits, last, key) for key, (hits, last) in touched.items()]
+            # Chunking and compression happen here, off the caller's thread
+            # and outside the write transaction.
+            entries = []
+            chunks: dict[str, str] = {}
+            for key, (result_json, timestamp, namespace, expires_at) in pending.items():
+                stored_json, entry_chunks = blobs.encode_result(json.loads(result_json))
+                chunks.update(entry_chunks)
+                row = (key, stored_json, timestamp, namespace, expires_at)
+                entries.append((*row, list(entry_chunks)))
+            codec = blobs.default_codec()
+            stored_sizes = self._with_retry(lambda conn: self._blob_sizes(conn, chunks))
+            compressed = {
+                digest: blobs.compress(text.encode(), codec)
+                for digest, text in chunks.items()
+                if digest not in stored_sizes
+            }
+
+            def write(conn: sqlite3.Connection) -> None:
+                # Chunks seen earlier may have been collected since; re-check
+                # inside the transaction.
+                present = self._blob_sizes(conn, chunks)
+                for digest in chunks.keys() - present.keys() - compressed.keys():
+                    compressed[digest] = blobs.compress(chunks[digest].encode(), codec)
+                new_blobs = [
+                    (digest, codec, compressed[digest], len(chunks[digest]))
+                    for digest in chunks.keys() - present.keys()
+                ]
+                conn.executemany(
+                    "INSERT OR IGNORE INTO blobs (digest, codec, data, size) "
+                    "VALUES (?, ?, ?, ?)",
+                    new_blobs,
+                )
+                sizes = {**present, **{d: len(data) for d, _, data, _ in new_blobs}}
+                rows = []
+                for key, stored, ts, ns, exp, digests in entries:
+                    size = len(stored) + sum(sizes[d] for d in digests)
+                    rows.append((key, stored, ts, ns, exp, ts, size))
+                conn.executemany(
+                    "REPLACE INTO cache (cache_key, result_json, timestamp, namespace, "
+                    "expires_at, last_access, hits, size_bytes)"
+                    " VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+                    rows,
+                )
+                conn.executemany(
+                    "DELETE FROM cache_blobs WHERE cache_key = ?",
+                    [(entry[0],) for entry in entries],
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO cache_blobs (cache_key, digest) "
+                    "VALUES (?, ?)",
+                    [(entry[0], d) for entry in entries for d in entry[5]],
+                )
+                conn.executemany(
+                    "UPDATE cache SET hits = hits + ?, last_access = ? "
+                    "WHERE cache_key = ?",
+                    touches,
+                )
+                self._write_stats(conn, stat_deltas)
+
+            try:
+                self._transaction(write)
+            except BaseException:
+                with self._lock:
+                    # Keep the writes for the next flush unless superseded,
+                    # and the access counts on top of those since gathered.
+                    self._pending = {**pending, **self._pending}
+                    for key, (hits, last) in touched.items():
+                        newer_hits, newer_last = self._touched.get(key, (0, ""))
+                        self._touched[key] = (hits + newer_hits, max(last, newer_last))
+                    for namespace, delta in stat_deltas.items():
+                        stats = self._stat_deltas.setdefault(
+                            namespace, NamespaceStats()
+                        )
+                        stats.add(delta)
+                    self._schedule_flush()
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    @staticmethod
+    def _blob_sizes(
+        conn: sqlite3.Connection, chunks: dict[str, str]
+    ) -> dict[str, int]:
+        """Compressed sizes of the chunks among ``chunks`` already stored."""
+        digests = list(chunks)
+        sizes: dict[str, int] = {}
+        for start in range(0, len(digests), GC_BATCH_SIZE):
+            batch = digests[start : start + GC_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            sizes.update(
+                conn.execute(
+                    "SELECT digest, length(data) FROM blobs "
+                    f"WHERE digest IN ({placeholders})",
+                    batch,
+                )
+            )
+        return sizes
+
+    @staticmethod
+    def _write_stats(
+        conn: sqlite3.Connection, deltas: dict[str, NamespaceStats]
+    ) -> None:
+        columns = ", ".join(_STATS_COLUMNS)
+        updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in _STATS_COLUMNS)
+        placeholders = ", ".join("?" * (len(_STATS_COLUMNS) + 2))
+        since = datetime.utcnow().isoformat()
+        conn.executemany(
+            f"INSERT INTO cache_stats (namespace, {columns}, since) "
+            f"VALUES ({placeholders})"
+            f" ON CONFLICT(namespace) DO UPDATE SET {updates}",
+            [
+                (namespace, *(getattr(delta, c) for c in _STATS_COLUMNS), since)
+                for namespace, delta in deltas.items()
+            ],
         )
-        self.conn.commit()
+
+    def persisted_stats(self) -> dict[str, NamespaceStats]:
+        """Counters per namespace accumulated by every process using this
+        file, including this one's buffered counts."""
+        self.flush()
+        columns = ", ".join(_STATS_COLUMNS)
+        return {
+            row[0]: NamespaceStats(*row[1:])
+            for row in self._connection().execute(
+                f"SELECT namespace, {columns} FROM cache_stats ORDER BY namespace"
+            )
+        }
+
+    def stats_since(self) -> Optional[str]:
+        """When counting started, i.e. the oldest ``cache_stats`` row."""
+        (since,) = self._connection().execute(
+            "SELECT MIN(since) FROM cache_stats"
+        ).fetchone()
+        return since
+
+    def reset_stats(self) -> None:
+        self.flush()
+        self._transaction(lambda conn: conn.execute("DELETE FROM cache_stats"))
+
+    def inventory(self) -> dict[str, dict[str, int]]:
+        """Entry count and stored bytes per namespace."""
+        return {
+            namespace: {"entries": entries, "bytes": size}
+            for namespace, entries, size in self._connection().execute(
+                "SELECT namespace, COUNT(*), COALESCE(SUM(size_bytes), 0) FROM cache"
+                " GROUP BY namespace ORDER BY namespace"
+            )
+        }
+
+    def top_entries(self, limit: int = 10) -> list[dict[str, Any]]:
+        """The most frequently read entries, candidates for pre-warming."""
+        self.flush()
+        columns = ("cache_key", "namespace", "hits", "size_bytes", "last_access")
+        return [
+            dict(zip(columns, row))
+            for row in self._connection().execute(
+                f"SELECT {', '.join(columns)} FROM cache WHERE hits > 0"
+                " ORDER BY hits DESC LIMIT ?",
+                (limit,),
+            )
+        ]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Hit/miss counters per tier, plus the memory tier's occupancy."""
+        stats = {
+            tier: {**asdict(counts), "hit_rate": counts.hit_rate}
+            for tier, counts in self.tier_stats.items()
+        }
+        stats["memory"].update(entries=len(self.memory), bytes=self.memory.size_bytes)
+        return stats
+
+    def file_size(self) -> int:
+        """Bytes the database and its write-ahead log occupy on disk."""
+        paths = [Path(self.db_path), Path(f"{self.db_path}-wal")]
+        return sum(path.stat().st_size for path in paths if path.exists())
+
+    def gc(
+        self,
+        max_bytes: Optional[int] = None,
+        policy: str = "lru",
+        vacuum: bool = False,
+    ) -> GCReport:
+        """Deletes expired entries, evicts down to ``max_bytes`` of cached
+        payload using ``policy`` (``lru`` or ``lfu``) and compacts the file.
+        Namespaces listed in ``namespace_max_bytes`` are first trimmed to
+        their own caps.
+
+        Deletions run in small transactions and compaction is incremental, so
+        readers are never blocked. ``vacuum=True`` instead rewrites the whole
+        file once, which blocks writers but also enables incremental
+        compaction on databases created before it existed.
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction policy '{policy}'; "
+                f"expected one of {sorted(EVICTION_POLICIES)}"
+            )
+        self.flush()
+        report = GCReport(file_bytes_before=self.file_size())
+        conn = self._connection()
+        now = datetime.utcnow()
+
+        namespaces = [
+            row[0] for row in conn.execute("SELECT DISTINCT namespace FROM cache")
+        ]
+        for namespace in namespaces:
+            ttl = self.ttl_for(namespace)
+            if math.isinf(ttl):
+                continue
+            cutoff = (now - timedelta(hours=ttl)).isoformat()
+            expired = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT cache_key FROM cache WHERE namespace = ? AND timestamp < ?"
+                    " AND expires_at IS NULL",
+                    (namespace, cutoff),
+                )
+            ]
+            report.expired += self._delete_keys(expired)
+        expired = [
+            row[0]
+            for row in conn.execute(
+                "SELECT cache_key FROM cache WHERE expires_at < ?", (now.isoformat(),)
+            )
+        ]
+        report.expired += self._delete_keys(expired)
+
+        for namespace, cap in self.namespace_max_bytes.items():
+            report.evicted += self._evict(cap, policy, namespace)
+        if max_bytes is not None:
+            report.evicted += self._evict(max_bytes, policy)
+
+        report.blobs = self._delete_orphan_blobs()
+        self._compact(vacuum)
+        report.file_bytes_after = self.file_size()
+        return report
+
+    def _evict(
+        self, max_bytes: int, policy: str, namespace: Optional[str] = None
+    ) -> int:
+        conn = self._connection()
+        where, params = ("WHERE namespace = ?", (namespace,)) if namespace else ("", ())
+        (total,) = conn.execute(
+            f"SELECT COALESCE(SUM(size_bytes), 0) FROM cache {where}", params
+        ).fetchone()
+        excess = total - max_bytes
+        victims = []
+        if excess > 0:
+            order = EVICTION_POLICIES[policy]
+            for key, size in conn.execute(
+                f"SELECT cache_key, size_bytes FROM cache {where} ORDER BY {order}",
+                params,
+            ):
+                if excess <= 0:
+                    break
+                victims.append(key)
+                excess -= size or 0
+        return self._delete_keys(victims)
+
+    def _delete_keys(self, keys: list[str]) -> int:
+        deleted = 0
+        for start in range(0, len(keys), GC_BATCH_SIZE):
+            batch = keys[start : start + GC_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+
+            def delete(conn: sqlite3.Connection) -> int:
+                conn.execute(
+                    f"DELETE FROM cache_blobs WHERE cache_key IN ({placeholders})",
+                    batch,
+                )
+                for table, key_column in conn.execute(
+                    "SELECT name, key_column FROM cache_tables "
+                    "WHERE key_column IS NOT NULL"
+                ).fetchall():
+                    conn.execute(
+                        f"DELETE FROM {table} WHERE {key_column} IN ({placeholders})",
+                        batch,
+                    )
+                return conn.execute(
+                    f"DELETE FROM cache WHERE cache_key IN ({placeholders})", batch
+                ).rowcount
+
+            deleted += self._transaction(delete)
+            for key in batch:
+                self.memory.discard(key)
+        return deleted
+
+    def _delete_orphan_blobs(self) -> int:
+        orphans = [
+            row[0]
+            for row in self._connection().execute(
+                "SELECT digest FROM blobs WHERE NOT EXISTS "
+                "(SELECT 1 FROM cache_blobs WHERE cache_blobs.digest = blobs.digest)"
+            )
+        ]
+        deleted = 0
+        for start in range(0, len(orphans), GC_BATCH_SIZE):
+            batch = orphans[start : start + GC_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            # Re-checked inside the transaction: a concurrent flush may have
+            # started referencing the chunk again.
+            deleted += self._transaction(
+                lambda conn: conn.execute(
+                    f"DELETE FROM blobs WHERE digest IN ({placeholders}) "
+                    "AND NOT EXISTS (SELECT 1 FROM cache_blobs "
+                    "WHERE cache_blobs.digest = blobs.digest)",
+                    batch,
+                ).rowcount
+            )
+        return deleted
+
+    def _compact(self, vacuum: bool) -> None:
+        conn = self._connection()
+        if vacuum:
+            self._with_retry(lambda c: c.execute("VACUUM"))
+        else:
+            (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+            previous = None
+            while mode == 2:  # INCREMENTAL
+                (free,) = conn.execute("PRAGMA freelist_count").fetchone()
+                if not free or free == previous:
+                    break
+                previous = free
+                self._with_retry(
+                    lambda c: c.execute("PRAGMA incremental_vacuum(256)").fetchall()
+                )
+        # Fold the WAL back into the database and truncate it; waits for, but
+        # never blocks, active readers.
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+    def start_background_gc(
+        self,
+        interval: float,
+        max_bytes: Optional[int] = None,
+        policy: str = "lru",
+    ) -> None:
+        """Runs :meth:`gc` every ``interval`` seconds on a daemon thread."""
+        stop = self._gc_stop = threading.Event()
+
+        def loop() -> None:
+            while not stop.wait(interval):
+                try:
+                    report = self.gc(max_bytes=max_bytes, policy=policy)
+                except sqlite3.Error as e:
+                    typer.secho(
+                        f"[WARN] Result cache gc failed: {e}", fg=typer.colors.YELLOW
+                    )
+                    continue
+                if report.removed:
+                    typer.secho(
+                        f"[INFO] Result cache gc: {report.summary()}",
+                        fg=typer.colors.CYAN,
+                    )
+
+        threading.Thread(target=loop, name="cache-gc", daemon=True).start()
+
+    def _flush_in_background(self) -> None:
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            typer.secho(
+                f"[WARN] Result cache flush failed, will retry: {e}",
+                fg=typer.colors.YELLOW,
+            )
+
+    def close(self) -> None:
+        """Stops background gc, flushes buffered writes and closes every connection."""
+        if self._gc_stop is not None:
+            self._gc_stop.set()
+        self.flush()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+def _flush_at_exit(cache_ref: "weakref.ref[ResultCache]") -> None:
+    cache = cache_ref()
+    if cache is not None and cache._pid == os.getpid():
+        cache._flush_in_background()
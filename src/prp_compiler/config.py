@@ -1,3 +1,4 @@
+import math
 import os
 from pathlib import Path
 
@@ -15,6 +16,19 @@ DEFAULT_TOOLS_PATH = PROJECT_ROOT / "agent_primitives/actions"
 DEFAULT_KNOWLEDGE_PATH = PROJECT_ROOT / "agent_primitives/knowledge"
 DEFAULT_SCHEMAS_PATH = PROJECT_ROOT / "agent_primitives/schemas"
 DEFAULT_MANIFEST_PATH = PROJECT_ROOT / "manifests/"
+# Socket the compile daemon listens on, relative to the working directory.
+DEFAULT_DAEMON_SOCKET = Path("prp_compiler.sock")
+# Default lifetime in hours of result-cache entries per namespace.
+DEFAULT_CACHE_TTL_HOURS = {
+    "default": 24.0,
+    "run": 24.0,
+    "action": 24.0,
+    "llm": 24.0 * 7,
+    "checkpoint": 24.0,
+}
+# Embedding cache shared by knowledge builds and queries; PRP_EMBEDDING_CACHE
+# overrides the path, or disables the cache when set to "off".
+DEFAULT_EMBEDDING_CACHE = Path("embedding_cache.sqlite")
 # Allowed shell commands for dynamic content resolution.
 ALLOWED_SHELL_COMMANDS = ["echo", "ls"]
 
@@ -54,6 +68,138 @@ def get_model_name(role: str) -> str:
     return model_name or "models/gemini-1.5-pro-latest"
 
 
+def get_rate_limits(role: str) -> dict:
+    """
+    Returns the client-side rate limits for a model role.
+
+    Read from ``PRP_<ROLE>_RPM``, ``PRP_<ROLE>_TPM`` and
+    ``PRP_<ROLE>_MAX_CONCURRENCY`` (e.g. ``PRP_PLANNER_RPM=15``). Unset RPM/TPM
+    limits are not enforced; concurrency still adapts to 429/503 responses.
+
+    Args:
+        role: The role of the model (e.g., "planner", "synthesizer", "embedding").
+    """
+    prefix = f"PRP_{role.upper()}_"
+
+    def _number(name: str, default=None):
+        value = os.environ.get(prefix + name)
+        if not value:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f"{prefix + name} must be a number, got {value!r}")
+
+    max_concurrency = int(_number("MAX_CONCURRENCY", 16))
+    return {
+        "rpm": _number("RPM"),
+        "tpm": _number("TPM"),
+        "max_concurrency": max_concurrency,
+        "initial_concurrency": min(4, max_concurrency),
+    }
+
+
+def get_cache_ttls() -> dict:
+    """
+    Returns the result-cache TTL in hours for each namespace.
+
+    ``PRP_CACHE_TTL_<NAMESPACE>`` (e.g. ``PRP_CACHE_TTL_ACTION=6``) overrides
+    the defaults or adds a TTL for another namespace; ``inf`` keeps that
+    namespace's entries until they are evicted.
+    """
+    ttls = dict(DEFAULT_CACHE_TTL_HOURS)
+    prefix = "PRP_CACHE_TTL_"
+    for name, value in os.environ.items():
+        if name.startswith(prefix) and value:
+            try:
+                hours = float(value)
+            except ValueError:
+                hours = math.nan
+            if math.isnan(hours) or hours < 0:
+                raise ValueError(f"{name} must be a number of hours, got {value!r}")
+            ttls[name[len(prefix):].lower()] = hours
+    return ttls
+
+
+def get_cache_max_bytes():
+    """Returns the result-cache size cap from ``PRP_CACHE_MAX_MB``, or ``None``."""
+    value = os.environ.get("PRP_CACHE_MAX_MB")
+    if not value:
+        return None
+    try:
+        return int(float(value) * 1024 * 1024)
+    except ValueError:
+        raise ValueError(f"PRP_CACHE_MAX_MB must be a number, got {value!r}")
+
+
+def get_cache_namespace_caps() -> dict:
+    """
+    Returns per-namespace result-cache size caps in bytes, read from
+    ``PRP_CACHE_MAX_MB_<NAMESPACE>`` (e.g. ``PRP_CACHE_MAX_MB_LLM=256``).
+    """
+    caps = {}
+    prefix = "PRP_CACHE_MAX_MB_"
+    for name, value in os.environ.items():
+        if name.startswith(prefix) and value:
+            try:
+                caps[name[len(prefix):].lower()] = int(float(value) * 1024 * 1024)
+            except ValueError:
+                raise ValueError(f"{name} must be a number, got {value!r}")
+    return caps
+
+
+def get_embedding_cache_path():
+    """Returns the embedding cache file, or ``None`` if ``PRP_EMBEDDING_CACHE=off``."""
+    value = os.environ.get("PRP_EMBEDDING_CACHE")
+    if not value:
+        return DEFAULT_EMBEDDING_CACHE
+    if value.lower() in ("off", "0", "false", "no"):
+        return None
+    return Path(value)
+
+
+def llm_cache_enabled() -> bool:
+    """Whether model responses are memoized in the result cache (``PRP_LLM_CACHE``)."""
+    return os.environ.get("PRP_LLM_CACHE", "").lower() in ("1", "true", "yes")
+
+
+def get_semantic_cache_threshold():
+    """
+    Returns the cosine similarity at which a new goal reuses an earlier run,
+    from ``PRP_SEMANTIC_CACHE_THRESHOLD`` (e.g. ``0.92``), or ``None`` when
+    the semantic cache is off.
+    """
+    value = os.environ.get("PRP_SEMANTIC_CACHE_THRESHOLD")
+    if not value:
+        return None
+    try:
+        threshold = float(value)
+    except ValueError:
+        raise ValueError(
+            f"PRP_SEMANTIC_CACHE_THRESHOLD must be a number, got {value!r}"
+        )
+    if not 0 < threshold <= 1:
+        raise ValueError("PRP_SEMANTIC_CACHE_THRESHOLD must be in (0, 1]")
+    return threshold
+
+
+def get_retrieval_mode() -> str:
+    """
+    Returns how the knowledge store ranks chunks, from ``PRP_RETRIEVAL_MODE``:
+    ``hybrid`` (default; BM25 and vector rankings fused), ``vector`` or
+    ``lexical``.
+    """
+    from .lexical import RETRIEVAL_MODES
+
+    mode = os.environ.get("PRP_RETRIEVAL_MODE") or "hybrid"
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(
+            f"PRP_RETRIEVAL_MODE must be one of {', '.join(RETRIEVAL_MODES)}, "
+            f"got {mode!r}"
+        )
+    return mode
+
+
 def configure_gemini():
     """Loads the Gemini API key and configures the genai library."""
     if not genai:
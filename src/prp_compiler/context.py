@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Any, Dict, List
 
 from .models import Action, ReActStep, Thought
+from .ratelimit import estimate_tokens, get_rate_limiter
 
 import tiktoken
 
@@ -38,6 +39,10 @@ class ContextManager:
         """Returns the history as serializable dictionaries."""
         return [step.model_dump() for step in self.history]
 
+    def restore_history(self, entries: List[Dict[str, Any]]) -> None:
+        """Replaces the history with steps from :meth:`get_structured_history`."""
+        self.history = [ReActStep.model_validate(entry) for entry in entries]
+
     def _current_token_count(self) -> int:
         return len(self._tokenizer.encode(self.get_history_str()))
 
@@ -51,7 +56,10 @@ class ContextManager:
                 "Summarize the following conversation history into a concise paragraph:\n\n"
                 + self.get_history_str(to_summarize)
             )
-            response = self.model.generate_content(summary_prompt)
+            limiter = get_rate_limiter("summarizer")
+            with limiter.limit(estimate_tokens(summary_prompt)) as slot:
+                response = self.model.generate_content(summary_prompt)
+                slot.settle(response)
             summary = response.text
             summary_step = ReActStep(
                 thought=Thought(
@@ -0,0 +1,176 @@
+"""Long-lived compile daemon and the client ``compile`` uses to reach it.
+
+The daemon keeps a :class:`~prp_compiler.service.CompilerRuntime` warm and
+answers newline-delimited JSON requests on a local Unix socket::
+
+    {"goal": "...", "out": "/abs/path.json", "strategy": null, "config": {...}}
+    -> {"ok": true, "output": "/abs/path.json"}
+    -> {"ok": false, "error": "..."}
+
+``config`` holds the client's primitives, knowledge store, cache and
+constitution settings (see :meth:`CompilerRuntime.settings`). A daemon that
+was started with different ones refuses the request with ``"mismatch":
+true``, and the client compiles in-process instead.
+
+A ``{"op": "ping"}`` request returns the daemon's pid.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import signal
+import socket
+from pathlib import Path
+from typing import Any
+
+import typer
+
+from .service import CompilerRuntime
+
+# Seconds to wait for the daemon to accept a connection, and by default for
+# it to answer a compile request.
+DAEMON_CONNECT_TIMEOUT = 2.0
+DEFAULT_DAEMON_TIMEOUT = 900.0
+
+
+def _mismatched(runtime: CompilerRuntime, config: dict | None) -> list[str]:
+    """The settings in which the client's ``config`` differs from the daemon's."""
+    settings = getattr(runtime, "settings", None)
+    if not config or settings is None:
+        return []
+    return sorted(name for name, value in config.items() if settings.get(name) != value)
+
+
+async def _handle_client(
+    runtime: CompilerRuntime,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    try:
+        line = await reader.readline()
+        request = json.loads(line)
+        if request.get("op") == "ping":
+            reply: dict[str, Any] = {"ok": True, "pid": os.getpid()}
+        elif _mismatched(runtime, request.get("config")):
+            reply = {
+                "ok": False,
+                "mismatch": True,
+                "error": "daemon was started with different "
+                + ", ".join(_mismatched(runtime, request["config"])),
+            }
+        else:
+            typer.echo(f"Daemon compiling: {request['goal']}")
+            output = await runtime.acompile(
+                request["goal"], Path(request["out"]), request.get("strategy")
+            )
+            reply = {"ok": True, "output": str(output)}
+    except Exception as e:
+        reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    writer.write(json.dumps(reply).encode() + b"\n")
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_daemon(
+    runtime: CompilerRuntime,
+    socket_path: Path,
+    stop: asyncio.Event | None = None,
+) -> None:
+    """Serves compile requests on ``socket_path`` until ``stop`` is set.
+
+    Without an explicit ``stop`` event the daemon runs until SIGINT or SIGTERM.
+    """
+    if socket_path.exists():
+        if ping(socket_path) is not None:
+            raise RuntimeError(f"A daemon is already listening on {socket_path}")
+        socket_path.unlink()  # stale socket left by a crashed daemon
+
+    server = await asyncio.start_unix_server(
+        lambda r, w: _handle_client(runtime, r, w), path=str(socket_path)
+    )
+    if stop is None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+    typer.echo(f"Daemon listening on {socket_path} (pid {os.getpid()})")
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        socket_path.unlink(missing_ok=True)
+        typer.echo("Daemon stopped.")
+
+
+def _request(
+    socket_path: Path, payload: dict, connect_timeout: float, read_timeout: float
+) -> dict | None:
+    """Sends one request; returns ``None`` if no daemon is listening.
+
+    Raises ``TimeoutError`` if the daemon accepts the request but does not
+    answer within ``read_timeout`` seconds.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(connect_timeout)
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            # Missing, stale, foreign or unreachable socket: no usable daemon.
+            return None
+        sock.settimeout(read_timeout)
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        with sock.makefile("rb") as stream:
+            line = stream.readline()
+    return json.loads(line) if line else None
+
+
+def ping(socket_path: Path, timeout: float = 1.0) -> int | None:
+    """Returns the pid of the daemon on ``socket_path``, or ``None``."""
+    try:
+        reply = _request(socket_path, {"op": "ping"}, timeout, timeout)
+    except OSError:
+        return None
+    return reply.get("pid") if reply else None
+
+
+def request_compile(
+    socket_path: Path,
+    goal: str,
+    output_file: Path,
+    strategy: str | None = None,
+    config: dict | None = None,
+    timeout: float = DEFAULT_DAEMON_TIMEOUT,
+) -> dict | None:
+    """Asks a running daemon to compile ``goal`` into ``output_file``.
+
+    Returns the daemon's reply, or ``None`` when no daemon is running or it
+    was started with settings other than ``config``, so the caller can
+    compile in-process instead.
+    """
+    if not socket_path.exists():
+        return None
+    try:
+        reply = _request(
+            socket_path,
+            {
+                "goal": goal,
+                "out": str(output_file.resolve()),
+                "strategy": strategy,
+                "config": config,
+            },
+            connect_timeout=DAEMON_CONNECT_TIMEOUT,
+            read_timeout=timeout,
+        )
+    except socket.timeout:
+        raise TimeoutError(
+            f"The daemon on {socket_path} did not answer within {timeout}s"
+        )
+    if reply is not None and reply.get("mismatch"):
+        typer.secho(
+            f"Not using the daemon: {reply.get('error')}", fg=typer.colors.YELLOW
+        )
+        return None
+    return reply
@@ -0,0 +1,259 @@
+"""Wrappers around LangChain embedding models used by the knowledge store."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .ratelimit import ModelRateLimiter, estimate_tokens, get_rate_limiter
+from .resilience import RetryPolicy, call_with_retry
+
+# Texts per embedding request; the Gemini batch endpoint accepts up to 100.
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class RateLimitedEmbeddings:
+    """
+    Routes ``embed_documents``/``embed_query`` through the shared ``embedding``
+    rate limiter. Exposes the same two methods as a LangChain ``Embeddings``
+    object, so it can be handed to Chroma in place of the wrapped model.
+    """
+
+    def __init__(self, embeddings: Any, limiter: Optional[ModelRateLimiter] = None):
+        self.embeddings = embeddings
+        self.limiter = limiter or get_rate_limiter("embedding")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(estimate_tokens(text) for text in texts)
+        with self.limiter.limit(tokens):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self.limiter.limit(estimate_tokens(text)):
+            return self.embeddings.embed_query(text)
+
+
+def _print_progress(done: int, total: int, elapsed: float) -> None:
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"Embedded {done}/{total} chunks ({rate:.1f} chunks/s)")
+
+
+class BatchedEmbeddings:
+    """
+    Embeds documents in batches of ``batch_size``, with up to
+    ``max_concurrency`` batches in flight, and retries a batch that fails
+    with a transient error (see :mod:`prp_compiler.resilience`).
+
+    ``progress(done, total, elapsed_seconds)`` is called as batches finish.
+    Throughput of the last :meth:`embed_documents` call is kept in
+    ``last_seconds`` and ``last_count``.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        retry_policy: Optional[RetryPolicy] = None,
+        progress: Optional[Callable[[int, int, float], None]] = _print_progress,
+    ):
+        if batch_size < 1 or max_concurrency < 1:
+            raise ValueError("batch_size and max_concurrency must be at least 1")
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.progress = progress
+        self.last_seconds = 0.0
+        self.last_count = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        batches = [
+            texts[start : start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+        started = time.perf_counter()
+        done = 0
+        if batches:
+            workers = min(self.max_concurrency, len(batches))
+            pool = ThreadPoolExecutor(max_workers=workers)
+            try:
+                futures = {
+                    pool.submit(self._embed_batch, batch): index
+                    for index, batch in enumerate(batches)
+                }
+                for future in as_completed(futures):
+                    index = futures[future]
+                    results[index] = future.result()
+                    done += len(batches[index])
+                    if self.progress is not None:
+                        self.progress(done, len(texts), time.perf_counter() - started)
+            finally:
+                # On a failed batch, don't start the ones still queued.
+                pool.shutdown(wait=True, cancel_futures=True)
+        self.last_seconds = time.perf_counter() - started
+        self.last_count = len(texts)
+        return [vector for batch in results for vector in batch or []]
+
+    def close(self) -> None:
+        """Closes the connections the batch threads opened on an embedding
+        cache underneath; call once the build is done."""
+        if isinstance(self.embeddings, CachedEmbeddings):
+            self.embeddings.close()
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        vectors = call_with_retry(
+            lambda: self.embeddings.embed_documents(batch), self.retry_policy
+        )
+        if len(vectors) != len(batch):
+            raise ValueError(
+                f"Embedding model returned {len(vectors)} vectors "
+                f"for {len(batch)} texts"
+            )
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+class CachedEmbeddings:
+    """
+    Persists embeddings in a SQLite file, keyed by model name, kind
+    (``document`` or ``query``, which Gemini embeds differently) and the
+    SHA-256 of the text, so text embedded by an earlier build or query is
+    never sent to the model again. Only cache misses reach ``embeddings``.
+
+    Vectors are stored as float32. The file survives deleting the vector
+    store and can be shared by several processes.
+    """
+
+    def __init__(self, embeddings: Any, db_path: Path, model_name: str):
+        self.embeddings = embeddings
+        self.db_path = Path(db_path)
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (model TEXT NOT NULL, "
+            "kind TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, kind, text_hash)) WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Connections must not cross a fork.
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._connections = []
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=5.0,
+                isolation_level=None,
+                check_same_thread=False,  # only so close() can run on any thread
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Closes the connection of every thread, including pool threads that
+        have exited; the next lookup on any thread opens a new one."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _lookup(self, kind: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        conn = self._connection()
+        for start in range(0, len(unique), 500):
+            batch = unique[start : start + 500]
+            placeholders = ", ".join("?" * len(batch))
+            for text_hash, vector in conn.execute(
+                "SELECT text_hash, vector FROM embeddings "
+                f"WHERE model = ? AND kind = ? AND text_hash IN ({placeholders})",
+                (self.model_name, kind, *batch),
+            ):
+                found[text_hash] = np.frombuffer(vector, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, kind: str, vectors: Dict[str, List[float]]) -> None:
+        rows = [
+            (
+                self.model_name,
+                kind,
+                text_hash,
+                np.asarray(vector, dtype=np.float32).tobytes(),
+            )
+            for text_hash, vector in vectors.items()
+        ]
+        conn = self._connection()
+        # The connection autocommits; without a transaction every row of a
+        # batch would be its own commit.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, kind, text_hash, vector) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _count(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [self._hash(text) for text in texts]
+        found = self._lookup("document", hashes)
+        missing = {h: text for h, text in zip(hashes, texts) if h not in found}
+        self._count(len(texts) - len(missing), len(missing))
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self._store("document", computed)
+            found.update(computed)
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        text_hash = self._hash(text)
+        found = self._lookup("query", [text_hash])
+        if text_hash in found:
+            self._count(1, 0)
+            return found[text_hash]
+        self._count(0, 1)
+        vector = self.embeddings.embed_query(text)
+        self._store("query", {text_hash: vector})
+        return vector
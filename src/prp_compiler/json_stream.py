@@ -0,0 +1,105 @@
+"""Incremental parsing and validation of a JSON object streamed in chunks."""
+
+import json
+from typing import Any, List, Optional, Tuple
+
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+
+class IncrementalJSONObjectParser:
+    """
+    Scans streamed text for a single JSON object and returns each top-level
+    member as soon as its value closes.
+
+    Text before the opening brace (markdown fences, a leading ``json`` tag,
+    chatter) and anything after the closing brace is ignored, mirroring
+    ``BaseAgent._clean_json_response``.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start: Optional[int] = None
+        self.complete = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consumes ``text`` and returns the members that closed within it.
+
+        Raises ``ValueError`` when a closed member is not valid JSON.
+        """
+        if self.complete:
+            return []
+        if self._member_start is None:
+            # Still waiting for the opening brace; drop the preamble.
+            start = text.find("{")
+            if start == -1:
+                return []
+            text = text[start:]
+        self._buffer += text
+
+        members: List[Tuple[str, Any]] = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._member_start is None:
+                    self._member_start = i + 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(buffer[self._member_start : i], members)
+                    self.complete = True
+                    break
+            elif char == "," and self._depth == 1:
+                self._emit(buffer[self._member_start : i], members)
+                self._member_start = i + 1
+        self._pos = len(buffer)
+        return members
+
+    def _emit(self, member_text: str, members: List[Tuple[str, Any]]) -> None:
+        if not member_text.strip():
+            return
+        try:
+            member = json.loads("{" + member_text + "}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Malformed JSON member: {e}") from e
+        members.extend(member.items())
+
+
+class PropertyValidator:
+    """Validates top-level members of an object against their subschemas."""
+
+    def __init__(self, schema: dict):
+        validator_cls = validator_for(schema)
+        self._validator = validator_cls(schema)
+        self._properties = schema.get("properties", {})
+        self._additional = schema.get("additionalProperties", True)
+
+    def check(self, key: str, value: Any) -> Optional[str]:
+        """Returns a description of the first violation, or ``None``."""
+        subschema = self._properties.get(key)
+        if subschema is None:
+            if self._additional is False:
+                return f"Additional property '{key}' is not allowed"
+            if not isinstance(self._additional, dict):
+                return None
+            subschema = self._additional
+        error = best_match(self._validator.evolve(schema=subschema).iter_errors(value))
+        if error is None:
+            return None
+        return f"Property '{key}': {error.message}"
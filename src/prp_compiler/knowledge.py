@@ -1,7 +1,21 @@
+import hashlib
+import json
 import os
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Protocol
 
+import numpy as np
+
+from .embeddings import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+    BatchedEmbeddings,
+    CachedEmbeddings,
+    RateLimitedEmbeddings,
+)
+from .lexical import LEXICAL_INDEX_FILE, BM25Index, hybrid_retrieve
+
 try:
     from langchain.text_splitter import MarkdownHeaderTextSplitter
     from langchain_community.embeddings import FakeEmbeddings
@@ -14,13 +28,168 @@ except Exception:  # pragma: no cover - allow minimal test environment
     GoogleGenerativeAIEmbeddings = object  # type: ignore
 
 
+# Chunk IDs in the persisted store, so rebuilds only embed what changed.
+CHUNK_MANIFEST_FILE = "chunk_manifest.json"
+# Files of the NumPy backend: unit-length float32 rows, and the chunk (ID,
+# text, metadata) of each row.
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.json"
+# Values of the CLI's ``--vector-backend`` option.
+VECTOR_BACKENDS = ("chroma", "numpy")
+MARKDOWN_HEADERS = [
+    ("#", "Header 1"),
+    ("##", "Header 2"),
+    ("###", "Header 3"),
+]
+
+
+@dataclass
+class BuildReport:
+    added: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    embed_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.added / self.embed_seconds if self.embed_seconds else 0.0
+
+    def summary(self) -> str:
+        summary = (
+            f"{self.added} chunks embedded, {self.deleted} removed, "
+            f"{self.unchanged} unchanged"
+        )
+        if self.added and self.embed_seconds:
+            summary += f" ({self.chunks_per_second:.1f} chunks/s)"
+        return summary
+
+
+def chunk_id(
+    name: str, version: str, path: str, content: str, occurrence: int = 0
+) -> str:
+    """Stable ID of a chunk: primitive name and version, file path relative
+    to the primitive and a hash of the chunk's content. ``occurrence``
+    tells apart identical chunks of one file."""
+    content_hash = hashlib.sha256(content.encode()).hexdigest()
+    key = "\x1f".join([name, version, path, content_hash, str(occurrence)])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def split_knowledge(knowledge_primitives: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Splits every ``chunks/*.md`` file of the primitives at Markdown
+    headers and returns the chunks (LangChain documents) by chunk ID."""
+    markdown_splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=MARKDOWN_HEADERS
+    )
+    chunks: Dict[str, Any] = {}
+    for primitive in knowledge_primitives:
+        chunks_path = Path(primitive["base_path"]) / "chunks"
+        if not chunks_path.is_dir():
+            continue
+        name = primitive.get("name", chunks_path.parent.parent.name)
+        version = str(primitive.get("version", ""))
+        for md_file in sorted(chunks_path.rglob("*.md")):
+            relative = md_file.relative_to(chunks_path).as_posix()
+            seen: Dict[str, int] = {}
+            for doc in markdown_splitter.split_text(md_file.read_text()):
+                metadata = json.dumps(doc.metadata, sort_keys=True)
+                fingerprint = doc.page_content + metadata
+                occurrence = seen.get(fingerprint, 0)
+                seen[fingerprint] = occurrence + 1
+                doc_id = chunk_id(name, version, relative, fingerprint, occurrence)
+                doc.metadata = {
+                    **doc.metadata,
+                    "primitive": name,
+                    "version": version,
+                    "source": relative,
+                    "chunk_id": doc_id,
+                }
+                chunks[doc_id] = doc
+    return chunks
+
+
+def _read_chunk_manifest(persist_directory: Path) -> Dict[str, Any] | None:
+    path = persist_directory / CHUNK_MANIFEST_FILE
+    if not path.is_file():
+        return None
+    return json.loads(path.read_text())
+
+
+def _write_chunk_manifest(persist_directory: Path, chunks: Dict[str, Any]) -> None:
+    persist_directory.mkdir(parents=True, exist_ok=True)
+    manifest = {
+        doc_id: {key: doc.metadata[key] for key in ("primitive", "version", "source")}
+        for doc_id, doc in chunks.items()
+    }
+    path = persist_directory / CHUNK_MANIFEST_FILE
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(tmp_path, path)
+
+
+def _build_lexical_index(persist_directory: Path, chunks: Dict[str, Any]) -> BM25Index:
+    """Builds and persists the BM25 index over the chunks. It is cheap to
+    build, so it is rebuilt in full rather than updated."""
+    index = BM25Index.from_documents([doc.page_content for doc in chunks.values()])
+    persist_directory.mkdir(parents=True, exist_ok=True)
+    index.save(persist_directory / LEXICAL_INDEX_FILE)
+    return index
+
+
+def _load_lexical_index(persist_directory: Path) -> BM25Index | None:
+    path = persist_directory / LEXICAL_INDEX_FILE
+    return BM25Index.load(path) if path.is_file() else None
+
+
+def _default_embeddings() -> Any:
+    """The embedding model for a knowledge store: fake embeddings when
+    ``USE_MOCK_EMBEDDINGS=true``, else Gemini behind the rate limiter and the
+    on-disk embedding cache."""
+    # WHY: Use mock embeddings for local development to avoid credential issues.
+    if os.environ.get("USE_MOCK_EMBEDDINGS") == "true":
+        print("Using mock embeddings for knowledge store.")
+        return FakeEmbeddings(size=768)
+    from .config import configure_gemini, get_embedding_cache_path, get_model_name
+    configure_gemini()
+    embedding_model_name = get_model_name("embedding")
+    print(f"Using embedding model: {embedding_model_name}")
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "GEMINI_API_KEY environment variable is not set after configure_gemini()."
+        )
+    embeddings: Any = RateLimitedEmbeddings(
+        GoogleGenerativeAIEmbeddings(
+            model=embedding_model_name,
+            google_api_key=api_key
+        )
+    )
+    # Cache hits never reach the rate limiter or the API.
+    cache_path = get_embedding_cache_path()
+    if cache_path is not None:
+        embeddings = CachedEmbeddings(embeddings, cache_path, embedding_model_name)
+    return embeddings
+
+
 class VectorStore(Protocol):
     """Simple protocol for pluggable vector stores."""
 
-    def build(self, knowledge_primitives: List[Dict[str, Any]]) -> None: ...
+    debug: bool
+
+    def build(
+        self,
+        knowledge_primitives: List[Dict[str, Any]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> BuildReport: ...
 
     def load(self) -> None: ...
 
+    def reopen(self) -> None:
+        """Replaces the handles that must not cross a fork (API clients,
+        database connections) in a forked child, keeping the loaded index."""
+        ...
+
     def retrieve(self, query: str, k: int = 5) -> List[str]: ...
 
 
@@ -31,58 +200,80 @@ class ChromaKnowledgeStore:
     """
 
     def __init__(self, persist_directory: Path):
+        from .config import get_retrieval_mode
+
         self.persist_directory = persist_directory
-        # WHY: Use mock embeddings for local development to avoid credential issues.
-        if os.environ.get("USE_MOCK_EMBEDDINGS") == "true":
-            print("Using mock embeddings for knowledge store.")
-            self.embeddings = FakeEmbeddings(size=768)
-        else:
-            from .config import configure_gemini, get_model_name
-            configure_gemini()
-            embedding_model_name = get_model_name("embedding")
-            print(f"Using embedding model: {embedding_model_name}")
-            api_key = os.environ.get("GEMINI_API_KEY")
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY environment variable is not set after configure_gemini().")
-            self.embeddings = GoogleGenerativeAIEmbeddings(
-                model=embedding_model_name,
-                google_api_key=api_key
-            )
+        self.embeddings = _default_embeddings()
+        self.retrieval_mode = get_retrieval_mode()
+        # Reports queries answered from the keyword index alone.
+        self.debug = False
         self.db: Chroma | None = None
+        self.lexical: BM25Index | None = None
 
-    def build(self, knowledge_primitives: List[Dict[str, Any]]):
+    def build(
+        self,
+        knowledge_primitives: List[Dict[str, Any]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> BuildReport:
         """
-        Builds the vector store from scratch by chunking and embedding knowledge files.
+        Builds or updates the vector store from the knowledge primitives.
 
-        # PATTERN: This is a one-time, expensive operation. The result is persisted
-        # to disk so we don't have to run it every time.
+        # PATTERN: Embedding is the expensive part, and the result is persisted
+        # to disk. Chunks are keyed by ID (see ``chunk_id``) and the IDs in
+        # the store are recorded next to it, so a rebuild only embeds new or
+        # changed chunks and deletes the ones that are gone. Those are embedded
+        # ``batch_size`` at a time with up to ``max_concurrency`` requests in
+        # flight, retrying failed batches.
         """
         print(f"Building knowledge store at {self.persist_directory}...")
-        """Builds the vector store from scratch."""
-        all_chunks = []
-        headers_to_split_on = [
-            ("#", "Header 1"),
-            ("##", "Header 2"),
-            ("###", "Header 3"),
-        ]
-        markdown_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=headers_to_split_on
-        )
-        for primitive in knowledge_primitives:
-            chunks_path = Path(primitive["base_path"]) / "chunks"
-            if not chunks_path.is_dir():
-                continue
-            for md_file in chunks_path.rglob("*.md"):
-                content = md_file.read_text()
-                chunks = markdown_splitter.split_text(content)
-                all_chunks.extend(chunks)
-        self.db = Chroma.from_documents(
-            documents=all_chunks,
-            embedding=self.embeddings,
-            persist_directory=str(self.persist_directory),
+        embedder = BatchedEmbeddings(
+            self.embeddings, batch_size=batch_size, max_concurrency=max_concurrency
         )
+        chunks = split_knowledge(knowledge_primitives)
+        previous = _read_chunk_manifest(self.persist_directory)
+        report = BuildReport()
+
+        if previous is None:
+            if self.persist_directory.exists():
+                # Built before chunk IDs were tracked: start over rather than
+                # add a second copy of every chunk.
+                Chroma(
+                    persist_directory=str(self.persist_directory),
+                    embedding_function=self.embeddings,
+                ).delete_collection()
+            report.added = len(chunks)
+            self.db = Chroma.from_documents(
+                documents=list(chunks.values()),
+                embedding=embedder,
+                persist_directory=str(self.persist_directory),
+                ids=list(chunks),
+            )
+        else:
+            new_ids = [doc_id for doc_id in chunks if doc_id not in previous]
+            removed_ids = [doc_id for doc_id in previous if doc_id not in chunks]
+            report.added = len(new_ids)
+            report.deleted = len(removed_ids)
+            report.unchanged = len(chunks) - len(new_ids)
+            self.db = Chroma(
+                persist_directory=str(self.persist_directory),
+                embedding_function=embedder,
+            )
+            # New IDs are deleted too, in case an interrupted build stored
+            # them without recording them in the manifest.
+            if removed_ids or new_ids:
+                self.db.delete(ids=removed_ids + new_ids)
+            if new_ids:
+                self.db.add_documents(
+                    [chunks[doc_id] for doc_id in new_ids], ids=new_ids
+                )
         self.db.persist()
-        print("Knowledge store built and persisted.")
+        embedder.close()
+        report.embed_seconds = embedder.last_seconds
+        self.lexical = _build_lexical_index(self.persist_directory, chunks)
+        _write_chunk_manifest(self.persist_directory, chunks)
+        print(f"Knowledge store built and persisted: {report.summary()}.")
+        return report
 
     def load(self):
         """Loads an existing vector store from disk."""
@@ -99,8 +290,19 @@ class ChromaKnowledgeStore:
             persist_directory=str(self.persist_directory),
             embedding_function=self.embeddings,
         )
+        self.lexical = _load_lexical_index(self.persist_directory)
         print("Knowledge store loaded from disk.")
 
+    def reopen(self) -> None:
+        """Opens a new embedding client and Chroma client in a forked child;
+        the keyword index stays shared with the parent."""
+        self.embeddings = _default_embeddings()
+        if self.db is not None:
+            self.db = Chroma(
+                persist_directory=str(self.persist_directory),
+                embedding_function=self.embeddings,
+            )
+
     def retrieve(self, query: str, k: int = 5) -> List[str]:
         """Retrieves the k most relevant document chunks for a given query."""
         if not self.db:
@@ -108,5 +310,181 @@ class ChromaKnowledgeStore:
                 "KnowledgeStore is not built or loaded. Call .build() or .load() first."
             )
         print(f"Retrieving knowledge for query: '{query}'")
+        return hybrid_retrieve(
+            query,
+            k,
+            self.lexical,
+            self._similarity_search,
+            self.retrieval_mode,
+            debug=self.debug,
+        )
+
+    def _similarity_search(self, query: str, k: int) -> List[str]:
+        if self.db is None:
+            return []  # retrieve() has already rejected an unloaded store
         docs = self.db.similarity_search(query, k=k)
         return [doc.page_content for doc in docs]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class NumpyKnowledgeStore:
+    """
+    A brute-force vector store in plain files: the embeddings of all chunks,
+    normalized, in one float32 ``.npy`` matrix that is memory-mapped on load,
+    and the chunk texts and metadata in a JSON sidecar. Retrieval is a single
+    matrix-vector product, which for a corpus of a few thousand chunks is
+    faster than Chroma and needs none of its start-up work.
+    """
+
+    def __init__(self, persist_directory: Path):
+        from .config import get_retrieval_mode
+
+        self.persist_directory = persist_directory
+        self.embeddings = _default_embeddings()
+        self.retrieval_mode = get_retrieval_mode()
+        # Reports queries answered from the keyword index alone.
+        self.debug = False
+        self.vectors: np.ndarray | None = None
+        self.chunks: List[Dict[str, Any]] = []
+        self.lexical: BM25Index | None = None
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.persist_directory / VECTORS_FILE
+
+    @property
+    def _chunks_path(self) -> Path:
+        return self.persist_directory / CHUNKS_FILE
+
+    def build(
+        self,
+        knowledge_primitives: List[Dict[str, Any]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> BuildReport:
+        """
+        Builds or updates the store. Rows of chunks that are still present
+        are copied over from the previous build; only new chunks are embedded
+        (see ``ChromaKnowledgeStore.build``).
+        """
+        print(f"Building knowledge store at {self.persist_directory}...")
+        embedder = BatchedEmbeddings(
+            self.embeddings, batch_size=batch_size, max_concurrency=max_concurrency
+        )
+        chunks = split_knowledge(knowledge_primitives)
+        previous: Dict[str, int] = {}
+        previous_vectors = np.empty((0, 0), np.float32)
+        if self._vectors_path.is_file() and self._chunks_path.is_file():
+            try:
+                self.load()
+                previous = {chunk["id"]: row for row, chunk in enumerate(self.chunks)}
+                previous_vectors = self._loaded_vectors()
+            except RuntimeError:
+                pass  # inconsistent files: embed everything again
+
+        new_ids = [doc_id for doc_id in chunks if doc_id not in previous]
+        report = BuildReport(
+            added=len(new_ids),
+            deleted=sum(1 for doc_id in previous if doc_id not in chunks),
+            unchanged=len(chunks) - len(new_ids),
+        )
+        embedded: Dict[str, np.ndarray] = {}
+        if new_ids:
+            new_vectors = np.asarray(
+                embedder.embed_documents(
+                    [chunks[doc_id].page_content for doc_id in new_ids]
+                ),
+                dtype=np.float32,
+            )
+            embedded = dict(zip(new_ids, _normalize(new_vectors)))
+            report.embed_seconds = embedder.last_seconds
+            embedder.close()
+
+        rows = [
+            embedded[doc_id]
+            if doc_id in embedded
+            else previous_vectors[previous[doc_id]]
+            for doc_id in chunks
+        ]
+        if rows:
+            vectors = np.vstack(rows).astype(np.float32)
+        else:
+            vectors = np.empty((0, 0), np.float32)
+        sidecar = [
+            {"id": doc_id, "text": doc.page_content, "metadata": doc.metadata}
+            for doc_id, doc in chunks.items()
+        ]
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        # The old matrix may still be mapped; write both files aside and
+        # swap them in, vectors first.
+        tmp_vectors = self._vectors_path.with_suffix(".tmp.npy")
+        np.save(tmp_vectors, vectors)
+        tmp_chunks = self._chunks_path.with_suffix(".tmp")
+        tmp_chunks.write_text(json.dumps(sidecar))
+        self.vectors = None
+        os.replace(tmp_vectors, self._vectors_path)
+        os.replace(tmp_chunks, self._chunks_path)
+        _build_lexical_index(self.persist_directory, chunks)
+        self.load()
+        print(f"Knowledge store built and persisted: {report.summary()}.")
+        return report
+
+    def load(self) -> None:
+        """Memory-maps the vectors and reads the chunk sidecar."""
+        if not (self._vectors_path.is_file() and self._chunks_path.is_file()):
+            raise FileNotFoundError(
+                f"KnowledgeStore files not found in {self.persist_directory}. "
+                f"Please run 'build-knowledge --vector-backend numpy' first."
+            )
+        vectors = np.load(self._vectors_path, mmap_mode="r")
+        chunks = json.loads(self._chunks_path.read_text())
+        if vectors.shape[0] != len(chunks):
+            raise RuntimeError(
+                f"{VECTORS_FILE} has {vectors.shape[0]} rows but {CHUNKS_FILE} lists "
+                f"{len(chunks)} chunks; rebuild the knowledge store."
+            )
+        self.vectors, self.chunks = vectors, chunks
+        self.lexical = _load_lexical_index(self.persist_directory)
+
+    def reopen(self) -> None:
+        """Opens a new embedding client in a forked child. The memory-mapped
+        vectors, the chunks and the keyword index stay shared with the parent."""
+        self.embeddings = _default_embeddings()
+
+    def _loaded_vectors(self) -> np.ndarray:
+        if self.vectors is None:
+            raise RuntimeError(
+                "KnowledgeStore is not built or loaded. Call .build() or .load() first."
+            )
+        return self.vectors
+
+    def retrieve(self, query: str, k: int = 5) -> List[str]:
+        """Retrieves the k chunks with the highest cosine similarity to the query."""
+        self._loaded_vectors()
+        print(f"Retrieving knowledge for query: '{query}'")
+        return hybrid_retrieve(
+            query,
+            k,
+            self.lexical,
+            self._similarity_search,
+            self.retrieval_mode,
+            debug=self.debug,
+        )
+
+    def _similarity_search(self, query: str, k: int) -> List[str]:
+        k = min(k, len(self.chunks))
+        if k <= 0:
+            return []
+        query_vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = float(np.linalg.norm(query_vector))
+        if norm:
+            query_vector = query_vector / norm
+        scores = self._loaded_vectors() @ query_vector
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self.chunks[row]["text"] for row in top]
@@ -0,0 +1,174 @@
+"""BM25 keyword index over knowledge chunks, and rank fusion with vector search.
+
+Planner queries are often exact identifiers ("pytest fixtures", "uv pip")
+that embeddings rank poorly. The knowledge stores build a :class:`BM25Index`
+next to their vector index and fuse both rankings with
+:func:`reciprocal_rank_fusion`; a query whose terms single out one chunk, and
+that matches enough chunks to fill the result, is answered from the index
+alone, without embedding it.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Persisted next to the vector index.
+LEXICAL_INDEX_FILE = "bm25_index.json"
+# Values of ``PRP_RETRIEVAL_MODE``.
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+# Candidates drawn from each ranking per requested chunk before fusion.
+CANDIDATES_PER_RESULT = 4
+# Rank offset of reciprocal rank fusion; 60 is the value from the original paper.
+RRF_K = 60
+# The best hit must contain every query term and outscore the runner-up by
+# this factor for the lexical fast path to skip vector search.
+DEFAULT_FAST_PATH_MARGIN = 1.5
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or the "
+    "to use using what when where which with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens without stopwords, with a trailing plural
+    ``s`` dropped so that "fixtures" matches "fixture"."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of documents, as an inverted index from
+    term to ``[document, term frequency]`` postings.
+    """
+
+    def __init__(
+        self,
+        documents: List[str],
+        postings: Dict[str, List[List[int]]],
+        lengths: List[int],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.documents = documents
+        self.postings = postings
+        self.lengths = lengths
+        self.k1 = k1
+        self.b = b
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+    @classmethod
+    def from_documents(cls, documents: Sequence[str]) -> "BM25Index":
+        postings: Dict[str, List[List[int]]] = {}
+        lengths = []
+        for doc, text in enumerate(documents):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append([doc, tf])
+        return cls(list(documents), postings, lengths)
+
+    @classmethod
+    def load(cls, path: Path) -> "BM25Index":
+        data = json.loads(path.read_text())
+        return cls(data["documents"], data["postings"], data["lengths"])
+
+    def save(self, path: Path) -> None:
+        data = {
+            "documents": self.documents,
+            "postings": self.postings,
+            "lengths": self.lengths,
+        }
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data))
+        os.replace(tmp_path, path)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        n = len(self.documents)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """The ``k`` best-scoring documents as ``(document, score)`` pairs."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf(term)
+            for doc, tf in self.postings.get(term, ()):
+                norm = 1 - self.b + self.b * self.lengths[doc] / self.average_length
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (
+                    tf + self.k1 * norm
+                )
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+    def is_strong_match(
+        self,
+        query: str,
+        hits: List[Tuple[int, float]],
+        margin: float = DEFAULT_FAST_PATH_MARGIN,
+    ) -> bool:
+        """Whether the top hit contains every query term and clearly beats
+        the next one, so that vector search would not change the answer."""
+        terms = set(tokenize(query))
+        if not terms or not hits:
+            return False
+        top, top_score = hits[0]
+        if not all(
+            any(doc == top for doc, _ in self.postings.get(term, ())) for term in terms
+        ):
+            return False
+        runner_up = hits[1][1] if len(hits) > 1 else 0.0
+        return top_score >= margin * runner_up
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = RRF_K
+) -> List[str]:
+    """Merges ranked lists by the sum of ``1 / (k + rank)`` over the lists."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: -scores[item])
+
+
+def hybrid_retrieve(
+    query: str,
+    k: int,
+    lexical: Optional[BM25Index],
+    vector_search: Callable[[str, int], List[str]],
+    mode: str = "hybrid",
+    debug: bool = False,
+) -> List[str]:
+    """
+    Retrieves ``k`` chunk texts in the given mode. ``hybrid`` fuses the BM25
+    and vector rankings, unless the BM25 ranking is a strong match on its
+    own and has at least ``k`` hits; fewer keyword hits are filled up from
+    the vector ranking by the fusion. Without a lexical index (a store built
+    before there was one) every mode falls back to vector search.
+    """
+    if mode == "vector" or lexical is None:
+        return vector_search(query, k)
+    candidates = k * CANDIDATES_PER_RESULT
+    hits = lexical.search(query, candidates)
+    lexical_ranking = [lexical.documents[doc] for doc, _ in hits]
+    if mode == "lexical" or (len(hits) >= k and lexical.is_strong_match(query, hits)):
+        if debug:
+            print(f"Answered from the keyword index: '{query}'")
+        return lexical_ranking[:k]
+    vector_ranking = vector_search(query, candidates)
+    return reciprocal_rank_fusion([lexical_ranking, vector_ranking])[:k]
@@ -1,23 +1,65 @@
-import json
 import asyncio
+import json
+import os
+from concurrent.futures import Future
+from dataclasses import asdict
 from pathlib import Path
+from typing import Any
 
 import typer
 
 from .agents.synthesizer import SynthesizerAgent
-from .config import configure_gemini, get_model_name
+from .config import (
+    DEFAULT_DAEMON_SOCKET,
+    configure_gemini,
+    get_cache_max_bytes,
+    get_model_name,
+    get_semantic_cache_threshold,
+    llm_cache_enabled,
+)
 
 try:
     import google.generativeai as genai
 except Exception:
     genai = None
 
-from .knowledge import ChromaKnowledgeStore
-from .cache import ResultCache
+from .batch import load_goals, run_batch
+from .cache import NamespaceStats, ResultCache, StatsReport
+from .daemon import DEFAULT_DAEMON_TIMEOUT, request_compile, run_daemon
+from .embeddings import DEFAULT_BATCH_SIZE, DEFAULT_MAX_CONCURRENCY
+from .knowledge import (
+    VECTOR_BACKENDS,
+    ChromaKnowledgeStore,
+    NumpyKnowledgeStore,
+    VectorStore,
+)
 from .orchestrator import Orchestrator
 from .primitives import PrimitiveLoader
+from .semantic_cache import build_semantic_cache
+from .service import (
+    CompilerRuntime,
+    Job,
+    ThroughputStats,
+    consume_jobs,
+    runtime_settings,
+    serve_processes,
+)
+from .startup import StagedStartup
 
 app = typer.Typer()
+cache_app = typer.Typer(help="Inspect and maintain the result cache.")
+app.add_typer(cache_app, name="cache")
+
+VECTOR_BACKEND_HELP = (
+    "Vector index: 'chroma', or 'numpy' for a memory-mapped matrix searched by "
+    "brute force. Use the same backend to build and to query a --vector-db-path."
+)
+
+
+def _check_vector_backend(value: str) -> str:
+    if value not in VECTOR_BACKENDS:
+        raise typer.BadParameter(f"must be one of: {', '.join(VECTOR_BACKENDS)}")
+    return value
 
 
 @app.command()
@@ -32,6 +74,9 @@ def compile(
     vector_db_path: Path = typer.Option(
         "chroma_db", help="Path to persist the vector database."
     ),
+    vector_backend: str = typer.Option(
+        "chroma", callback=_check_vector_backend, help=VECTOR_BACKEND_HELP
+    ),
     constitution_path: Path = typer.Option(
         "CLAUDE.md", help="Path to the agent constitution file."
     ),
@@ -51,36 +96,104 @@ def compile(
         "--debug",
         help="Enable real-time debug logging of the agent's loop.",
     ),
+    stream: bool = typer.Option(
+        False,
+        "--stream",
+        help="Stream the synthesizer output and abort at the first schema violation.",
+    ),
+    use_daemon: bool = typer.Option(
+        True,
+        "--daemon/--no-daemon",
+        help="Hand the goal to a running `prp-compiler daemon` if one is listening.",
+    ),
+    daemon_socket: Path = typer.Option(
+        DEFAULT_DAEMON_SOCKET, help="Unix socket of the compile daemon."
+    ),
+    daemon_timeout: float = typer.Option(
+        DEFAULT_DAEMON_TIMEOUT, help="Seconds to wait for the daemon's answer."
+    ),
 ):
     """Compiles a high-fidelity PRP from a user goal."""
     try:
         typer.echo(f"🚀 Starting PRP compilation for goal: '{goal}'")
+        # The daemon only writes the PRP; plan output, live debug logging and
+        # streaming need the in-process pipeline.
+        if use_daemon and plan_file is None and not debug and not stream:
+            settings = runtime_settings(
+                primitives_path,
+                vector_db_path,
+                cache_db_path,
+                constitution_path,
+                vector_backend,
+            )
+            reply = request_compile(
+                daemon_socket,
+                goal,
+                output_file,
+                strategy,
+                config=settings,
+                timeout=daemon_timeout,
+            )
+            if reply is not None:
+                if not reply.get("ok"):
+                    raise RuntimeError(f"Daemon failed: {reply.get('error')}")
+                typer.secho(
+                    f"✅ Success! PRP saved to {output_file} (via daemon)",
+                    fg=typer.colors.GREEN,
+                )
+                return
         configure_gemini()
 
         typer.echo("1. Loading primitives and knowledge store...")
-        loader = PrimitiveLoader(primitives_path)
-        knowledge_store = ChromaKnowledgeStore(persist_directory=vector_db_path)
-        result_cache = ResultCache(cache_db_path)
-        if not vector_db_path.exists():
-            typer.secho(
-                f"Warning: Knowledge store not found at {vector_db_path}. Building it now...",
-                fg=typer.colors.YELLOW,
+        planner_model_name = get_model_name("planner")
+        # Only strategy selection needs the primitives; opening the knowledge
+        # store and the cache overlap with the scan and the strategy LLM call.
+        with StagedStartup() as startup:
+            loader_future = startup.submit(
+                "primitives", PrimitiveLoader, primitives_path
             )
-            knowledge_primitives = loader.get_all("knowledge")
-            knowledge_store.build(knowledge_primitives)
-        else:
-            knowledge_store.load()
+            store_future = startup.submit(
+                "knowledge store",
+                _open_knowledge_store,
+                vector_db_path,
+                loader_future,
+                vector_backend,
+                debug,
+            )
+            cache_future = startup.submit("result cache", ResultCache, cache_db_path)
+            constitution = startup.run(
+                "constitution", _read_constitution, constitution_path
+            )
+            loader = loader_future.result()
 
-        if constitution_path.exists():
-            constitution = constitution_path.read_text()
-        else:
-            constitution = ""
+            typer.echo("2. Running Planner Agent to gather context...")
+            typer.secho(
+                f"[INFO] Using Gemini model for Planner: {planner_model_name}",
+                fg=typer.colors.CYAN,
+            )
+            orchestrator = startup.run(
+                "planner",
+                Orchestrator,
+                loader,
+                None,
+                cache_future.result(),
+                debug=debug,
+                model_name=planner_model_name,
+            )
+            # The semantic cache embeds goals with the knowledge store's model.
+            # When it is on, wait for the store so that a near-duplicate goal
+            # is answered before paying for strategy selection.
+            if get_semantic_cache_threshold() is not None:
+                orchestrator.knowledge_store = store_future.result()
+                orchestrator.semantic_cache = build_semantic_cache(
+                    cache_future.result(), orchestrator.knowledge_store
+                )
+            chosen_strategy = strategy or startup.run(
+                "strategy selection", orchestrator.choose_strategy, goal, constitution
+            )
+            orchestrator.knowledge_store = store_future.result()
+        typer.echo(startup.summary())
 
-        typer.echo("2. Running Planner Agent to gather context...")
-        planner_model_name = get_model_name("planner")
-        typer.secho(f"[INFO] Using Gemini model for Planner: {planner_model_name}", fg=typer.colors.CYAN)
-        orchestrator = Orchestrator(loader, knowledge_store, result_cache, debug=debug, model_name=planner_model_name)
-        chosen_strategy = strategy
         run_result = orchestrator.run(
             goal,
             constitution,
@@ -92,6 +205,17 @@ def compile(
             # Handle error case where run might return 2 values
             typer.secho(f"❌ Orchestrator returned an error: {run_result[1]}", fg=typer.colors.RED, err=True)
             raise typer.Exit(code=1)
+        if debug:
+            result_cache = cache_future.result()
+            for tier, counts in result_cache.stats().items():
+                typer.echo(
+                    f"[DEBUG] Result cache {tier}: {counts['hits']} hits, "
+                    f"{counts['misses']} misses"
+                )
+            for namespace, counts in sorted(result_cache.namespace_stats.items()):
+                typer.echo(
+                    f"[DEBUG] Result cache [{namespace}] {_describe_stats(counts)}"
+                )
 
         if plan_file is not None:
             plan_file.parent.mkdir(parents=True, exist_ok=True)
@@ -103,8 +227,10 @@ def compile(
 
         typer.echo("3. Running Synthesizer Agent to generate final PRP...")
         synthesizer = SynthesizerAgent()
+        if llm_cache_enabled():
+            synthesizer.response_cache = cache_future.result()
         final_prp_json = synthesizer.synthesize(
-            schema_json, final_context, constitution
+            schema_json, final_context, constitution, stream=stream
         )
 
         output_file.parent.mkdir(parents=True, exist_ok=True)
@@ -117,6 +243,40 @@ def compile(
         raise typer.Exit(code=1)
 
 
+def _knowledge_store(vector_backend: str, vector_db_path: Path) -> VectorStore:
+    if vector_backend == "numpy":
+        return NumpyKnowledgeStore(persist_directory=vector_db_path)
+    return ChromaKnowledgeStore(persist_directory=vector_db_path)
+
+
+def _open_knowledge_store(
+    vector_db_path: Path,
+    loader_future: Future,
+    vector_backend: str = "chroma",
+    debug: bool = False,
+):
+    """Loads the persisted knowledge store, building it first if missing."""
+    knowledge_store = _knowledge_store(vector_backend, vector_db_path)
+    knowledge_store.debug = debug
+    if not vector_db_path.exists():
+        typer.secho(
+            f"Warning: Knowledge store not found at {vector_db_path}. "
+            "Building it now...",
+            fg=typer.colors.YELLOW,
+        )
+        knowledge_primitives = loader_future.result().get_all("knowledge")
+        knowledge_store.build(knowledge_primitives)
+    else:
+        knowledge_store.load()
+    return knowledge_store
+
+
+def _read_constitution(constitution_path: Path) -> str:
+    if constitution_path.exists():
+        return constitution_path.read_text()
+    return ""
+
+
 @app.command()
 def build_knowledge(
     primitives_path: Path = typer.Option(
@@ -125,6 +285,15 @@ def build_knowledge(
     vector_db_path: Path = typer.Option(
         "chroma_db", help="Path to persist the vector database."
     ),
+    vector_backend: str = typer.Option(
+        "chroma", callback=_check_vector_backend, help=VECTOR_BACKEND_HELP
+    ),
+    batch_size: int = typer.Option(
+        DEFAULT_BATCH_SIZE, help="Chunks sent per embedding request."
+    ),
+    concurrency: int = typer.Option(
+        DEFAULT_MAX_CONCURRENCY, help="Embedding requests in flight at once."
+    ),
 ):
     """Builds or rebuilds the RAG vector store from knowledge primitives."""
     typer.echo(
@@ -136,10 +305,13 @@ def build_knowledge(
         typer.secho("No knowledge primitives found to build.", fg=typer.colors.YELLOW)
         return
 
-    knowledge_store = ChromaKnowledgeStore(persist_directory=vector_db_path)
-    knowledge_store.build(knowledge_primitives)
+    knowledge_store = _knowledge_store(vector_backend, vector_db_path)
+    report = knowledge_store.build(
+        knowledge_primitives, batch_size=batch_size, max_concurrency=concurrency
+    )
     typer.secho(
-        f"✅ Knowledge vector store built at {vector_db_path}", fg=typer.colors.GREEN
+        f"✅ Knowledge vector store built at {vector_db_path}: {report.summary()}",
+        fg=typer.colors.GREEN,
     )
 
 
@@ -148,49 +320,61 @@ def serve(
     workers: int = typer.Option(4, help="Number of worker tasks."),
     primitives_path: Path = typer.Option("agent_primitives"),
     vector_db_path: Path = typer.Option("chroma_db"),
+    vector_backend: str = typer.Option(
+        "chroma", callback=_check_vector_backend, help=VECTOR_BACKEND_HELP
+    ),
     constitution_path: Path = typer.Option("CLAUDE.md"),
     cache_db_path: Path = typer.Option("result_cache.sqlite"),
+    mode: str = typer.Option(
+        "async",
+        help="'async' runs all workers on one event loop; 'process' forks --procs "
+        "consumer processes that each run --workers async workers.",
+    ),
+    procs: int = typer.Option(
+        os.cpu_count() or 1, help="Number of consumer processes in process mode."
+    ),
+    cache_gc_interval: float = typer.Option(
+        60, help="Minutes between background result-cache gc runs (0 disables)."
+    ),
 ):
     """Runs the compiler as an async job queue service."""
+    if mode not in ("async", "process"):
+        typer.secho(f"Unknown serve mode: {mode}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
     configure_gemini()
-    loader = PrimitiveLoader(primitives_path)
-    knowledge_store = ChromaKnowledgeStore(persist_directory=vector_db_path)
-    if vector_db_path.exists():
-        knowledge_store.load()
-    else:
-        knowledge_store.build(loader.get_all("knowledge"))
-    result_cache = ResultCache(cache_db_path)
+    runtime = CompilerRuntime.load(
+        primitives_path,
+        vector_db_path,
+        cache_db_path,
+        constitution_path,
+        vector_backend=vector_backend,
+    )
 
-    async def worker(name: int, queue: asyncio.Queue[tuple[str, Path]]):
-        while True:
-            goal, out_path = await queue.get()
-            typer.echo(f"Worker {name} starting: {goal}")
-            orchestrator = Orchestrator(loader, knowledge_store, result_cache)
-            run_result = orchestrator.run(
-                goal,
-                constitution_path.read_text() if constitution_path.exists() else "",
-            )
-            if len(run_result) != 3:
-                typer.secho(f"Worker {name} failed: {run_result[1]}", fg=typer.colors.RED)
-                queue.task_done()
-                continue
-            schema_choice, final_context, _ = run_result
-            schema_str = loader.get_primitive_content("schemas", schema_choice)
-            synthesizer = SynthesizerAgent()
-            prp = synthesizer.synthesize(
-                json.loads(schema_str),
-                final_context,
-                constitution_path.read_text() if constitution_path.exists() else "",
-            )
-            out_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(out_path, "w") as f:
-                json.dump(prp, f, indent=2)
-            typer.echo(f"Worker {name} finished: {out_path}")
-            queue.task_done()
+    if mode == "process":
+        typer.echo(
+            f"Server running with {procs} processes x {workers} workers. "
+            "Enter a goal to enqueue or blank to exit."
+        )
+        for stats in serve_processes(
+            runtime,
+            procs,
+            workers,
+            lambda: input("Goal: "),
+            after_fork=lambda: _start_cache_gc(runtime, cache_gc_interval),
+        ):
+            typer.echo(stats.summary())
+        return
+    _start_cache_gc(runtime, cache_gc_interval)
 
     async def main_async():
-        queue: asyncio.Queue[tuple[str, Path]] = asyncio.Queue()
-        tasks = [asyncio.create_task(worker(i + 1, queue)) for i in range(workers)]
+        queue: asyncio.Queue[Job | None] = asyncio.Queue()
+        stats = ThroughputStats(label="Server")
+        tasks = [
+            asyncio.create_task(
+                consume_jobs(runtime, f"Worker {i + 1}", queue.get, stats)
+            )
+            for i in range(workers)
+        ]
         typer.echo("Server running. Enter a goal to enqueue or blank to exit.")
         while True:
             goal = await asyncio.to_thread(input, "Goal: ")
@@ -198,13 +382,197 @@ def serve(
                 break
             output = Path(f"{goal.replace(' ', '_')}.json")
             await queue.put((goal, output))
-        await queue.join()
-        for t in tasks:
-            t.cancel()
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+        stats.stop()
+        typer.echo(stats.summary())
 
     asyncio.run(main_async())
 
 
+@app.command()
+def compile_batch(
+    goals_file: Path = typer.Argument(
+        ..., help="JSONL file with one goal (string or {id, goal, strategy}) per line."
+    ),
+    out_dir: Path = typer.Option(
+        ..., "--out-dir", help="Directory to write one PRP JSON per goal."
+    ),
+    concurrency: int = typer.Option(4, min=1, help="Maximum goals compiled at once."),
+    summary_file: Path | None = typer.Option(
+        None,
+        "--summary",
+        help=(
+            "JSONL progress file (default: <out-dir>/summary.jsonl); "
+            "reused to resume."
+        ),
+    ),
+    primitives_path: Path = typer.Option("agent_primitives"),
+    vector_db_path: Path = typer.Option("chroma_db"),
+    vector_backend: str = typer.Option(
+        "chroma", callback=_check_vector_backend, help=VECTOR_BACKEND_HELP
+    ),
+    constitution_path: Path = typer.Option("CLAUDE.md"),
+    cache_db_path: Path = typer.Option("result_cache.sqlite"),
+):
+    """Compiles every goal in a file, sharing one loaded runtime across them."""
+    try:
+        items = load_goals(goals_file)
+    except (OSError, ValueError) as e:
+        typer.secho(f"❌ Error: {e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+    summary_file = summary_file or out_dir / "summary.jsonl"
+
+    configure_gemini()
+    runtime = CompilerRuntime.load(
+        primitives_path,
+        vector_db_path,
+        cache_db_path,
+        constitution_path,
+        vector_backend=vector_backend,
+    )
+    report = asyncio.run(
+        run_batch(runtime, items, out_dir, summary_file, concurrency=concurrency)
+    )
+    typer.echo(f"Batch finished: {report.summary()}. Summary: {summary_file}")
+    if report.failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def daemon(
+    socket_path: Path = typer.Option(
+        DEFAULT_DAEMON_SOCKET, "--socket", help="Unix socket to listen on."
+    ),
+    primitives_path: Path = typer.Option("agent_primitives"),
+    vector_db_path: Path = typer.Option("chroma_db"),
+    vector_backend: str = typer.Option(
+        "chroma", callback=_check_vector_backend, help=VECTOR_BACKEND_HELP
+    ),
+    constitution_path: Path = typer.Option("CLAUDE.md"),
+    cache_db_path: Path = typer.Option("result_cache.sqlite"),
+    cache_gc_interval: float = typer.Option(
+        60, help="Minutes between background result-cache gc runs (0 disables)."
+    ),
+):
+    """Keeps primitives, knowledge store and agents warm for `compile` clients."""
+    configure_gemini()
+    runtime = CompilerRuntime.load(
+        primitives_path,
+        vector_db_path,
+        cache_db_path,
+        constitution_path,
+        vector_backend=vector_backend,
+    )
+    _start_cache_gc(runtime, cache_gc_interval)
+    asyncio.run(run_daemon(runtime, socket_path))
+
+
+def _start_cache_gc(runtime: CompilerRuntime, interval_minutes: float) -> None:
+    if runtime.result_cache is not None and interval_minutes > 0:
+        runtime.result_cache.start_background_gc(
+            interval_minutes * 60, max_bytes=get_cache_max_bytes()
+        )
+
+
+def _describe_stats(counts: NamespaceStats) -> str:
+    return (
+        f"{counts.hits} hits, {counts.misses} misses, {counts.expired} expired "
+        f"({counts.hit_rate:.0%} hit rate), {counts.bytes_saved / 1e6:.2f} MB served, "
+        f"{counts.sets} writes, {counts.mean_lookup_ms:.2f} ms/lookup"
+    )
+
+
+@cache_app.command("stats")
+def cache_stats(
+    cache_db_path: Path = typer.Option("result_cache.sqlite"),
+    top: int = typer.Option(10, help="List this many of the most-read entries."),
+    as_json: bool = typer.Option(False, "--json", help="Print the report as JSON."),
+    reset: bool = typer.Option(False, help="Clear the counters after printing."),
+):
+    """Shows hit/miss counters, sizes and lookup latency per cache namespace."""
+    if not cache_db_path.exists():
+        typer.secho(f"No cache found at {cache_db_path}", fg=typer.colors.YELLOW)
+        return
+    cache = ResultCache(cache_db_path)
+    try:
+        counters = cache.persisted_stats()
+        inventory = cache.inventory()
+        namespaces: dict[str, dict[str, Any]] = {}
+        for namespace in sorted(set(inventory) | set(counters)):
+            counts = counters.get(namespace, NamespaceStats())
+            namespaces[namespace] = {
+                **inventory.get(namespace, {"entries": 0, "bytes": 0}),
+                **asdict(counts),
+                "hit_rate": counts.hit_rate,
+                "mean_lookup_ms": counts.mean_lookup_ms,
+            }
+        report = StatsReport(
+            since=cache.stats_since(),
+            file_bytes=cache.file_size(),
+            namespaces=namespaces,
+            top_entries=cache.top_entries(top) if top > 0 else [],
+        )
+        if reset:
+            cache.reset_stats()
+    finally:
+        cache.close()
+
+    if as_json:
+        typer.echo(json.dumps(asdict(report), indent=2))
+        return
+    typer.echo(
+        f"Result cache {cache_db_path}: {report.file_bytes / 1e6:.1f} MB on disk"
+        + (f", counting since {report.since}" if report.since else "")
+    )
+    for namespace, row in report.namespaces.items():
+        typer.echo(
+            f"  {namespace}: {row['entries']} entries, {row['bytes'] / 1e6:.2f} MB; "
+            + _describe_stats(counters.get(namespace, NamespaceStats()))
+        )
+    if report.top_entries:
+        typer.echo("Most-read entries:")
+        for entry in report.top_entries:
+            typer.echo(
+                f"  {entry['hits']:>6} hits  "
+                f"[{entry['namespace']}] {entry['cache_key']}"
+            )
+
+
+@cache_app.command("gc")
+def cache_gc(
+    cache_db_path: Path = typer.Option("result_cache.sqlite"),
+    max_mb: float | None = typer.Option(
+        None, help="Evict entries until the cache holds at most this many MB "
+        "(default: PRP_CACHE_MAX_MB, if set)."
+    ),
+    policy: str = typer.Option("lru", help="Eviction order: 'lru' or 'lfu'."),
+    vacuum: bool = typer.Option(
+        False,
+        help="Rewrite the whole file. Blocks writers while it runs; needed once "
+        "for caches created before incremental compaction was enabled.",
+    ),
+):
+    """Removes expired entries, enforces the size cap and compacts the cache."""
+    if not cache_db_path.exists():
+        typer.secho(f"No cache found at {cache_db_path}", fg=typer.colors.YELLOW)
+        return
+    if max_mb is not None:
+        max_bytes = int(max_mb * 1024 * 1024)
+    else:
+        max_bytes = get_cache_max_bytes()
+    cache = ResultCache(cache_db_path)
+    try:
+        report = cache.gc(max_bytes=max_bytes, policy=policy, vacuum=vacuum)
+    except ValueError as e:
+        typer.secho(f"❌ Error: {e}", fg=typer.colors.RED, err=True)
+        raise typer.Exit(code=1)
+    finally:
+        cache.close()
+    typer.secho(f"✅ {report.summary()}", fg=typer.colors.GREEN)
+
+
 def run():
     app()
 
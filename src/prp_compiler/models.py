@@ -1,4 +1,4 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal
 
 try:
     from pydantic import BaseModel, Field
@@ -20,6 +20,28 @@ class ManifestItem(BaseModel):
     file_path: str
 
 
+class CachePolicy(BaseModel):
+    """How results of an action are cached, from the ``cache`` field of its
+    manifest.
+
+    * ``enabled`` -- set to ``false`` for actions that must always run.
+    * ``ttl`` -- lifetime in hours, or ``"forever"``; unset means the
+      ``action`` namespace default.
+    * ``key_on`` -- properties of path arguments folded into the cache key:
+      ``file_mtime`` (modification time and size) and/or ``file_hash``
+      (SHA-256 of a file's bytes, or of a directory's top-level entry names;
+      edits inside a directory's files do not change it).
+    """
+
+    enabled: bool = True
+    ttl: float | Literal["forever"] | None = None
+    key_on: List[Literal["file_mtime", "file_hash"]] = Field(default_factory=list)
+
+    @property
+    def ttl_hours(self) -> float | None:
+        return float("inf") if self.ttl == "forever" else self.ttl
+
+
 class Action(BaseModel):
     tool_name: str = Field(
         description="The name of the tool/action to be executed."
@@ -1,19 +1,32 @@
+import asyncio
 import importlib
+import os
 import re
 import shlex
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple
+from typing import Sequence, Tuple, Union
 
 import typer
 
-from .agents.planner import Action, PlannerAgent
-from .config import get_model_name
-from .config import ALLOWED_SHELL_COMMANDS
-from .knowledge import VectorStore
+from .agents.planner import PlannerAgent
 from .cache import ResultCache
-from .primitives import PrimitiveLoader
+from .config import ALLOWED_SHELL_COMMANDS, get_model_name, llm_cache_enabled
 from .context import ContextManager
+from .knowledge import VectorStore
+from .models import Action, CachePolicy, ReActStep
+from .primitives import PrimitiveLoader
+from .semantic_cache import SemanticCache
+
+# Version of the run cache-key scheme. Cached runs carry the versions of the
+# primitives they depend on (see ``Orchestrator._run_dependencies``) rather
+# than being keyed on the whole library.
+RUN_CACHE_VERSION = "2"
+
+# ``(schema_choice, final_context, context)`` of a finished run, or
+# ``("", error report)`` when planning failed.
+RunResult = Union[Tuple[str, str, ContextManager], Tuple[str, str]]
 
 
 def load_constitution(root_path: Path) -> str:
@@ -24,6 +37,33 @@ def load_constitution(root_path: Path) -> str:
     return ""
 
 
+def _path_state(value: str, key_on: Sequence[str]) -> dict | None:
+    """What ``key_on`` tracks of the path ``value``, or ``None`` if it does
+    not name an existing file or directory."""
+    import hashlib
+
+    path = Path(value)
+    try:
+        stat = path.stat()
+    except (OSError, ValueError):
+        return None
+    state: dict = {}
+    if "file_mtime" in key_on:
+        state["mtime"] = stat.st_mtime_ns
+        state["size"] = stat.st_size
+    if "file_hash" in key_on:
+        digest = hashlib.sha256()
+        if path.is_dir():
+            # Only the names, non-recursively: what a directory listing shows.
+            digest.update("\n".join(sorted(os.listdir(path))).encode())
+        else:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        state["hash"] = digest.hexdigest()
+    return state
+
+
 class Orchestrator:
     """
     Drives the agentic workflow, from planning to context assembly.
@@ -36,23 +76,39 @@ class Orchestrator:
         result_cache: "ResultCache | None" = None,
         debug: bool = False,
         model_name: str = None,
+        planner: PlannerAgent | None = None,
+        max_parallel_actions: int = 4,
+        semantic_cache: "SemanticCache | None" = None,
     ):
         self.primitive_loader = primitive_loader
         self.knowledge_store = knowledge_store
         self.result_cache = result_cache
-        self.planner = PlannerAgent(self.primitive_loader, model_name=model_name or get_model_name('planner'))
+        # A preloaded planner lets long-running services reuse its tool schemas.
+        if planner is None:
+            planner = PlannerAgent(
+                self.primitive_loader,
+                model_name=model_name or get_model_name('planner'),
+            )
+            if result_cache is not None and llm_cache_enabled():
+                planner.response_cache = result_cache
+        self.planner = planner
         self.debug = debug
+        self.max_parallel_actions = max_parallel_actions
+        self.semantic_cache = semantic_cache
 
     def execute_action(self, action: Action) -> str:
         """Dynamically loads and executes an action primitive from its file path.
 
         Results are cached based on the tool name and arguments to avoid
-        repeating expensive operations across runs.
+        repeating expensive operations across runs, as the ``cache`` policy in
+        the action's manifest allows (see :class:`CachePolicy`).
         """
         typer.secho(f"▶️  Executing Action: {action.tool_name}", fg=typer.colors.YELLOW)
-        cache_key = self._compute_action_cache_key(action)
-        if self.result_cache:
-            cached = self.result_cache.get(cache_key)
+        policy = self._action_cache_policy(action)
+        result_cache = self.result_cache if policy.enabled else None
+        cache_key = self._compute_action_cache_key(action, policy)
+        if result_cache is not None:
+            cached = result_cache.get(cache_key, namespace="action")
             if isinstance(cached, dict) and "result" in cached:
                 return cached["result"]
         try:
@@ -62,8 +118,13 @@ class Orchestrator:
                 query = action.arguments.get("query", "")
                 chunks = self.knowledge_store.retrieve(query)
                 result = "\n".join(chunks)
-                if self.result_cache:
-                    self.result_cache.set(cache_key, {"result": result})
+                if result_cache is not None:
+                    result_cache.set(
+                        cache_key,
+                        {"result": result},
+                        namespace="action",
+                        ttl_hours=policy.ttl_hours,
+                    )
                 return result
 
             actions = self.primitive_loader.primitives.get("actions", {})
@@ -75,7 +136,8 @@ class Orchestrator:
                 allowed_cmds = action_manifest.get("allowed_shell_commands", [])
                 if not command_parts or command_parts[0] not in allowed_cmds:
                     raise PermissionError(
-                        f"Command '{command_parts[0]}' is not allowed for action '{action.tool_name}'. Allowed: {allowed_cmds}"
+                        f"Command '{command_parts[0]}' is not allowed for action "
+                        f"'{action.tool_name}'. Allowed: {allowed_cmds}"
                     )
                 return subprocess.run(command_parts, **kwargs)
 
@@ -114,8 +176,13 @@ class Orchestrator:
             result = action_function(**action.arguments)
 
             result_str = str(result)
-            if self.result_cache:
-                self.result_cache.set(cache_key, {"result": result_str})
+            if result_cache is not None:
+                result_cache.set(
+                    cache_key,
+                    {"result": result_str},
+                    namespace="action",
+                    ttl_hours=policy.ttl_hours,
+                )
 
             return result_str
         except PermissionError:
@@ -123,93 +190,359 @@ class Orchestrator:
         except Exception as e:
             return f"[ERROR] Failed to execute action '{action.tool_name}': {e}"
 
+    def execute_actions(self, actions: list[Action]) -> list[str]:
+        """Executes independent actions concurrently, preserving their order.
+
+        The planner may request several tool calls in one turn; running them
+        in a thread pool means the slowest call, not the sum, sets the latency.
+        """
+        if len(actions) <= 1:
+            return [self.execute_action(action) for action in actions]
+        max_workers = min(len(actions), self.max_parallel_actions)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(self.execute_action, actions))
+
+    async def aexecute_actions(self, actions: list[Action]) -> list[str]:
+        """Async counterpart of :meth:`execute_actions`; at most
+        ``max_parallel_actions`` run at once."""
+        semaphore = asyncio.Semaphore(self.max_parallel_actions)
+
+        async def bounded(action: Action) -> str:
+            async with semaphore:
+                return await self.aexecute_action(action)
+
+        return list(await asyncio.gather(*(bounded(action) for action in actions)))
+
+    async def aexecute_action(self, action: Action) -> str:
+        """Runs :meth:`execute_action` off the event loop.
+
+        Action primitives are plain synchronous functions, so they (and the
+        cache I/O around them) execute in a worker thread.
+        """
+        return await asyncio.to_thread(self.execute_action, action)
+
     def run(
         self,
         user_goal: str,
         constitution: str,
         max_steps: int = 10,
         strategy_name: str | None = None,
-    ) -> Tuple[str, str, ContextManager]:
+    ) -> RunResult:
         """Drives the main ReAct loop and assembles the final context."""
         cache_key = self._compute_cache_key(user_goal)
-        if self.result_cache:
-            cached = self.result_cache.get(cache_key)
-            if (
-                isinstance(cached, dict)
-                and "schema_choice" in cached
-                and "final_context" in cached
-            ):
-                return cached["schema_choice"], cached["final_context"], ContextManager(model=None)
-
-        # STEP 1: Select Strategy
-        if strategy_name:
-            chosen_strategy_name = strategy_name
+        cached = self._get_cached_run(cache_key) or self._get_semantic_run(user_goal)
+        if cached:
+            return cached
+
+        # A checkpoint from an interrupted run supplies the strategy and the
+        # steps already taken.
+        checkpoint = self._load_checkpoint(cache_key, strategy_name)
+        if checkpoint:
+            chosen_strategy_name, context = checkpoint
         else:
-            chosen_strategy_name = self.planner.select_strategy(user_goal, constitution)
+            # STEP 1: Select Strategy
+            if strategy_name:
+                chosen_strategy_name = strategy_name
+            else:
+                chosen_strategy_name = self.planner.select_strategy(
+                    user_goal, constitution
+                )
+            # Pass None to disable summarization in tests
+            context = ContextManager(model=None)
+            self._save_checkpoint(cache_key, chosen_strategy_name, context)
+        strategy_content = self._load_strategy(chosen_strategy_name)
 
-        typer.secho(f"Selected strategy: {chosen_strategy_name}", fg=typer.colors.BLUE)
+        final_plan_args = None
 
-        strategy_content = self.primitive_loader.get_primitive_content(
-            "strategies", chosen_strategy_name
+        for i in range(max_steps):
+            try:
+                steps = self.planner.plan_steps(
+                    user_goal,
+                    constitution,
+                    strategy_content,
+                    self._history_lines(context),
+                )
+                action_steps, finish_step = self._partition_steps(steps)
+
+                observations = self.execute_actions(
+                    [step.thought.next_action for step in action_steps]
+                )
+                for step, observation in zip(action_steps, observations):
+                    self._record_observation(step, observation, context)
+
+                if finish_step:
+                    final_plan_args = finish_step.thought.next_action.arguments
+                    context.add_step(finish_step)
+                    break
+                self._save_checkpoint(cache_key, chosen_strategy_name, context)
+
+            except Exception as e:
+                return self._error_result(
+                    f"Exception in Orchestrator.run: {e}", context
+                )
+        else:  # This 'else' belongs to the 'for' loop
+            return self._error_result(
+                "Planner did not finish within max_steps.", context
+            )
+
+        return self._finalize_run(
+            cache_key, final_plan_args, context, user_goal, chosen_strategy_name
+        )
+
+    async def arun(
+        self,
+        user_goal: str,
+        constitution: str,
+        max_steps: int = 10,
+        strategy_name: str | None = None,
+    ) -> RunResult:
+        """Async counterpart of :meth:`run`.
+
+        Model calls are awaited and blocking work (actions, cache I/O and
+        dynamic content resolution) is pushed to worker threads, so several
+        runs can share one event loop.
+        """
+        cache_key = self._compute_cache_key(user_goal)
+        cached = await asyncio.to_thread(
+            self._get_cached_run, cache_key
+        ) or await asyncio.to_thread(self._get_semantic_run, user_goal)
+        if cached:
+            return cached
+
+        checkpoint = await asyncio.to_thread(
+            self._load_checkpoint, cache_key, strategy_name
         )
+        if checkpoint:
+            chosen_strategy_name, context = checkpoint
+        else:
+            if strategy_name:
+                chosen_strategy_name = strategy_name
+            else:
+                chosen_strategy_name = await self.planner.aselect_strategy(
+                    user_goal, constitution
+                )
+            context = ContextManager(model=None)
+            await asyncio.to_thread(
+                self._save_checkpoint, cache_key, chosen_strategy_name, context
+            )
+        strategy_content = self._load_strategy(chosen_strategy_name)
 
-        context = ContextManager(model=None)  # Pass None to disable summarization in tests
         final_plan_args = None
 
         for i in range(max_steps):
             try:
-                step = self.planner.plan_step(
+                steps = await self.planner.aplan_steps(
                     user_goal,
                     constitution,
                     strategy_content,
-                    context.get_history_str().split("\n") if context.history else [],
+                    self._history_lines(context),
                 )
+                action_steps, finish_step = self._partition_steps(steps)
 
-                thought_text = (
-                    f"Thought: {step.thought.reasoning}\n"
-                    f"Critique: {step.thought.criticism}"
+                observations = await self.aexecute_actions(
+                    [step.thought.next_action for step in action_steps]
                 )
-                if self.debug:
-                    typer.secho(f"\U0001F914 {thought_text}", fg=typer.colors.CYAN)
-
-                action = step.thought.next_action
-                action_text = f"Action: {action.tool_name}({action.arguments})"
-                if self.debug:
-                    typer.secho(f"\u25B6\uFE0F {action_text}", fg=typer.colors.MAGENTA)
+                for step, observation in zip(action_steps, observations):
+                    self._record_observation(step, observation, context)
 
-                if action.tool_name == "finish":
-                    final_plan_args = action.arguments
-                    context.add_step(step)
+                if finish_step:
+                    final_plan_args = finish_step.thought.next_action.arguments
+                    context.add_step(finish_step)
                     break
+                await asyncio.to_thread(
+                    self._save_checkpoint, cache_key, chosen_strategy_name, context
+                )
+
+            except Exception as e:
+                return self._error_result(
+                    f"Exception in Orchestrator.arun: {e}", context
+                )
+        else:
+            return self._error_result(
+                "Planner did not finish within max_steps.", context
+            )
+
+        return await asyncio.to_thread(
+            self._finalize_run,
+            cache_key,
+            final_plan_args,
+            context,
+            user_goal,
+            chosen_strategy_name,
+        )
+
+    def choose_strategy(self, user_goal: str, constitution: str) -> str | None:
+        """Selects a strategy for ``user_goal`` ahead of :meth:`run`.
 
-                observation = self.execute_action(action)
-                step.observation = observation
+        Returns ``None`` when a cached run exists, since :meth:`run` will then
+        answer from the cache without needing a strategy.
+        """
+        cache_key = self._compute_cache_key(user_goal)
+        if self._get_cached_run(cache_key) or self._get_semantic_run(user_goal):
+            return None
+        checkpoint = self._load_checkpoint(cache_key)
+        if checkpoint:
+            return checkpoint[0]
+        return self.planner.select_strategy(user_goal, constitution)
+
+    def _get_cached_run(self, cache_key: str) -> Tuple[str, str, ContextManager] | None:
+        if not self.result_cache:
+            return None
+        cached = self.result_cache.get(cache_key, namespace="run")
+        if (
+            isinstance(cached, dict)
+            and "schema_choice" in cached
+            and "final_context" in cached
+        ):
+            dependencies = cached.get("dependencies")
+            if dependencies and self._dependency_versions(dependencies) != dependencies:
                 if self.debug:
-                    typer.secho(f"\U0001F440 Observation: {observation}", fg=typer.colors.GREEN)
+                    typer.secho(
+                        "Cached run is stale: a primitive it used has changed.",
+                        fg=typer.colors.YELLOW,
+                    )
+                return None
+            context = ContextManager(model=None)
+            return cached["schema_choice"], cached["final_context"], context
+        return None
+
+    def _get_semantic_run(
+        self, user_goal: str
+    ) -> Tuple[str, str, ContextManager] | None:
+        """Reuses the cached run of a sufficiently similar earlier goal."""
+        if not (self.semantic_cache and self.result_cache):
+            return None
+        try:
+            match = self.semantic_cache.lookup(user_goal, RUN_CACHE_VERSION)
+        except Exception as e:
+            typer.secho(f"Semantic cache lookup failed: {e}", fg=typer.colors.YELLOW)
+            return None
+        if match is None:
+            return None
+        cached = self._get_cached_run(match.cache_key)
+        if cached is None:
+            # The matched run expired, was evicted or went stale since it was
+            # indexed.
+            self.semantic_cache.forget(match.cache_key)
+            return None
+        self.semantic_cache.record_hit(user_goal, match)
+        typer.secho(
+            f"Semantic cache hit ({match.similarity:.3f}): reusing the run for "
+            f"'{match.goal}'",
+            fg=typer.colors.BLUE,
+        )
+        return cached
 
-                context.add_step(step)
+    def _checkpoint_key(self, cache_key: str) -> str:
+        # Unlike finished runs, a half-finished trajectory is only resumed
+        # against exactly the library it was planned with.
+        return f"checkpoint:{cache_key}:{self._primitive_fingerprint()}"
 
-                # History is managed by the ContextManager
+    def _load_checkpoint(
+        self, cache_key: str, strategy_name: str | None = None
+    ) -> Tuple[str, ContextManager] | None:
+        """Returns the strategy and history saved by an unfinished run.
 
-            except Exception as e:
-                return (
-                    "",
-                    f"[ERROR] Exception in Orchestrator.run: {e}\n\n"
-                    + context.get_history_str(),
-                )
-        else:  # This 'else' belongs to the 'for' loop
-            return (
-                "",
-                "[ERROR] Planner did not finish within max_steps.\n\n"
-                + context.get_history_str(),
+        A checkpoint made under a different explicitly requested strategy is
+        ignored; the run then starts over.
+        """
+        if not self.result_cache:
+            return None
+        saved = self.result_cache.get(
+            self._checkpoint_key(cache_key), namespace="checkpoint"
+        )
+        if not (isinstance(saved, dict) and saved.get("strategy")):
+            return None
+        if strategy_name and strategy_name != saved["strategy"]:
+            return None
+        context = ContextManager(model=None)
+        try:
+            context.restore_history(saved.get("steps", []))
+        except Exception:
+            return None
+        if context.history:
+            typer.secho(
+                f"Resuming from checkpoint after {len(context.history)} steps",
+                fg=typer.colors.BLUE,
             )
+        return saved["strategy"], context
+
+    def _save_checkpoint(
+        self, cache_key: str, strategy_name: str, context: ContextManager
+    ) -> None:
+        """Durably records the steps completed so far."""
+        if not self.result_cache:
+            return
+        self.result_cache.set(
+            self._checkpoint_key(cache_key),
+            {"strategy": strategy_name, "steps": context.get_structured_history()},
+            namespace="checkpoint",
+        )
+        # Committed now rather than on the next timer tick, so a killed worker
+        # loses at most the step in flight.
+        self.result_cache.flush()
+
+    def _load_strategy(self, strategy_name: str) -> str:
+        typer.secho(f"Selected strategy: {strategy_name}", fg=typer.colors.BLUE)
+        return self.primitive_loader.get_primitive_content("strategies", strategy_name)
+
+    def _history_lines(self, context: ContextManager) -> list[str]:
+        return context.get_history_str().split("\n") if context.history else []
+
+    def _partition_steps(
+        self, steps: list[ReActStep]
+    ) -> Tuple[list[ReActStep], ReActStep | None]:
+        """Splits one planner turn into the actions to run and the finish call."""
+        action_steps = []
+        finish_step = None
+        for step in steps:
+            action = self._log_step(step)
+            if action.tool_name != "finish":
+                action_steps.append(step)
+            elif finish_step is None:
+                finish_step = step
+        return action_steps, finish_step
+
+    def _log_step(self, step: ReActStep) -> Action:
+        """Echoes the planner's thought and chosen action in debug mode."""
+        thought_text = (
+            f"Thought: {step.thought.reasoning}\n"
+            f"Critique: {step.thought.criticism}"
+        )
+        if self.debug:
+            typer.secho(f"\U0001F914 {thought_text}", fg=typer.colors.CYAN)
+
+        action = step.thought.next_action
+        action_text = f"Action: {action.tool_name}({action.arguments})"
+        if self.debug:
+            typer.secho(f"\u25B6\uFE0F {action_text}", fg=typer.colors.MAGENTA)
+        return action
+
+    def _record_observation(
+        self, step: ReActStep, observation: str, context: ContextManager
+    ) -> None:
+        step.observation = observation
+        if self.debug:
+            typer.secho(f"\U0001F440 Observation: {observation}", fg=typer.colors.GREEN)
+
+        # History is managed by the ContextManager
+        context.add_step(step)
+
+    def _error_result(self, message: str, context: ContextManager) -> Tuple[str, str]:
+        return ("", f"[ERROR] {message}\n\n" + context.get_history_str())
 
-        # After the loop, assemble the final context
+    def _finalize_run(
+        self,
+        cache_key: str,
+        final_plan_args: dict | None,
+        context: ContextManager,
+        user_goal: str | None = None,
+        strategy_name: str | None = None,
+    ) -> RunResult:
+        """Assembles the final context from the finished plan and caches it."""
         if not final_plan_args:
-            return (
-                "",
-                "[ERROR] Planner did not finish with a final plan.\n\n"
-                + context.get_history_str(),
+            return self._error_result(
+                "Planner did not finish with a final plan.", context
             )
 
         schema_choice = final_plan_args.get("schema_choice", "")
@@ -227,35 +560,160 @@ class Orchestrator:
         final_context = "\n\n".join(final_context_parts)
 
         if self.result_cache:
+            dependencies = self._run_dependencies(
+                strategy_name, context, final_plan_args
+            )
             self.result_cache.set(
                 cache_key,
-                {"schema_choice": schema_choice, "final_context": final_context},
+                {
+                    "schema_choice": schema_choice,
+                    "final_context": final_context,
+                    "dependencies": dependencies,
+                },
+                namespace="run",
             )
+            self.result_cache.delete(self._checkpoint_key(cache_key))
+            if self.semantic_cache and user_goal:
+                try:
+                    self.semantic_cache.add(user_goal, RUN_CACHE_VERSION, cache_key)
+                except Exception as e:
+                    typer.secho(
+                        f"Could not index goal for the semantic cache: {e}",
+                        fg=typer.colors.YELLOW,
+                    )
         return (schema_choice, final_context, context)
 
-    def _compute_cache_key(self, user_goal: str) -> str:
-        """Generate a cache key from the goal and loaded primitives."""
-        import hashlib
-
-        parts = [user_goal]
+    def _primitive_parts(self) -> list[str]:
+        parts = []
         for p_type, prims in self.primitive_loader.primitives.items():
             for name, manifest in sorted(prims.items()):
                 version = manifest.get("version", "")
                 content_hash = manifest.get("content_hash", "")
                 parts.append(f"{p_type}:{name}:{version}:{content_hash}")
-        joined = "|".join(parts)
+        return parts
+
+    def _primitive_fingerprint(self) -> str:
+        """Hash of the loaded primitives' versions and contents."""
+        import hashlib
+
+        joined = "|".join(self._primitive_parts())
+        return hashlib.sha256(joined.encode()).hexdigest()
+
+    def _compute_cache_key(self, user_goal: str) -> str:
+        """Generate a cache key for a run of ``user_goal``.
+
+        The key covers only the goal; whether a cached run is still valid is
+        decided by the primitive versions recorded with it.
+        """
+        import hashlib
+
+        joined = f"run:{RUN_CACHE_VERSION}|{user_goal}"
+        return hashlib.sha256(joined.encode()).hexdigest()
+
+    def _run_dependencies(
+        self,
+        strategy_name: str | None,
+        context: ContextManager,
+        final_plan_args: dict,
+    ) -> dict[str, str]:
+        """The primitives a finished run touched, mapped to their versions.
+
+        These are the strategy, every action called, the chosen schema, the
+        referenced patterns and, if anything was retrieved, the knowledge
+        index.
+        """
+        names = set()
+        if strategy_name:
+            names.add(f"strategies:{strategy_name}")
+        for step in context.history:
+            tool_name = step.thought.next_action.tool_name
+            if tool_name == "retrieve_knowledge":
+                names.add("knowledge")
+            elif tool_name not in ("finish", "summary"):
+                names.add(f"actions:{tool_name}")
+        names.add(f"schemas:{final_plan_args.get('schema_choice', '')}")
+        for pattern_ref in final_plan_args.get("pattern_references", []):
+            names.add(f"patterns:{pattern_ref}")
+        return self._dependency_versions(sorted(names))
+
+    def _dependency_versions(self, names) -> dict[str, str]:
+        """Current version of each ``type:name`` dependency (or ``knowledge``)."""
+        versions = {}
+        for name in names:
+            if name == "knowledge":
+                versions[name] = self._knowledge_version()
+                continue
+            p_type, _, p_name = name.partition(":")
+            manifest = self.primitive_loader.primitives.get(p_type, {}).get(p_name)
+            if manifest is None:
+                versions[name] = ""
+            else:
+                versions[name] = (
+                    f"{manifest.get('version', '')}:{manifest.get('content_hash', '')}"
+                )
+        return versions
+
+    def _knowledge_version(self) -> str:
+        """Identifies the contents of the knowledge index."""
+        import hashlib
+
+        prims = self.primitive_loader.primitives.get("knowledge", {})
+        joined = "|".join(
+            f"{name}:{manifest.get('version', '')}:{manifest.get('content_hash', '')}"
+            for name, manifest in sorted(prims.items())
+        )
         return hashlib.sha256(joined.encode()).hexdigest()
 
-    def _compute_action_cache_key(self, action: Action) -> str:
-        """Generate a cache key for an individual action call."""
+    def _action_cache_policy(self, action: Action) -> CachePolicy:
+        """Reads the ``cache`` policy from the action's manifest."""
+        manifest = self.primitive_loader.primitives.get("actions", {}).get(
+            action.tool_name
+        )
+        declared = manifest.get("cache") if isinstance(manifest, dict) else None
+        if not declared:
+            return CachePolicy()
+        try:
+            return CachePolicy(**declared)
+        except (TypeError, ValueError) as e:
+            typer.secho(
+                f"Invalid cache policy for action '{action.tool_name}', "
+                f"not caching: {e}",
+                fg=typer.colors.YELLOW,
+            )
+            return CachePolicy(enabled=False)
+
+    def _compute_action_cache_key(
+        self, action: Action, policy: CachePolicy | None = None
+    ) -> str:
+        """Generate a cache key for an individual action call.
+
+        The key covers the action's version and, for the properties listed
+        in ``policy.key_on``, the current state of every argument that names
+        an existing file or directory.
+        """
         import hashlib
         import json
 
+        manifest = self.primitive_loader.primitives.get("actions", {}).get(
+            action.tool_name
+        )
         data = {
             "tool": action.tool_name,
             "args": action.arguments,
         }
-        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        if isinstance(manifest, dict):
+            data["version"] = (
+                f"{manifest.get('version', '')}:{manifest.get('content_hash', '')}"
+            )
+        if policy and policy.key_on:
+            data["files"] = {
+                name: _path_state(value, policy.key_on)
+                for name, value in sorted(action.arguments.items())
+                if isinstance(value, str)
+            }
+        return hashlib.sha256(
+            json.dumps(data, sort_keys=True, default=str).encode()
+        ).hexdigest()
 
     def _resolve_callback(self, match: re.Match) -> str:
         """Helper for regex substitution in _resolve_dynamic_content."""
@@ -268,7 +726,9 @@ class Orchestrator:
             if parts[0] not in ALLOWED_SHELL_COMMANDS:
                 return f"[DISALLOWED] Command '{parts[0]}' not allowed"
             try:
-                result = subprocess.run(parts, capture_output=True, text=True, check=True)
+                result = subprocess.run(
+                    parts, capture_output=True, text=True, check=True
+                )
                 return result.stdout.strip()
             except Exception as e:
                 return f"[ERROR] Command '{content}' failed: {e}"
@@ -0,0 +1,225 @@
+"""Client-side throttling for Gemini calls.
+
+Each model role (planner, synthesizer, summarizer, embedding) gets one
+process-wide :class:`ModelRateLimiter`, shared by every agent and embeddings
+object of that role. It combines requests-per-minute and tokens-per-minute
+token buckets with an AIMD (additive-increase, multiplicative-decrease) cap on
+in-flight requests that halves on 429/503 responses and creeps back up as
+calls succeed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+THROTTLE_STATUS_CODES = {429, 503}
+_THROTTLE_MARKERS = ("429", "503", "RESOURCE_EXHAUSTED", "UNAVAILABLE", "quota")
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """Best-effort HTTP status of an SDK error (google.api_core or HTTP libs)."""
+    for attr in ("code", "status_code", "status"):
+        value = getattr(error, attr, None)
+        if value is None or callable(value):
+            continue
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """True for quota / overload responses that call for backing off."""
+    code = status_code(error)
+    if code is not None:
+        return code in THROTTLE_STATUS_CODES
+    message = str(error)
+    return any(marker in message for marker in _THROTTLE_MARKERS)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for TPM budgeting."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``per_minute``.
+
+    Callers reserve tokens up front and are told how long to wait, which lets
+    the same bucket serve blocking and asyncio callers. Reservations may push
+    the balance negative; later callers then wait for that debt to refill.
+    """
+
+    def __init__(
+        self,
+        per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        refilled = self._tokens + (now - self._updated) * self.rate
+        self._tokens = min(self.capacity, refilled)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Takes ``amount`` tokens and returns the seconds to wait before use."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def adjust(self, delta: float) -> None:
+        """Charges (positive) or refunds (negative) tokens after the fact."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on concurrent requests.
+
+    Every success raises the limit by ``1 / limit`` (about one slot per "round"
+    of requests); every throttled response multiplies it by ``backoff``.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 32,
+        backoff: float = 0.5,
+        poll_interval: float = 0.05,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def _try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def aacquire(self) -> None:
+        # Polling keeps the event loop free without tying up a thread per waiter.
+        while not self._try_acquire():
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self, throttled: bool = False, succeeded: bool = True) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(float(self.minimum), self.limit * self.backoff)
+            elif succeeded:
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+class _Slot:
+    """Handle yielded by :meth:`ModelRateLimiter.limit` to settle token usage."""
+
+    def __init__(self, limiter: "ModelRateLimiter", estimated: int):
+        self._limiter = limiter
+        self._estimated = estimated
+
+    def settle(self, response: Any) -> None:
+        """Corrects the TPM charge with the usage the response reports."""
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", None)
+        if self._limiter.tpm is not None and isinstance(actual, int):
+            self._limiter.tpm.adjust(actual - self._estimated)
+
+
+class ModelRateLimiter:
+    """RPM + TPM buckets and adaptive concurrency for one model role."""
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        max_concurrency: int = 16,
+        initial_concurrency: int = 4,
+    ):
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial=initial_concurrency, maximum=max_concurrency
+        )
+
+    def _reserve(self, tokens: int) -> float:
+        wait = 0.0
+        if self.rpm is not None:
+            wait = max(wait, self.rpm.reserve(1))
+        if self.tpm is not None:
+            wait = max(wait, self.tpm.reserve(tokens))
+        return wait
+
+    @contextmanager
+    def limit(self, tokens: int = 1) -> Iterator[_Slot]:
+        """Blocks until the call fits the budgets, then holds a concurrency slot."""
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        self.concurrency.acquire()
+        try:
+            yield _Slot(self, tokens)
+        except BaseException as e:
+            self.concurrency.release(throttled=is_throttle_error(e), succeeded=False)
+            raise
+        self.concurrency.release()
+
+    @asynccontextmanager
+    async def alimit(self, tokens: int = 1) -> AsyncIterator[_Slot]:
+        """Async counterpart of :meth:`limit`."""
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        await self.concurrency.aacquire()
+        try:
+            yield _Slot(self, tokens)
+        except BaseException as e:
+            self.concurrency.release(throttled=is_throttle_error(e), succeeded=False)
+            raise
+        self.concurrency.release()
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(role: str) -> ModelRateLimiter:
+    """Returns the process-wide limiter for ``role``, creating it on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(role)
+        if limiter is None:
+            from .config import get_rate_limits
+
+            limiter = ModelRateLimiter(**get_rate_limits(role))
+            _limiters[role] = limiter
+        return limiter
@@ -0,0 +1,224 @@
+"""Retries with jittered exponential backoff and a circuit breaker for model calls.
+
+Gemini calls are idempotent, so transient failures (timeouts, connection
+resets, 429/5xx) are retried instead of aborting a run that may already have
+spent several planner steps. A per-role :class:`CircuitBreaker` stops hammering
+an endpoint that keeps failing and fails fast with :class:`CircuitOpenError`
+until a cool-down has passed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from .ratelimit import is_throttle_error, status_code
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an endpoint whose circuit is open."""
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """True for failures that a later, identical request may not hit."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    # ``asyncio.wait_for`` raises ``asyncio.TimeoutError``, which is only an
+    # alias of the builtin ``TimeoutError`` from Python 3.11 on.
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    return is_throttle_error(error)
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how patiently to retry a model call.
+
+    ``timeout`` is the deadline for a single attempt in seconds; backoff
+    between attempts uses "full jitter" (a uniform delay up to the capped
+    exponential step) so that concurrent callers do not retry in lockstep.
+    """
+
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    timeout: Optional[float] = 120.0
+    sleep: Callable[[float], None] = field(default=time.sleep, repr=False)
+
+    def delays(self) -> Iterator[float]:
+        """Yields the wait before each retry (``max_attempts - 1`` values)."""
+        for attempt in range(self.max_attempts - 1):
+            cap = min(self.max_delay, self.base_delay * 2**attempt)
+            yield random.uniform(0, cap)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive transient failures.
+
+    While open, calls fail fast. Once ``reset_timeout`` seconds have passed a
+    single trial call is let through (half-open); its outcome closes the
+    circuit again or re-opens it for another cool-down.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self) -> None:
+        """Raises :class:`CircuitOpenError` unless a call may proceed."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (self._clock() - self._opened_at)
+            if remaining > 0 or self._trial_in_flight:
+                raise CircuitOpenError(
+                    f"Model endpoint unavailable after {self._failures} consecutive "
+                    f"failures; retrying in {max(remaining, 0):.0f}s"
+                )
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+    def record_other(self) -> None:
+        """A call failed for a non-transient reason: the endpoint is up."""
+        self.record_success()
+
+    def abandon(self) -> None:
+        """A call was interrupted (e.g. cancelled) before it had an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    on_retry: Optional[Callable[[BaseException, int, float], None]] = None,
+) -> T:
+    """Calls ``fn`` until it succeeds, a non-transient error occurs, or
+    ``policy`` runs out of attempts; the last error is re-raised."""
+    delays = policy.delays()
+    attempt = 1
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = fn()
+        except Exception as e:
+            delay = _after_failure(e, breaker, delays)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(e, attempt, delay)
+            policy.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            if breaker is not None:
+                breaker.abandon()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+async def acall_with_retry(
+    fn: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    on_retry: Optional[Callable[[BaseException, int, float], None]] = None,
+) -> T:
+    """Async counterpart of :func:`call_with_retry`."""
+    delays = policy.delays()
+    attempt = 1
+    while True:
+        if breaker is not None:
+            breaker.before_call()
+        try:
+            result = await fn()
+        except Exception as e:
+            delay = _after_failure(e, breaker, delays)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(e, attempt, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            if breaker is not None:
+                breaker.abandon()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+def _after_failure(
+    error: BaseException, breaker: Optional[CircuitBreaker], delays: Iterator[float]
+) -> Optional[float]:
+    """Records ``error`` and returns the backoff, or ``None`` to give up."""
+    transient = is_transient_error(error)
+    if breaker is not None and not isinstance(error, CircuitOpenError):
+        if transient:
+            breaker.record_failure()
+        else:
+            breaker.record_other()
+    if not transient:
+        return None
+    return next(delays, None)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(role: str) -> CircuitBreaker:
+    """Returns the process-wide breaker for ``role``, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(role)
+        if breaker is None:
+            breaker = _breakers[role] = CircuitBreaker()
+        return breaker
+
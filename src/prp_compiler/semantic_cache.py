@@ -0,0 +1,179 @@
+"""Serves near-duplicate goals from earlier compilations.
+
+Goals of finished runs are embedded and kept, with the run's cache key, in a
+small vector index inside the result-cache database. A new goal whose cosine
+similarity to an indexed goal reaches the threshold reuses that run's
+``schema_choice``/``final_context``; every such hit is logged to
+``semantic_hits`` with its score so that matches can be audited. The hit log
+outlives the runs it names and is pruned after ``hit_retention_days``.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+
+import numpy as np
+
+from .cache import ResultCache
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_HIT_RETENTION_DAYS = 30
+
+# Indexed goals are deleted along with the run entry their ``cache_key`` names.
+_GOALS_COLUMNS = (
+    "cache_key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, goal TEXT NOT NULL, "
+    "vector BLOB NOT NULL, timestamp TEXT NOT NULL"
+)
+_HITS_COLUMNS = (
+    "timestamp TEXT NOT NULL, goal TEXT NOT NULL, matched_goal TEXT NOT NULL, "
+    "cache_key TEXT NOT NULL, similarity REAL NOT NULL"
+)
+
+
+@dataclass
+class SemanticMatch:
+    cache_key: str
+    goal: str
+    similarity: float
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+class SemanticCache:
+    """
+    Nearest-goal lookup over the runs stored in a :class:`ResultCache`.
+
+    ``embeddings`` is any object with LangChain's ``embed_query`` (the
+    knowledge store's model). The index is partitioned by ``fingerprint``;
+    only goals indexed under the caller's fingerprint are candidates. The
+    goals of a partition are held in memory and reloaded when the table
+    changes, including when another process adds or removes goals.
+    """
+
+    def __init__(
+        self,
+        result_cache: ResultCache,
+        embeddings: Any,
+        threshold: float = DEFAULT_THRESHOLD,
+        hit_retention_days: float = DEFAULT_HIT_RETENTION_DAYS,
+    ) -> None:
+        self.result_cache = result_cache
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.hit_retention_days = hit_retention_days
+        self._lock = threading.Lock()
+        # fingerprint -> (version, cache keys, goals, unit vectors row-wise)
+        self._index: dict[str, tuple[tuple, list[str], list[str], np.ndarray]] = {}
+        result_cache.add_table("semantic_goals", _GOALS_COLUMNS, key_column="cache_key")
+        result_cache.add_table("semantic_hits", _HITS_COLUMNS)
+        result_cache.execute(
+            "CREATE INDEX IF NOT EXISTS idx_semantic_goals_fingerprint "
+            "ON semantic_goals (fingerprint)"
+        )
+        result_cache.execute(
+            "CREATE INDEX IF NOT EXISTS idx_semantic_hits_timestamp "
+            "ON semantic_hits (timestamp)"
+        )
+
+    def _version(self, fingerprint: str) -> tuple:
+        """Changes whenever a goal of the partition is added, replaced or
+        removed: replacing a row gives it a new rowid."""
+        (row,) = self.result_cache.query(
+            "SELECT COUNT(*), MAX(rowid) FROM semantic_goals WHERE fingerprint = ?",
+            (fingerprint,),
+        )
+        return tuple(row)
+
+    def _load(self, fingerprint: str) -> tuple[list[str], list[str], np.ndarray]:
+        rows = self.result_cache.query(
+            "SELECT cache_key, goal, vector FROM semantic_goals WHERE fingerprint = ?",
+            (fingerprint,),
+        )
+        keys = [row[0] for row in rows]
+        goals = [row[1] for row in rows]
+        vectors = [np.frombuffer(row[2], dtype=np.float32) for row in rows]
+        matrix = np.vstack(vectors) if vectors else np.empty((0, 0), np.float32)
+        return keys, goals, matrix
+
+    def lookup(self, goal: str, fingerprint: str) -> Optional[SemanticMatch]:
+        """Returns the most similar indexed goal at or above the threshold."""
+        version = self._version(fingerprint)
+        with self._lock:
+            index = self._index.get(fingerprint)
+            if index is None or index[0] != version:
+                index = self._index[fingerprint] = (version, *self._load(fingerprint))
+        _, keys, goals, matrix = index
+        if not keys:
+            return None
+        query = _unit(self.embeddings.embed_query(goal))
+        if query.shape[0] != matrix.shape[1]:
+            return None  # indexed with a different embedding model
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        if similarity < self.threshold:
+            return None
+        return SemanticMatch(keys[best], goals[best], similarity)
+
+    def record_hit(self, goal: str, match: SemanticMatch) -> None:
+        """Logs a hit and prunes hits older than the retention period."""
+        now = datetime.utcnow()
+        self.result_cache.execute(
+            "INSERT INTO semantic_hits VALUES (?, ?, ?, ?, ?)",
+            (now.isoformat(), goal, match.goal, match.cache_key, match.similarity),
+        )
+        cutoff = now - timedelta(days=self.hit_retention_days)
+        self.result_cache.execute(
+            "DELETE FROM semantic_hits WHERE timestamp < ?", (cutoff.isoformat(),)
+        )
+
+    def forget(self, cache_key: str) -> None:
+        """Drops an indexed goal whose run is no longer in the cache."""
+        self.result_cache.execute(
+            "DELETE FROM semantic_goals WHERE cache_key = ?", (cache_key,)
+        )
+
+    def add(self, goal: str, fingerprint: str, cache_key: str) -> None:
+        """Indexes the goal of a finished run."""
+        vector = _unit(self.embeddings.embed_query(goal))
+        self.result_cache.execute(
+            "INSERT OR REPLACE INTO semantic_goals VALUES (?, ?, ?, ?, ?)",
+            (
+                cache_key,
+                fingerprint,
+                goal,
+                vector.tobytes(),
+                datetime.utcnow().isoformat(),
+            ),
+        )
+
+    def hits(self, limit: int = 50) -> list[dict[str, Any]]:
+        """The most recent semantic hits, newest first."""
+        rows = self.result_cache.query(
+            "SELECT timestamp, goal, matched_goal, cache_key, similarity "
+            "FROM semantic_hits ORDER BY timestamp DESC LIMIT ?",
+            (limit,),
+        )
+        columns = ("timestamp", "goal", "matched_goal", "cache_key", "similarity")
+        return [dict(zip(columns, row)) for row in rows]
+
+
+def build_semantic_cache(
+    result_cache: Optional[ResultCache], knowledge_store: Any
+) -> Optional[SemanticCache]:
+    """Returns a semantic cache over the knowledge store's embedding model if
+    ``PRP_SEMANTIC_CACHE_THRESHOLD`` is set, else ``None``."""
+    from .config import get_semantic_cache_threshold
+
+    threshold = get_semantic_cache_threshold()
+    embeddings = getattr(knowledge_store, "embeddings", None)
+    if threshold is None or result_cache is None or embeddings is None:
+        return None
+    return SemanticCache(result_cache, embeddings, threshold)
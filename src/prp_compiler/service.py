@@ -0,0 +1,449 @@
+"""Warm runtime and job workers shared by the long-running ``serve`` modes."""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import queue
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import typer
+
+from .agents.planner import PlannerAgent
+from .agents.synthesizer import SynthesizerAgent
+from .cache import ResultCache
+from .config import get_model_name, llm_cache_enabled
+from .knowledge import ChromaKnowledgeStore, NumpyKnowledgeStore, VectorStore
+from .orchestrator import Orchestrator
+from .primitives import PrimitiveLoader
+from .semantic_cache import build_semantic_cache
+
+Job = tuple[str, Path]
+
+
+def write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key onto one in-flight task."""
+
+    def __init__(self) -> None:
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def is_inflight(self, key: str) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Awaits the running task for ``key`` or starts one from ``factory``.
+
+        Every caller receives the leader's result or exception. The task is
+        shielded so a cancelled waiter does not cancel the work the others
+        are waiting on.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class CompileClaims:
+    """
+    Coalesces identical compilations across processes that share a result
+    cache, as :class:`SingleFlight` does within one event loop.
+
+    The first process to compile a key inserts a claim row; the others poll
+    until it is released and then take the PRP the leader published in the
+    ``claim`` namespace. A claim expires after ``ttl_seconds``, so a worker
+    that dies mid-compile holds up the others for at most that long.
+    """
+
+    def __init__(
+        self,
+        result_cache: ResultCache,
+        ttl_seconds: float = 600.0,
+        poll_interval: float = 0.5,
+    ) -> None:
+        self.result_cache = result_cache
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+        self.coalesced = 0
+        result_cache.add_table(
+            "compile_claims",
+            "claim_key TEXT PRIMARY KEY, pid INTEGER NOT NULL, "
+            "expires_at TEXT NOT NULL",
+        )
+
+    def try_claim(self, key: str) -> bool:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+        return (
+            self.result_cache.execute(
+                "INSERT INTO compile_claims VALUES (?, ?, ?) ON CONFLICT(claim_key)"
+                " DO UPDATE SET pid = excluded.pid, expires_at = excluded.expires_at"
+                " WHERE compile_claims.expires_at < ?",
+                (key, os.getpid(), expires_at.isoformat(), now.isoformat()),
+            )
+            == 1
+        )
+
+    def is_claimed(self, key: str) -> bool:
+        return bool(
+            self.result_cache.query(
+                "SELECT 1 FROM compile_claims WHERE claim_key = ? AND expires_at >= ?",
+                (key, datetime.utcnow().isoformat()),
+            )
+        )
+
+    def release(self, key: str) -> None:
+        self.result_cache.execute(
+            "DELETE FROM compile_claims WHERE claim_key = ? AND pid = ?",
+            (key, os.getpid()),
+        )
+
+    def _publish(self, key: str, result: dict) -> None:
+        self.result_cache.set(
+            f"claim:{key}", result, namespace="claim", ttl_hours=self.ttl_seconds / 3600
+        )
+        self.result_cache.flush()  # visible to the waiting processes
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[dict]]) -> dict:
+        """Runs ``factory`` unless another process is already compiling
+        ``key``, in which case its result is returned instead."""
+        while True:
+            if await asyncio.to_thread(self.try_claim, key):
+                await asyncio.to_thread(self.result_cache.delete, f"claim:{key}")
+                try:
+                    result = await factory()
+                    await asyncio.to_thread(self._publish, key, result)
+                    return result
+                finally:
+                    await asyncio.to_thread(self.release, key)
+            while await asyncio.to_thread(self.is_claimed, key):
+                await asyncio.sleep(self.poll_interval)
+            published = await asyncio.to_thread(
+                self.result_cache.get, f"claim:{key}", namespace="claim"
+            )
+            if published is not None:
+                self.coalesced += 1
+                return published
+            # The leader failed or its claim expired: compile it here.
+
+
+def runtime_settings(
+    primitives_path: Path,
+    vector_db_path: Path,
+    cache_db_path: Path,
+    constitution_path: Path,
+    vector_backend: str = "chroma",
+) -> dict[str, str]:
+    """The settings a runtime is loaded with, with paths made absolute, so
+    that a ``compile`` client can tell whether a daemon matches its own."""
+    return {
+        "primitives_path": str(primitives_path.resolve()),
+        "vector_db_path": str(vector_db_path.resolve()),
+        "vector_backend": vector_backend,
+        "cache_db_path": str(cache_db_path.resolve()),
+        "constitution_path": str(constitution_path.resolve()),
+    }
+
+
+class CompilerRuntime:
+    """
+    Everything a compilation needs that is expensive to build: the scanned
+    primitive library, the opened knowledge store, the result cache and the
+    planner with its tool schemas already converted for Gemini.
+    """
+
+    def __init__(
+        self,
+        loader: PrimitiveLoader,
+        knowledge_store: VectorStore,
+        result_cache: ResultCache | None,
+        constitution: str = "",
+        debug: bool = False,
+    ):
+        self.loader = loader
+        self.knowledge_store = knowledge_store
+        self.result_cache = result_cache
+        self.constitution = constitution
+        self.debug = debug
+        self.planner = PlannerAgent(loader, model_name=get_model_name("planner"))
+        self.synthesizer = SynthesizerAgent()
+        self.single_flight = SingleFlight()
+        self.claims = CompileClaims(result_cache) if result_cache is not None else None
+        self.semantic_cache = build_semantic_cache(result_cache, knowledge_store)
+        # Set by :meth:`load`; see :func:`runtime_settings`.
+        self.settings: dict[str, str] | None = None
+        self._memoize_responses()
+
+    @classmethod
+    def load(
+        cls,
+        primitives_path: Path,
+        vector_db_path: Path,
+        cache_db_path: Path,
+        constitution_path: Path,
+        debug: bool = False,
+        vector_backend: str = "chroma",
+    ) -> "CompilerRuntime":
+        loader = PrimitiveLoader(primitives_path)
+        store_class = (
+            NumpyKnowledgeStore if vector_backend == "numpy" else ChromaKnowledgeStore
+        )
+        knowledge_store: VectorStore = store_class(persist_directory=vector_db_path)
+        if vector_db_path.exists():
+            knowledge_store.load()
+        else:
+            knowledge_store.build(loader.get_all("knowledge"))
+        constitution = (
+            constitution_path.read_text() if constitution_path.exists() else ""
+        )
+        runtime = cls(
+            loader,
+            knowledge_store,
+            ResultCache(cache_db_path),
+            constitution=constitution,
+            debug=debug,
+        )
+        runtime.settings = runtime_settings(
+            primitives_path,
+            vector_db_path,
+            cache_db_path,
+            constitution_path,
+            vector_backend,
+        )
+        return runtime
+
+    def reopen_stores(self) -> None:
+        """
+        Reopens the knowledge store's clients, the result cache and the
+        semantic cache in a forked child. Their SQLite connections, Chroma
+        client and embedding clients were opened by the parent and must not
+        cross a fork; the loaded index, the primitives and the agents stay
+        shared.
+        """
+        self.knowledge_store.reopen()
+        if self.result_cache is not None:
+            self.result_cache = ResultCache(self.result_cache.db_path)
+            self.claims = CompileClaims(self.result_cache)
+        self.semantic_cache = build_semantic_cache(
+            self.result_cache, self.knowledge_store
+        )
+        self._memoize_responses()
+
+    def _memoize_responses(self) -> None:
+        """Points the agents' response memo at the result cache when
+        ``PRP_LLM_CACHE`` is set."""
+        if self.result_cache is not None and llm_cache_enabled():
+            self.planner.response_cache = self.result_cache
+            self.synthesizer.response_cache = self.result_cache
+
+    def close(self) -> None:
+        """Commits any buffered cache writes; call before the process exits."""
+        if self.result_cache is not None:
+            self.result_cache.close()
+
+    def make_orchestrator(self) -> Orchestrator:
+        return Orchestrator(
+            self.loader,
+            self.knowledge_store,
+            self.result_cache,
+            debug=self.debug,
+            planner=self.planner,
+            semantic_cache=self.semantic_cache,
+        )
+
+    async def acompile(
+        self, goal: str, out_path: Path, strategy_name: str | None = None
+    ) -> Path:
+        """Runs planner and synthesizer for one goal and writes the PRP JSON.
+
+        Identical goals that arrive while one is already being compiled wait
+        for that job's PRP instead of starting their own ReAct loop, whether
+        the job runs in this process or, through :class:`CompileClaims`, in
+        another one sharing the result cache.
+        """
+        orchestrator = self.make_orchestrator()
+        key = orchestrator._compute_cache_key(goal)
+        if strategy_name:
+            key = f"{key}:{strategy_name}"
+        if self.single_flight.is_inflight(key):
+            typer.echo(f"Waiting on in-flight compilation of: {goal}")
+
+        def build() -> Awaitable[dict]:
+            if self.claims is None:
+                return self._abuild_prp(orchestrator, goal, strategy_name)
+            return self.claims.do(
+                key, lambda: self._abuild_prp(orchestrator, goal, strategy_name)
+            )
+
+        prp = await self.single_flight.do(key, build)
+        await asyncio.to_thread(write_json, out_path, prp)
+        return out_path
+
+    async def _abuild_prp(
+        self, orchestrator: Orchestrator, goal: str, strategy_name: str | None
+    ) -> dict:
+        run_result = await orchestrator.arun(
+            goal, self.constitution, strategy_name=strategy_name
+        )
+        if len(run_result) != 3:
+            raise RuntimeError(run_result[1])
+        schema_choice, final_context, _ = run_result
+        schema_str = self.loader.get_primitive_content("schemas", schema_choice)
+        return await self.synthesizer.asynthesize(
+            json.loads(schema_str), final_context, self.constitution
+        )
+
+
+@dataclass
+class ThroughputStats:
+    """Completed/failed job counters for one consumer process."""
+
+    label: str
+    pid: int = field(default_factory=os.getpid)
+    completed: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.monotonic)
+    elapsed: float = 0.0
+
+    def stop(self) -> None:
+        self.elapsed = time.monotonic() - self.started
+
+    def summary(self) -> str:
+        per_minute = self.completed / self.elapsed * 60 if self.elapsed else 0.0
+        return (
+            f"{self.label} (pid {self.pid}): {self.completed} completed, "
+            f"{self.failed} failed in {self.elapsed:.1f}s "
+            f"({per_minute:.2f} jobs/min)"
+        )
+
+
+async def consume_jobs(
+    runtime: CompilerRuntime,
+    name: str,
+    get_job: Callable[[], Awaitable[Any]],
+    stats: ThroughputStats,
+) -> None:
+    """Worker coroutine: compiles jobs until it receives a ``None`` sentinel."""
+    while True:
+        job = await get_job()
+        if job is None:
+            return
+        goal, out_path = job[0], Path(job[1])
+        typer.echo(f"{name} starting: {goal}")
+        try:
+            await runtime.acompile(goal, out_path)
+        except Exception as e:
+            stats.failed += 1
+            typer.secho(f"{name} failed: {e}", fg=typer.colors.RED)
+            continue
+        stats.completed += 1
+        typer.echo(f"{name} finished: {out_path}")
+
+
+def _process_main(
+    runtime: CompilerRuntime,
+    index: int,
+    workers: int,
+    job_queue: Any,
+    stats_queue: Any,
+) -> None:
+    """Entry point of a forked consumer process."""
+    runtime.reopen_stores()
+    stats = ThroughputStats(label=f"Process {index}")
+
+    async def get_job():
+        return await asyncio.to_thread(job_queue.get)
+
+    async def main_async():
+        await asyncio.gather(
+            *(
+                consume_jobs(runtime, f"Process {index} worker {i + 1}", get_job, stats)
+                for i in range(workers)
+            )
+        )
+
+    try:
+        asyncio.run(main_async())
+    finally:
+        # Forked children exit without running atexit hooks.
+        runtime.close()
+    stats.stop()
+    stats_queue.put(asdict(stats))
+
+
+def serve_processes(
+    runtime: CompilerRuntime,
+    procs: int,
+    workers: int,
+    read_goal: Callable[[], str],
+    after_fork: Callable[[], None] | None = None,
+) -> list[ThroughputStats]:
+    """
+    Forks ``procs`` consumer processes from the preloaded ``runtime`` and feeds
+    them goals from ``read_goal`` until it returns an empty string.
+    ``after_fork`` runs in the parent once every child has started; start
+    threads there, since a thread running during the fork can leave a lock
+    held in the children.
+
+    Each process runs ``workers`` async consumers on its own event loop, so CPU
+    work such as tokenization and schema validation spreads across cores while
+    the loaded primitives and knowledge store are shared copy-on-write.
+    """
+    ctx = multiprocessing.get_context("fork")
+    job_queue = ctx.Queue()
+    stats_queue = ctx.Queue()
+
+    # Move everything allocated so far out of the collector's reach so that
+    # collections in the children do not write to, and thereby un-share, the
+    # pages holding the preloaded runtime.
+    gc.freeze()
+    processes = [
+        ctx.Process(
+            target=_process_main,
+            args=(runtime, i + 1, workers, job_queue, stats_queue),
+            daemon=True,
+        )
+        for i in range(procs)
+    ]
+    for process in processes:
+        process.start()
+    if after_fork is not None:
+        after_fork()
+
+    while True:
+        goal = read_goal()
+        if not goal:
+            break
+        job_queue.put((goal, str(Path(f"{goal.replace(' ', '_')}.json"))))
+    for _ in range(procs * workers):
+        job_queue.put(None)
+
+    results: list[ThroughputStats] = []
+    while len(results) < len(processes):
+        try:
+            results.append(ThroughputStats(**stats_queue.get(timeout=1.0)))
+        except queue.Empty:
+            # A consumer that died without reporting must not hang the parent.
+            if not any(process.is_alive() for process in processes):
+                break
+    for process in processes:
+        process.join()
+    gc.unfreeze()
+    return results
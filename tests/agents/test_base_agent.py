@@ -1,4 +1,10 @@
+import asyncio
+
+import pytest
+
 from src.prp_compiler.agents.base_agent import BaseAgent
+from src.prp_compiler.cache import ResultCache
+from src.prp_compiler.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
 
 
 class DummyModel:
@@ -20,3 +26,151 @@ def test_generate_content_handles_text_error(monkeypatch):
     monkeypatch.setattr(agent, "_log_debug", lambda *a, **k: None)
     response = agent.generate_content("prompt")
     assert response.__class__.__name__ == "Response"
+
+
+def test_agenerate_content_prefers_native_async(monkeypatch):
+    class AsyncModel:
+        def generate_content(self, *args, **kwargs):
+            raise AssertionError("sync path should not be used")
+
+        async def generate_content_async(self, prompt, **kwargs):
+            return f"async:{prompt}"
+
+    agent = BaseAgent()
+    agent.model = AsyncModel()
+    monkeypatch.setattr(agent, "_log_debug", lambda *a, **k: None)
+    assert asyncio.run(agent.agenerate_content("p")) == "async:p"
+
+
+def test_agenerate_content_runs_sync_model_in_thread(monkeypatch):
+    agent = BaseAgent()
+    agent.model = DummyModel()
+    monkeypatch.setattr(agent, "_log_debug", lambda *a, **k: None)
+    response = asyncio.run(agent.agenerate_content("prompt"))
+    assert response.__class__.__name__ == "Response"
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+class FlakyModel:
+    """Fails with 503 ``failures`` times, then answers."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls.append(kwargs)
+        if len(self.calls) <= self.failures:
+            raise Unavailable("503 Service Unavailable")
+        return "ok"
+
+
+def _resilient_agent(monkeypatch, model, max_attempts=4, breaker=None):
+    agent = BaseAgent()
+    agent.model = model
+    agent.retry_policy = RetryPolicy(max_attempts=max_attempts, sleep=lambda s: None)
+    agent.circuit_breaker = breaker or CircuitBreaker()
+    monkeypatch.setattr(agent, "_log_debug", lambda *a, **k: None)
+    return agent
+
+
+def test_generate_content_retries_transient_errors(monkeypatch):
+    model = FlakyModel(failures=2)
+    agent = _resilient_agent(monkeypatch, model)
+
+    assert agent.generate_content("prompt") == "ok"
+    assert len(model.calls) == 3
+    assert model.calls[0]["request_options"] == {"timeout": agent.retry_policy.timeout}
+
+
+def test_generate_content_gives_up_after_max_attempts(monkeypatch):
+    model = FlakyModel(failures=10)
+    agent = _resilient_agent(monkeypatch, model, max_attempts=3)
+
+    with pytest.raises(Unavailable):
+        agent.generate_content("prompt")
+    assert len(model.calls) == 3
+
+
+def test_generate_content_does_not_retry_client_errors(monkeypatch):
+    class BadRequest(Exception):
+        code = 400
+
+    class RejectingModel:
+        calls = 0
+
+        def generate_content(self, prompt, **kwargs):
+            RejectingModel.calls += 1
+            raise BadRequest("invalid argument")
+
+    agent = _resilient_agent(monkeypatch, RejectingModel())
+    with pytest.raises(BadRequest):
+        agent.generate_content("prompt")
+    assert RejectingModel.calls == 1
+
+
+def test_circuit_breaker_fails_fast_when_endpoint_is_down(monkeypatch):
+    model = FlakyModel(failures=100)
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    agent = _resilient_agent(monkeypatch, model, max_attempts=10, breaker=breaker)
+
+    with pytest.raises(CircuitOpenError):
+        agent.generate_content("prompt")
+    assert len(model.calls) == 3
+    with pytest.raises(CircuitOpenError):
+        agent.generate_content("prompt")
+    assert len(model.calls) == 3
+
+
+def test_agenerate_content_retries_transient_errors(monkeypatch):
+    model = FlakyModel(failures=1)
+    agent = _resilient_agent(monkeypatch, model)
+    agent.retry_policy.base_delay = 0
+
+    assert asyncio.run(agent.agenerate_content("prompt")) == "ok"
+    assert len(model.calls) == 2
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+
+        class Response:
+            text = f"answer {self.calls}"
+            candidates = []
+            usage_metadata = None
+
+        return Response()
+
+
+def test_response_cache_memoizes_by_prompt_and_tools(monkeypatch, tmp_path):
+    agent = BaseAgent()
+    agent.model = CountingModel()
+    agent.response_cache = ResultCache(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(agent, "_log_debug", lambda *a, **k: None)
+
+    assert agent.generate_content("p").text == "answer 1"
+    assert agent.generate_content("p").text == "answer 1"
+    assert asyncio.run(agent.agenerate_content("p")).text == "answer 1"
+    assert agent.generate_content("p", tools=[{"name": "t"}]).text == "answer 2"
+    assert agent.model.calls == 2
+
+
+def test_rejected_response_is_not_replayed(monkeypatch, tmp_path):
+    agent = BaseAgent()
+    agent.model = CountingModel()
+    agent.response_cache = ResultCache(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(agent, "_log_debug", lambda *a, **k: None)
+
+    def parse(response):
+        raise ValueError(f"bad {response.text}")
+
+    with pytest.raises(ValueError):
+        agent._parse_response(parse, agent.generate_content("p"), "p")
+    assert agent.generate_content("p").text == "answer 2"
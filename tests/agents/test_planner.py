@@ -58,3 +58,25 @@ def test_plan_step_uses_strategy(mock_generative_model, mock_primitive_loader):
     assert isinstance(step, ReActStep)
     called_prompt = mock_model.generate_content.call_args[0][0]
     assert "My Strategy" in called_prompt
+
+
+@patch("src.prp_compiler.agents.base_agent.genai.GenerativeModel")
+def test_plan_steps_returns_every_function_call(mock_generative_model):
+    loader = MagicMock()
+    loader.get_all.return_value = [{"name": "s", "description": "d"}]
+    mock_model = mock_generative_model.return_value
+    parts = []
+    for query in ("a", "b"):
+        fc = MagicMock()
+        fc.name = "retrieve_knowledge"
+        fc.args = {"reasoning": "r", "criticism": "c", "query": query}
+        parts.append(MagicMock(function_call=fc))
+    text_part = MagicMock(function_call=None)
+    mock_model.generate_content.return_value = MagicMock(
+        candidates=[MagicMock(content=MagicMock(parts=[parts[0], text_part, parts[1]]))]
+    )
+
+    planner = PlannerAgent(loader)
+    steps = planner.plan_steps("goal", "", "My Strategy", [])
+
+    assert [s.thought.next_action.arguments["query"] for s in steps] == ["a", "b"]
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from unittest.mock import MagicMock
 
@@ -72,3 +73,45 @@ def test_synthesizer_fails_after_max_retries(synthesizer_agent, sample_schema):
             sample_schema, "context", "constitution", max_retries=2
         )
     assert synthesizer_agent.model.generate_content.call_count == 2
+
+def test_asynthesize_valid_json(synthesizer_agent, sample_schema):
+    valid_json = {"goal": "Test goal"}
+    synthesizer_agent.model.generate_content.return_value = MagicMock(
+        text=json.dumps(valid_json)
+    )
+
+    result = asyncio.run(
+        synthesizer_agent.asynthesize(sample_schema, "context", "constitution")
+    )
+
+    assert result == valid_json
+    synthesizer_agent.model.generate_content.assert_called_once()
+
+def test_synthesizer_stream_aborts_on_first_violation(synthesizer_agent):
+    schema = {
+        "type": "object",
+        "properties": {"goal": {"type": "string"}, "why": {"type": "string"}},
+        "required": ["goal", "why"],
+    }
+    consumed = []
+
+    def chunks(texts):
+        for text in texts:
+            consumed.append(text)
+            yield MagicMock(text=text)
+
+    synthesizer_agent.model.generate_content.side_effect = [
+        chunks(['{"goal": 1,', ' "why": "never read"}']),
+        chunks(['{"goal": "g", ', '"why": "w"}']),
+    ]
+
+    result = synthesizer_agent.synthesize(schema, "context", "", stream=True)
+
+    assert result == {"goal": "g", "why": "w"}
+    assert consumed == ['{"goal": 1,', '{"goal": "g", ', '"why": "w"}']
+    second_prompt = synthesizer_agent.model.generate_content.call_args_list[1][0][0]
+    assert "Property 'goal'" in second_prompt
+    assert synthesizer_agent.model.generate_content.call_args_list[0][1] == {
+        "stream": True,
+        "request_options": {"timeout": synthesizer_agent.retry_policy.timeout},
+    }
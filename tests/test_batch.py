@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import pytest
+
+from src.prp_compiler.batch import load_completed, load_goals, run_batch
+
+
+class FakeRuntime:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.compiled = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def acompile(self, goal, out_path, strategy_name=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if goal in self.fail:
+            raise RuntimeError("planner gave up")
+        self.compiled.append(goal)
+        out_path.write_text(json.dumps({"goal": goal}))
+        return out_path
+
+
+def test_load_goals_accepts_strings_and_objects(tmp_path):
+    goals = tmp_path / "goals.jsonl"
+    goals.write_text('"plain goal"\n\n{"id": "x", "goal": "g", "strategy": "s"}\n')
+    items = load_goals(goals)
+    assert [i.goal for i in items] == ["plain goal", "g"]
+    assert items[1].id == "x" and items[1].strategy == "s"
+    assert load_goals(goals)[0].id == items[0].id
+
+
+def test_load_goals_rejects_duplicate_ids(tmp_path):
+    goals = tmp_path / "goals.jsonl"
+    goals.write_text('{"id": "a", "goal": "1"}\n{"id": "a", "goal": "2"}\n')
+    with pytest.raises(ValueError, match="duplicate"):
+        load_goals(goals)
+
+
+@pytest.mark.parametrize("item_id", ["../escape", "a/b", "..", "a\\b"])
+def test_load_goals_rejects_ids_that_are_not_file_names(tmp_path, item_id):
+    goals = tmp_path / "goals.jsonl"
+    goals.write_text(json.dumps({"id": item_id, "goal": "g"}) + "\n")
+    with pytest.raises(ValueError, match="invalid id"):
+        load_goals(goals)
+
+
+def test_run_batch_bounds_concurrency_and_resumes(tmp_path):
+    goals = tmp_path / "goals.jsonl"
+    lines = (json.dumps({"id": str(i), "goal": f"g{i}"}) for i in range(6))
+    goals.write_text("\n".join(lines))
+    items = load_goals(goals)
+    out_dir = tmp_path / "out"
+    summary = out_dir / "summary.jsonl"
+
+    runtime = FakeRuntime(fail={"g2"})
+    report = asyncio.run(run_batch(runtime, items, out_dir, summary, concurrency=2))
+    assert (report.completed, report.failed, report.skipped) == (5, 1, 0)
+    assert runtime.max_in_flight == 2
+    assert load_completed(summary) == {"0", "1", "3", "4", "5"}
+
+    retry = FakeRuntime()
+    report = asyncio.run(run_batch(retry, items, out_dir, summary, concurrency=2))
+    assert retry.compiled == ["g2"]
+    assert (report.completed, report.failed, report.skipped) == (1, 0, 5)
+    assert load_completed(summary) == {str(i) for i in range(6)}
+
+
+def test_run_batch_rejects_zero_concurrency(tmp_path):
+    with pytest.raises(ValueError, match="concurrency"):
+        asyncio.run(
+            run_batch(FakeRuntime(), [], tmp_path / "out", tmp_path / "s.jsonl", 0)
+        )
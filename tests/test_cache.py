@@ -0,0 +1,354 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from src.prp_compiler.cache import ACCESS_FLUSH_INTERVAL, LRUCache, ResultCache
+
+
+def test_buffered_writes_are_visible_before_flush(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db, commit_interval=60)
+    other = ResultCache(db)
+
+    cache.set("k", {"result": 1})
+    assert cache.get("k") == {"result": 1}
+    assert other.get("k") is None  # not committed yet
+
+    cache.flush()
+    assert other.get("k") == {"result": 1}
+
+
+def test_close_commits_pending_writes(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db, commit_interval=60)
+    cache.set("k", {"result": "v"})
+    cache.close()
+
+    assert ResultCache(db).get("k") == {"result": "v"}
+
+
+def test_database_uses_wal_journal(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    ResultCache(db).close()
+    mode = sqlite3.connect(db).execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_concurrent_readers_and_writers(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    caches = [ResultCache(db, commit_interval=0.01) for _ in range(2)]
+
+    def work(i):
+        cache = caches[i % 2]
+        cache.set(f"k{i}", {"result": i})
+        assert cache.get(f"k{i}") == {"result": i}
+        cache.flush()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, range(64)))
+
+    reader = ResultCache(db)
+    assert all(reader.get(f"k{i}") == {"result": i} for i in range(64))
+
+
+def test_memory_tier_serves_repeat_lookups(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    writer = ResultCache(db)
+    writer.set("k", {"result": "v"})
+    writer.close()
+
+    cache = ResultCache(db)
+    assert cache.get("k") == {"result": "v"}  # read-through from SQLite
+    assert cache.get("k") == {"result": "v"}  # served from memory
+    assert cache.get("missing") is None
+
+    stats = cache.stats()
+    assert (stats["memory"]["hits"], stats["memory"]["misses"]) == (1, 2)
+    assert (stats["sqlite"]["hits"], stats["sqlite"]["misses"]) == (1, 1)
+    assert stats["memory"]["entries"] == 1
+
+
+def test_memory_tier_does_not_alias_written_values(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite")
+    value = {"result": [1]}
+    cache.set("k", value)
+    value["result"].append(2)
+    assert cache.get("k") == {"result": [1]}
+
+
+def test_lru_evicts_by_entries_and_bytes():
+    lru = LRUCache(max_entries=2, max_bytes=100)
+    lru.put("a", 1, 10)
+    lru.put("b", 2, 10)
+    lru.get("a")
+    lru.put("c", 3, 10)
+    assert lru.get("b") is None  # least recently used
+    assert lru.get("a") == 1
+
+    lru.put("big", 4, 95)
+    assert len(lru) == 1 and lru.size_bytes == 95
+    lru.put("huge", 5, 500)  # larger than the whole tier: not kept
+    assert lru.get("huge") is None
+
+
+def _age(db, key, hours):
+    conn = sqlite3.connect(db)
+    old = (datetime.utcnow() - timedelta(hours=hours)).isoformat()
+    conn.execute(
+        "UPDATE cache SET timestamp = ?, last_access = ? WHERE cache_key = ?",
+        (old, old, key),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_namespace_ttls_apply_on_read_and_gc(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db, ttl_hours={"default": 24, "action": 1})
+    cache.set("a", {"result": "action"}, namespace="action")
+    cache.set("r", {"result": "run"}, namespace="run")
+    cache.close()
+    _age(db, "a", 2)
+    _age(db, "r", 2)
+
+    cache = ResultCache(db, ttl_hours={"default": 24, "action": 1})
+    assert cache.get("a", namespace="action") is None
+    assert cache.get("r", namespace="run") == {"result": "run"}
+
+    report = cache.gc()
+    assert (report.expired, report.evicted) == (1, 0)
+    remaining = sqlite3.connect(db).execute("SELECT cache_key FROM cache").fetchall()
+    assert remaining == [("r",)]
+
+
+def test_infinite_namespace_ttl_never_expires(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db, ttl_hours={"default": 24, "action": float("inf")})
+    cache.set("a", {"result": "action"}, namespace="action")
+    cache.close()
+    _age(db, "a", 24 * 365 * 100)
+
+    cache = ResultCache(db, ttl_hours={"default": 24, "action": float("inf")})
+    assert cache.get("a", namespace="action") == {"result": "action"}
+    assert cache.gc().expired == 0
+
+
+def test_gc_evicts_least_recently_used_down_to_size_cap(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db)
+    for key in ("old", "mid", "new"):
+        cache.set(key, {"result": "x" * 100})
+    cache.flush()
+    for key, hours in (("old", 3), ("mid", 2), ("new", 1)):
+        _age(db, key, hours)
+
+    report = cache.gc(max_bytes=250)
+    assert report.evicted == 1
+    assert cache.get("old") is None
+    assert cache.get("new") == {"result": "x" * 100}
+
+
+def test_gc_lfu_keeps_frequently_read_entries(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db)
+    cache.set("popular", {"result": "x" * 100})
+    cache.set("rare", {"result": "y" * 100})
+    for _ in range(3):
+        cache.get("popular")
+    cache.flush()
+
+    cache.gc(max_bytes=150, policy="lfu")
+    assert cache.get("popular") is not None
+    assert cache.get("rare") is None
+
+
+def test_migrates_legacy_table(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "CREATE TABLE cache "
+        "(cache_key TEXT PRIMARY KEY, result_json TEXT, timestamp TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO cache VALUES (?, ?, ?)",
+        ("k", '{"result": 1}', datetime.utcnow().isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
+    cache = ResultCache(db)
+    assert cache.get("k") == {"result": 1}
+    row = sqlite3.connect(db).execute(
+        "SELECT namespace, size_bytes FROM cache WHERE cache_key = 'k'"
+    ).fetchone()
+    assert row == ("default", len('{"result": 1}'))
+
+
+def test_large_values_are_chunked_compressed_and_shared(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    observation = "".join(f"line {i}: some page content\n" for i in range(2000))
+    cache = ResultCache(db)
+    cache.set("action", {"result": observation}, namespace="action")
+    cache.set(
+        "run",
+        {"schema_choice": "s", "final_context": f"Goal: g\nObservation: {observation}"},
+        namespace="run",
+    )
+    cache.close()
+
+    conn = sqlite3.connect(db)
+    (stored,) = conn.execute(
+        "SELECT result_json FROM cache WHERE cache_key='action'"
+    ).fetchone()
+    assert len(stored) < len(observation) / 20  # only chunk references stay inline
+    (raw, packed) = conn.execute(
+        "SELECT SUM(size), SUM(length(data)) FROM blobs"
+    ).fetchone()
+    # The run's copy of the observation reuses almost all of the action's chunks.
+    assert raw < 1.2 * len(observation)
+    assert packed < raw / 4
+
+    fresh = ResultCache(db)
+    assert fresh.get("action", namespace="action") == {"result": observation}
+    assert fresh.get("run", namespace="run")["final_context"].endswith(observation)
+
+
+def test_gc_removes_unreferenced_blobs(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db)
+    cache.set("k", {"result": "x\n" * 5000})
+    cache.flush()
+    cache.set("k", {"result": "y\n" * 5000})  # the old chunks become orphans
+    cache.flush()
+
+    report = cache.gc()
+    assert report.blobs >= 1
+    assert cache.get("k") == {"result": "y\n" * 5000}
+    conn = sqlite3.connect(db)
+    orphans = conn.execute(
+        "SELECT COUNT(*) FROM blobs "
+        "WHERE digest NOT IN (SELECT digest FROM cache_blobs)"
+    ).fetchone()[0]
+    assert orphans == 0
+
+
+def test_gc_applies_namespace_caps(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db, namespace_max_bytes={"llm": 150})
+    for key in ("l1", "l2"):
+        cache.set(key, {"result": "x" * 100}, namespace="llm")
+    cache.set("r", {"result": "y" * 100}, namespace="run")
+    cache.flush()
+    _age(db, "l1", 2)
+
+    report = cache.gc()
+    assert report.evicted == 1
+    assert cache.get("l1", namespace="llm") is None
+    assert cache.get("l2", namespace="llm") is not None
+    assert cache.get("r", namespace="run") is not None
+
+
+def test_entry_ttl_overrides_namespace_ttl(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db, ttl_hours={"default": 24, "action": 1})
+    cache.set("forever", {"result": 1}, namespace="action", ttl_hours=float("inf"))
+    cache.set("short", {"result": 2}, namespace="action", ttl_hours=0.5)
+    cache.set("plain", {"result": 3}, namespace="action")
+    cache.close()
+    for key in ("forever", "short", "plain"):
+        _age(db, key, 2)
+    conn = sqlite3.connect(db)
+    conn.execute("UPDATE cache SET expires_at = ? WHERE cache_key = 'short'",
+                 ((datetime.utcnow() - timedelta(hours=1)).isoformat(),))
+    conn.commit()
+
+    cache = ResultCache(db, ttl_hours={"default": 24, "action": 1})
+    assert cache.get("forever", namespace="action") == {"result": 1}
+    assert cache.get("short", namespace="action") is None
+    assert cache.get("plain", namespace="action") is None
+
+    report = cache.gc()
+    assert report.expired == 2
+    assert cache.get("forever", namespace="action") == {"result": 1}
+
+
+def test_namespace_stats_are_persisted_across_instances(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    for _ in range(2):
+        cache = ResultCache(db, ttl_hours={"default": 24, "action": 1})
+        cache.set("k", {"result": "v"}, namespace="action")
+        cache.get("k", namespace="action")
+        cache.get("missing", namespace="action")
+        cache.close()
+    _age(db, "k", 2)
+    cache = ResultCache(db, ttl_hours={"default": 24, "action": 1})
+    assert cache.get("k", namespace="action") is None
+
+    assert cache.namespace_stats["action"].expired == 1
+    totals = cache.persisted_stats()["action"]
+    assert (totals.hits, totals.misses, totals.expired, totals.sets) == (2, 2, 1, 2)
+    assert totals.bytes_saved == 2 * len('{"result": "v"}')
+    assert totals.lookup_seconds > 0
+
+
+def test_failed_flush_keeps_access_counts(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache.sqlite")
+    cache.set("k", {"result": 1})
+    cache.flush()
+    cache.get("k")
+    cache.get("k")
+
+    def fail(fn):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    with monkeypatch.context() as m:
+        m.setattr(cache, "_transaction", fail)
+        try:
+            cache.flush()
+        except sqlite3.OperationalError:
+            pass
+    cache.flush()
+
+    assert cache.top_entries()[0]["hits"] == 2
+
+
+def test_delete_waits_for_in_flight_flush(tmp_path, monkeypatch):
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db, commit_interval=60)
+    cache.set("checkpoint", {"result": 1})
+    writing = threading.Event()
+    release = threading.Event()
+    transaction = cache._transaction
+
+    def slow(fn):
+        writing.set()
+        release.wait(5)
+        return transaction(fn)
+
+    monkeypatch.setattr(cache, "_transaction", slow)
+    flusher = threading.Thread(target=cache.flush)
+    flusher.start()
+    writing.wait(5)
+    monkeypatch.setattr(cache, "_transaction", transaction)
+    deleter = threading.Thread(target=cache.delete, args=("checkpoint",))
+    deleter.start()
+    release.set()
+    flusher.join(5)
+    deleter.join(5)
+
+    assert ResultCache(db).get("checkpoint") is None
+
+
+def test_reads_alone_do_not_trigger_a_commit_each_interval(tmp_path):
+    writer = ResultCache(tmp_path / "cache.sqlite")
+    writer.set("k", {"result": 1})
+    writer.close()
+
+    cache = ResultCache(tmp_path / "cache.sqlite", commit_interval=0.01)
+    cache.get("k")
+    cache.get("k")
+    assert cache._timer is not None and cache._timer.interval == ACCESS_FLUSH_INTERVAL
+
+    cache.set("other", {"result": 2})  # a write still commits promptly
+    assert cache._timer.interval == 0.01
@@ -13,6 +13,8 @@ from src.prp_compiler.main import app
 @pytest.fixture
 def mock_result_cache(monkeypatch):
     class DummyResultCache:
+        namespace_stats = {}
+
         def __init__(self, db_path):
             pass
 
@@ -22,6 +24,9 @@ def mock_result_cache(monkeypatch):
         def set(self, key, value):
             pass
 
+        def stats(self):
+            return {"memory": {"hits": 0, "misses": 0}}
+
     monkeypatch.setattr("src.prp_compiler.main.ResultCache", DummyResultCache)
 
 
@@ -32,9 +37,15 @@ def mock_orchestrator(monkeypatch):
             return [{"thought": {"reasoning": "r", "criticism": "", "next_action": {"tool_name": "finish", "arguments": {}}}, "observation": "o"}]
 
     class DummyOrchestrator:
-        def __init__(self, loader, knowledge_store, result_cache, debug=False):
+        def __init__(
+            self, loader, knowledge_store, result_cache, debug=False, model_name=None
+        ):
+            self.knowledge_store = knowledge_store
             self.debug = debug
 
+        def choose_strategy(self, goal, constitution):
+            return "simple"
+
         def run(self, goal, constitution, max_steps=10, strategy_name=None):
             if self.debug:
                 typer.echo("Thought: r")
@@ -76,7 +87,9 @@ def mock_synthesizer(monkeypatch):
         def __init__(self):
             pass
 
-        def synthesize(self, schema, context, constitution, max_retries=2):
+        def synthesize(
+            self, schema, context, constitution, max_retries=2, stream=False
+        ):
             return {
                 "goal": "Test goal",
                 "why": "Test why",
@@ -184,3 +197,70 @@ def test_cli_debug_flag_outputs_steps(
         assert "Thought:" in result.stdout
         assert "Action:" in result.stdout
         assert "Observation:" in result.stdout
+
+
+def test_semantic_cache_is_attached_before_strategy_selection(
+    monkeypatch,
+    mock_orchestrator,
+    mock_synthesizer,
+    mock_configure_gemini,
+    mock_knowledge_store,
+    mock_primitive_loader,
+    mock_result_cache,
+    tmp_path,
+):
+    from src.prp_compiler import main
+
+    semantic_cache = object()
+    seen = []
+    original = main.Orchestrator.choose_strategy
+
+    def choose_strategy(self, goal, constitution):
+        seen.append(getattr(self, "semantic_cache", None))
+        return original(self, goal, constitution)
+
+    monkeypatch.setattr(main.Orchestrator, "choose_strategy", choose_strategy)
+    monkeypatch.setattr(
+        main, "build_semantic_cache", lambda cache, store: semantic_cache
+    )
+    monkeypatch.setenv("PRP_SEMANTIC_CACHE_THRESHOLD", "0.9")
+    primitives_dir = tmp_path / "agent_primitives"
+    primitives_dir.mkdir()
+    result = CliRunner().invoke(
+        app,
+        [
+            "compile",
+            "test-goal",
+            "--out",
+            str(tmp_path / "test.json"),
+            "--primitives-path",
+            str(primitives_dir),
+            "--vector-db-path",
+            str(tmp_path / "db"),
+            "--no-daemon",
+        ],
+    )
+
+    assert result.exit_code == 0, result.stdout
+    assert seen == [semantic_cache]
+
+
+def test_cache_stats_reports_namespaces(tmp_path):
+    from src.prp_compiler.cache import ResultCache
+
+    db = tmp_path / "cache.sqlite"
+    cache = ResultCache(db)
+    cache.set("k", {"result": "v"}, namespace="action")
+    cache.get("k", namespace="action")
+    cache.get("missing", namespace="run")
+    cache.close()
+
+    result = CliRunner().invoke(
+        app, ["cache", "stats", "--cache-db-path", str(db), "--json"]
+    )
+    assert result.exit_code == 0, result.output
+    report = json.loads(result.output)
+    action = report["namespaces"]["action"]
+    assert (action["entries"], action["hits"], action["sets"]) == (1, 1, 1)
+    assert report["namespaces"]["run"]["misses"] == 1
+    assert report["top_entries"][0]["cache_key"] == "k"
@@ -2,7 +2,7 @@ from unittest.mock import patch
 
 import pytest
 
-from src.prp_compiler.config import configure_gemini
+from src.prp_compiler.config import configure_gemini, get_cache_ttls
 
 
 @patch("src.prp_compiler.config.os.getenv")
@@ -40,3 +40,11 @@ def test_configure_gemini_failure_key_not_found(mock_load_dotenv, mock_getenv):
         configure_gemini()
     mock_load_dotenv.assert_called_once()
     mock_getenv.assert_called_once_with("GEMINI_API_KEY")
+
+
+def test_get_cache_ttls_accepts_inf_and_rejects_nan(monkeypatch):
+    monkeypatch.setenv("PRP_CACHE_TTL_ACTION", "inf")
+    assert get_cache_ttls()["action"] == float("inf")
+    monkeypatch.setenv("PRP_CACHE_TTL_ACTION", "nan")
+    with pytest.raises(ValueError, match="PRP_CACHE_TTL_ACTION"):
+        get_cache_ttls()
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from src.prp_compiler.daemon import ping, request_compile, run_daemon
+
+
+class FakeRuntime:
+    settings = {"primitives_path": "/p", "vector_backend": "chroma"}
+
+    async def acompile(self, goal, out_path, strategy_name=None):
+        if goal == "bad":
+            raise ValueError("no schema")
+        out_path.write_text(json.dumps({"goal": goal, "strategy": strategy_name}))
+        return out_path
+
+
+def test_request_compile_without_daemon_returns_none(tmp_path):
+    assert request_compile(tmp_path / "missing.sock", "g", tmp_path / "o.json") is None
+    assert ping(tmp_path / "missing.sock") is None
+
+
+def test_request_compile_falls_back_on_an_inaccessible_socket(tmp_path, monkeypatch):
+    def connect(self, address):
+        raise PermissionError(13, "Permission denied", address)
+
+    monkeypatch.setattr(socket.socket, "connect", connect)
+    assert request_compile(tmp_path / "d.sock", "g", tmp_path / "o.json") is None
+
+
+def test_daemon_round_trip(tmp_path):
+    socket_path = tmp_path / "d.sock"
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(run_daemon(FakeRuntime(), socket_path, stop))
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if socket_path.exists():
+            break
+        time.sleep(0.01)
+
+    assert ping(socket_path) == os.getpid()
+    out = tmp_path / "out.json"
+    reply = request_compile(socket_path, "goal", out, strategy="simple")
+    assert reply == {"ok": True, "output": str(out.resolve())}
+    assert json.loads(out.read_text()) == {"goal": "goal", "strategy": "simple"}
+
+    mismatch = {"primitives_path": "/other", "vector_backend": "chroma"}
+    assert request_compile(socket_path, "goal", out, config=mismatch) is None
+
+    reply = request_compile(socket_path, "bad", tmp_path / "bad.json")
+    assert reply["ok"] is False
+    assert "no schema" in reply["error"]
+
+    loop.call_soon_threadsafe(stop.set)
+    thread.join(timeout=5)
+    assert not socket_path.exists()
+
+
+def test_unresponsive_daemon_times_out(tmp_path):
+    socket_path = tmp_path / "hung.sock"
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    server.listen(1)  # accepts the connection but never answers
+    try:
+        with pytest.raises(TimeoutError):
+            request_compile(socket_path, "goal", tmp_path / "o.json", timeout=0.1)
+    finally:
+        server.close()
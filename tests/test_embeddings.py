@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+
+from src.prp_compiler.embeddings import BatchedEmbeddings, CachedEmbeddings
+from src.prp_compiler.resilience import RetryPolicy
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+class RecordingEmbeddings:
+    def __init__(self, fail_first=0):
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_first = fail_first
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            failing = self.fail_first > 0
+            self.fail_first -= 1
+        try:
+            if failing:
+                raise Unavailable("try again")
+            return [[float(len(text))] for text in texts]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def no_sleep_policy(attempts=3):
+    return RetryPolicy(max_attempts=attempts, sleep=lambda _: None)
+
+
+def test_batches_preserve_order_and_respect_concurrency():
+    model = RecordingEmbeddings()
+    seen = []
+    embedder = BatchedEmbeddings(
+        model, batch_size=3, max_concurrency=2, retry_policy=no_sleep_policy(),
+        progress=lambda done, total, elapsed: seen.append((done, total)),
+    )
+    texts = ["x" * n for n in range(1, 11)]
+
+    vectors = embedder.embed_documents(texts)
+
+    assert vectors == [[float(n)] for n in range(1, 11)]
+    assert sorted(len(batch) for batch in model.batches) == [1, 3, 3, 3]
+    assert model.max_in_flight <= 2
+    assert seen[-1] == (10, 10)
+    assert embedder.last_count == 10
+
+
+def test_failed_batch_is_retried():
+    model = RecordingEmbeddings(fail_first=1)
+    embedder = BatchedEmbeddings(
+        model, batch_size=5, retry_policy=no_sleep_policy(), progress=None
+    )
+    assert embedder.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+    assert len(model.batches) == 2
+
+
+def test_batch_failing_every_attempt_raises():
+    model = RecordingEmbeddings(fail_first=10)
+    embedder = BatchedEmbeddings(
+        model, batch_size=5, retry_policy=no_sleep_policy(2), progress=None
+    )
+    with pytest.raises(Unavailable):
+        embedder.embed_documents(["a"])
+
+
+def test_cached_embeddings_skip_known_texts(tmp_path):
+    from src.prp_compiler.embeddings import CachedEmbeddings
+
+    class Model:
+        def __init__(self):
+            self.documents = []
+            self.queries = []
+
+        def embed_documents(self, texts):
+            self.documents.extend(texts)
+            return [[float(len(t)), 1.0] for t in texts]
+
+        def embed_query(self, text):
+            self.queries.append(text)
+            return [0.5, float(len(text))]
+
+    model = Model()
+    cached = CachedEmbeddings(model, tmp_path / "emb.sqlite", "model-a")
+    assert cached.embed_documents(["a", "bb", "a"]) == [
+        [1.0, 1.0],
+        [2.0, 1.0],
+        [1.0, 1.0],
+    ]
+    assert model.documents == ["a", "bb"]
+
+    # A new process (or a rebuilt vector store) reuses the file.
+    reopened = CachedEmbeddings(model, tmp_path / "emb.sqlite", "model-a")
+    assert reopened.embed_documents(["bb", "ccc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert model.documents == ["a", "bb", "ccc"]
+    assert (reopened.hits, reopened.misses) == (1, 1)
+
+    # Queries are cached separately from documents, and per model.
+    assert reopened.embed_query("a") == [0.5, 1.0]
+    assert reopened.embed_query("a") == [0.5, 1.0]
+    CachedEmbeddings(model, tmp_path / "emb.sqlite", "model-b").embed_query("a")
+    assert model.queries == ["a", "a"]
+
+
+def test_cached_embeddings_store_a_batch_in_one_transaction(tmp_path):
+    class Model:
+        def embed_documents(self, texts):
+            return [[float(len(t))] for t in texts]
+
+    cached = CachedEmbeddings(Model(), tmp_path / "emb.sqlite", "model-a")
+    statements = []
+    cached._connection().set_trace_callback(statements.append)
+    cached.embed_documents(["a", "bb", "ccc"])
+    assert sum(s.startswith("BEGIN") for s in statements) == 1
+    assert sum(s == "COMMIT" for s in statements) == 1
+
+
+def test_close_releases_the_batch_threads_connections(tmp_path):
+    class Model:
+        def embed_documents(self, texts):
+            return [[float(len(t))] for t in texts]
+
+    cached = CachedEmbeddings(Model(), tmp_path / "emb.sqlite", "model-a")
+    embedder = BatchedEmbeddings(cached, batch_size=1, max_concurrency=4, progress=None)
+    embedder.embed_documents(["a", "bb", "ccc", "dddd"])
+    assert len(cached._connections) > 1
+
+    embedder.close()
+    assert cached._connections == []
+    assert cached.embed_documents(["a"]) == [[1.0]]
@@ -122,7 +122,7 @@ def test_golden_prp(
     # This avoids rigid side_effect lists that break if the call order changes.
     call_count = {"planner": 0}
 
-    def mock_llm_router(prompt, tools=None):
+    def mock_llm_router(prompt, tools=None, **kwargs):
         """Route LLM calls based on the tools provided and call order."""
         # Planner's first call is to select a strategy.
         if "select_strategy" in str(tools):
@@ -162,6 +162,9 @@ def test_golden_prp(
             cache_db_path=Path(tmp_path / "cache.sqlite"),
             strategy=None,
             plan_file=None,
+            debug=False,
+            stream=False,
+            use_daemon=False,
         )
     except SystemExit as e:
         # Capture the exit code if Typer raises it
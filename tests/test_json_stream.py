@@ -0,0 +1,34 @@
+import pytest
+
+from src.prp_compiler.json_stream import IncrementalJSONObjectParser, PropertyValidator
+
+
+def test_parser_emits_members_as_they_close():
+    parser = IncrementalJSONObjectParser()
+    assert parser.feed('```json\n{"goal": "a, {b}"') == []
+    assert parser.feed(', "what": {"x": [1, ') == [("goal", "a, {b}")]
+    assert parser.feed('2]}, "why": "\\"q\\""}\n```') == [
+        ("what", {"x": [1, 2]}),
+        ("why", '"q"'),
+    ]
+    assert parser.complete
+    assert parser.feed('{"late": 1}') == []
+
+
+def test_parser_rejects_malformed_member():
+    parser = IncrementalJSONObjectParser()
+    with pytest.raises(ValueError):
+        parser.feed('{"goal": nope, ')
+
+
+def test_property_validator_checks_subschemas():
+    validator = PropertyValidator(
+        {
+            "type": "object",
+            "properties": {"goal": {"type": "string"}},
+            "additionalProperties": False,
+        }
+    )
+    assert validator.check("goal", "ok") is None
+    assert "goal" in validator.check("goal", 3)
+    assert "not allowed" in validator.check("extra", 1)
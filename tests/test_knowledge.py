@@ -1,6 +1,9 @@
+import zlib
 from unittest.mock import MagicMock, patch
 
-from src.prp_compiler.knowledge import ChromaKnowledgeStore
+import numpy as np
+
+from src.prp_compiler.knowledge import ChromaKnowledgeStore, NumpyKnowledgeStore
 
 
 def create_temp_knowledge_primitive(tmp_path):
@@ -48,3 +51,110 @@ def test_knowledge_store_build_and_retrieve(tmp_path):
         results = store.retrieve("python", k=2)
         assert results == ["ChunkA", "ChunkB"]
         mock_embeddings.assert_called()
+
+
+class FakeDocument:
+    def __init__(self, page_content, metadata):
+        self.page_content = page_content
+        self.metadata = metadata
+
+
+class FakeSplitter:
+    """Splits at level-2 headers, like MarkdownHeaderTextSplitter."""
+
+    def __init__(self, headers_to_split_on):
+        pass
+
+    def split_text(self, text):
+        sections = [s for s in text.split("\n## ") if s.strip()]
+        return [
+            FakeDocument(section, {"Header 2": section.splitlines()[0]})
+            for section in sections
+        ]
+
+
+def test_rebuild_embeds_only_changed_chunks(tmp_path, monkeypatch):
+    primitive = create_temp_knowledge_primitive(tmp_path)
+    chunks_dir = tmp_path / "knowledge" / "python_core" / "2.3.1" / "chunks"
+    md_file = chunks_dir / "python_basics.md"
+    persist_dir = tmp_path / "chroma_db"
+    monkeypatch.setenv("USE_MOCK_EMBEDDINGS", "true")
+    with (
+        patch("src.prp_compiler.knowledge.FakeEmbeddings"),
+        patch("src.prp_compiler.knowledge.MarkdownHeaderTextSplitter", FakeSplitter),
+        patch("src.prp_compiler.knowledge.Chroma") as mock_chroma,
+    ):
+        store = ChromaKnowledgeStore(persist_dir)
+        first = store.build([primitive])
+        assert (first.added, first.deleted, first.unchanged) == (2, 0, 0)
+        first_ids = mock_chroma.from_documents.call_args.kwargs["ids"]
+
+        md_file.write_text(md_file.read_text().replace("assignment.", "binding."))
+        second = store.build([primitive])
+        assert (second.added, second.deleted, second.unchanged) == (1, 1, 1)
+        db = mock_chroma.return_value
+        (added_docs,), added_kwargs = db.add_documents.call_args
+        assert len(added_docs) == 1 and "binding" in added_docs[0].page_content
+        assert added_kwargs["ids"][0] not in first_ids
+
+        third = store.build([primitive])
+        assert (third.added, third.deleted, third.unchanged) == (0, 0, 2)
+        assert db.add_documents.call_count == 1
+
+
+class WordEmbeddings:
+    """Deterministic bag-of-words embeddings."""
+
+    def __init__(self, size):
+        self.size = size
+        self.embedded = []
+
+    def _embed(self, text):
+        vector = [0.0] * self.size
+        for word in text.lower().split():
+            vector[zlib.crc32(word.strip(".#").encode()) % self.size] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def test_numpy_store_builds_incrementally_and_retrieves(tmp_path, monkeypatch):
+    primitive = create_temp_knowledge_primitive(tmp_path)
+    chunks_dir = tmp_path / "knowledge" / "python_core" / "2.3.1" / "chunks"
+    md_file = chunks_dir / "python_basics.md"
+    persist_dir = tmp_path / "numpy_db"
+    monkeypatch.setenv("USE_MOCK_EMBEDDINGS", "true")
+    monkeypatch.setenv("PRP_RETRIEVAL_MODE", "vector")
+    with (
+        patch("src.prp_compiler.knowledge.FakeEmbeddings", WordEmbeddings),
+        patch("src.prp_compiler.knowledge.MarkdownHeaderTextSplitter", FakeSplitter),
+    ):
+        store = NumpyKnowledgeStore(persist_dir)
+        first = store.build([primitive])
+        assert (first.added, first.deleted, first.unchanged) == (2, 0, 0)
+
+        md_file.write_text(md_file.read_text().replace("assignment.", "binding."))
+        second = store.build([primitive])
+        assert (second.added, second.deleted, second.unchanged) == (1, 1, 1)
+        assert len(store.embeddings.embedded) == 3
+
+        fresh = NumpyKnowledgeStore(persist_dir)
+        fresh.load()
+        assert isinstance(fresh.vectors, np.memmap)
+        assert fresh.vectors.dtype == np.float32
+        assert np.allclose(np.linalg.norm(fresh.vectors, axis=1), 1.0)
+        assert fresh.lexical is not None and len(fresh.lexical.documents) == 2
+        results = fresh.retrieve("details about binding", k=5)
+        assert len(results) == 2
+        assert "binding" in results[0]
+
+        # A forked worker keeps the mapped vectors and gets its own client.
+        vectors, embeddings = fresh.vectors, fresh.embeddings
+        fresh.reopen()
+        assert fresh.vectors is vectors and fresh.embeddings is not embeddings
+        assert "binding" in fresh.retrieve("details about binding", k=1)[0]
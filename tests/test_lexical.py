@@ -0,0 +1,79 @@
+from unittest.mock import MagicMock
+
+from src.prp_compiler.lexical import (
+    BM25Index,
+    hybrid_retrieve,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+DOCS = [
+    "Use pytest fixtures to share setup between tests.",
+    "Install packages with uv pip install, or uv add for project dependencies.",
+    "Type hints document function signatures.",
+    "Fixtures in other frameworks are called setup hooks.",
+]
+
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("How to use pytest fixtures?") == ["pytest", "fixture"]
+    assert tokenize("class __init__ uv") == ["class", "__init__", "uv"]
+
+
+def test_bm25_ranks_exact_terms_and_round_trips(tmp_path):
+    index = BM25Index.from_documents(DOCS)
+    hits = index.search("pytest fixtures", k=3)
+    assert [doc for doc, _ in hits] == [0, 3]
+    assert index.is_strong_match("pytest fixtures", hits)
+    assert not index.is_strong_match("fixtures", index.search("fixtures"))
+
+    index.save(tmp_path / "bm25.json")
+    loaded = BM25Index.load(tmp_path / "bm25.json")
+    assert loaded.search("uv pip", k=1) == index.search("uv pip", k=1)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "d"]])
+    assert fused[0] == "b"
+    assert set(fused) == {"a", "b", "c", "d"}
+
+
+def test_hybrid_retrieve_modes():
+    index = BM25Index.from_documents(DOCS)
+    vector_search = MagicMock(return_value=[DOCS[2], DOCS[3]])
+
+    # A strong keyword match never reaches the embedding model.
+    assert hybrid_retrieve("uv pip", 1, index, vector_search) == [DOCS[1]]
+    vector_search.assert_not_called()
+
+    fused = hybrid_retrieve("fixtures", 2, index, vector_search)
+    vector_search.assert_called_once_with("fixtures", 8)
+    assert fused == [DOCS[3], DOCS[0]]
+
+    assert hybrid_retrieve("fixtures", 2, None, vector_search) == [DOCS[2], DOCS[3]]
+    assert hybrid_retrieve("fixtures", 1, index, vector_search, mode="lexical") == [
+        DOCS[0]
+    ]
+
+
+def test_near_tie_on_keywords_reaches_vector_ranking():
+    docs = ["pytest fixture scopes", "pytest fixture teardown"]
+    index = BM25Index.from_documents(docs)
+    hits = index.search("pytest fixtures", k=2)
+    assert hits[0][1] < 1.5 * hits[1][1]
+    assert not index.is_strong_match("pytest fixtures", hits)
+
+    vector_search = MagicMock(return_value=[docs[1]])
+    assert hybrid_retrieve("pytest fixtures", 1, index, vector_search) == [docs[1]]
+    vector_search.assert_called_once()
+
+
+def test_too_few_keyword_hits_are_filled_from_the_vector_ranking():
+    index = BM25Index.from_documents(DOCS)
+    vector_search = MagicMock(return_value=[DOCS[2], DOCS[3], DOCS[0]])
+
+    # Only one chunk mentions uv: a strong match, but not enough for k=3.
+    retrieved = hybrid_retrieve("uv", 3, index, vector_search)
+    vector_search.assert_called_once_with("uv", 12)
+    assert retrieved[0] == DOCS[1]
+    assert len(retrieved) == 3
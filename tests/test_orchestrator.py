@@ -1,5 +1,6 @@
+import asyncio
 from pathlib import Path
-from unittest.mock import ANY, MagicMock, patch
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
 import subprocess
 import pytest
@@ -117,7 +118,7 @@ def test_run_captures_finish_args_and_assembles_context(
             )
         )
     ]
-    mock_planner_instance.plan_step.side_effect = steps
+    mock_planner_instance.plan_steps.side_effect = [[step] for step in steps]
 
     # The loader is still needed for schemas and patterns
     mock_loader = MagicMock()
@@ -151,7 +152,7 @@ def test_run_captures_finish_args_and_assembles_context(
     mock_planner_instance.select_strategy.assert_called_once_with(
         "test goal", "test constitution"
     )
-    mock_planner_instance.plan_step.assert_any_call(
+    mock_planner_instance.plan_steps.assert_any_call(
         "test goal",
         "test constitution",
         strategy_content,
@@ -199,19 +200,49 @@ def test_resolve_dynamic_content_file_not_found(mock_knowledge_store):
     assert "[ERROR]" in result
 
 
-def test_cache_key_includes_content_hash(mock_knowledge_store):
-    loader1 = MagicMock()
-    loader1.primitives = {"actions": {"a": {"version": "1.0.0", "content_hash": "abc"}}}
-    orchestrator1 = Orchestrator(loader1, mock_knowledge_store)
+def test_cached_run_is_invalidated_only_by_its_dependencies(
+    tmp_path, mock_knowledge_store
+):
+    from src.prp_compiler.cache import ResultCache
+
+    def manifest(content_hash):
+        return {"version": "1.0.0", "content_hash": content_hash}
 
-    loader2 = MagicMock()
-    loader2.primitives = {"actions": {"a": {"version": "1.0.0", "content_hash": "def"}}}
-    orchestrator2 = Orchestrator(loader2, mock_knowledge_store)
+    loader = MagicMock()
+    loader.primitives = {
+        "strategies": {"simple": manifest("s1")},
+        "actions": {"a": manifest("a1"), "b": manifest("b1")},
+        "schemas": {"s": manifest("x1")},
+        "patterns": {"p": manifest("p1"), "q": manifest("q1")},
+    }
+    cache = ResultCache(tmp_path / "c.sqlite")
+    orchestrator = Orchestrator(loader, mock_knowledge_store, cache)
+    context = MagicMock()
+    context.history = [
+        ReActStep(
+            thought=Thought(
+                reasoning="",
+                criticism="",
+                next_action=Action(tool_name="a", arguments={}),
+            )
+        )
+    ]
+    context.get_history_str.return_value = "history"
+    loader.get_primitive_content.return_value = "pattern"
+    key = orchestrator._compute_cache_key("goal")
+    orchestrator._finalize_run(
+        key, {"schema_choice": "s", "pattern_references": ["p"]}, context,
+        "goal", "simple",
+    )
+    assert orchestrator._get_cached_run(key) is not None
 
-    key1 = orchestrator1._compute_cache_key("goal")
-    key2 = orchestrator2._compute_cache_key("goal")
+    # Unused action and pattern: still a hit.
+    loader.primitives["actions"]["b"] = manifest("b2")
+    loader.primitives["patterns"]["q"] = manifest("q2")
+    assert orchestrator._get_cached_run(key) is not None
 
-    assert key1 != key2
+    loader.primitives["patterns"]["p"] = manifest("p2")
+    assert orchestrator._get_cached_run(key) is None
 
 
 def test_execute_action_disallows_unlisted_shell_command(tmp_path, mock_knowledge_store):
@@ -233,3 +264,192 @@ def test_execute_action_disallows_unlisted_shell_command(tmp_path, mock_knowledg
     action = Action(tool_name="bad", arguments={})
     with pytest.raises(PermissionError):
         orchestrator.execute_action(action)
+
+
+@patch("src.prp_compiler.orchestrator.PlannerAgent")
+def test_arun_awaits_planner_and_actions(MockPlannerAgent, mock_knowledge_store):
+    """arun should drive the same loop as run using the async planner API."""
+    mock_planner_instance = MockPlannerAgent.return_value
+    mock_planner_instance.aselect_strategy = AsyncMock(return_value="simple")
+    mock_planner_instance.aplan_steps = AsyncMock(
+        side_effect=[
+            [
+                ReActStep(
+                    thought=Thought(
+                        reasoning="look", criticism="none",
+                        next_action=Action(
+                            tool_name="retrieve_knowledge", arguments={"query": "q"}
+                        ),
+                    )
+                )
+            ],
+            [
+                ReActStep(
+                    thought=Thought(
+                        reasoning="done", criticism="none",
+                        next_action=Action(
+                            tool_name="finish",
+                            arguments={"schema_choice": "s", "pattern_references": []},
+                        ),
+                    )
+                )
+            ],
+        ]
+    )
+    mock_loader = MagicMock()
+    mock_loader.get_primitive_content.return_value = "strategy"
+    mock_knowledge_store.retrieve.return_value = ["ChunkA"]
+
+    orchestrator = Orchestrator(mock_loader, mock_knowledge_store)
+    schema_choice, final_context, _ = asyncio.run(orchestrator.arun("goal", ""))
+
+    assert schema_choice == "s"
+    assert "Observation: ChunkA" in final_context
+    mock_planner_instance.aselect_strategy.assert_awaited_once_with("goal", "")
+    assert mock_planner_instance.aplan_steps.await_count == 2
+    mock_planner_instance.plan_steps.assert_not_called()
+
+
+@patch("src.prp_compiler.orchestrator.PlannerAgent")
+def test_run_executes_parallel_calls_before_next_step(
+    MockPlannerAgent, mock_knowledge_store
+):
+    """Every tool call of one planner turn is observed before the next turn."""
+    def step(tool_name, arguments):
+        return ReActStep(
+            thought=Thought(
+                reasoning=tool_name, criticism="",
+                next_action=Action(tool_name=tool_name, arguments=arguments),
+            )
+        )
+
+    mock_planner_instance = MockPlannerAgent.return_value
+    mock_planner_instance.plan_steps.side_effect = [
+        [
+            step("retrieve_knowledge", {"query": "a"}),
+            step("retrieve_knowledge", {"query": "b"}),
+            step("read_file", {"file_path": "x"}),
+        ],
+        [step("finish", {"schema_choice": "s", "pattern_references": []})],
+    ]
+    mock_loader = MagicMock()
+    mock_loader.get_primitive_content.return_value = "strategy"
+
+    orchestrator = Orchestrator(mock_loader, mock_knowledge_store)
+    orchestrator.execute_action = MagicMock(
+        side_effect=lambda action: f"obs-{action.arguments}"
+    )
+
+    schema_choice, final_context, history = orchestrator.run(
+        "goal", "", strategy_name="simple"
+    )
+
+    assert schema_choice == "s"
+    assert orchestrator.execute_action.call_count == 3
+    assert mock_planner_instance.plan_steps.call_count == 2
+    second_turn_history = mock_planner_instance.plan_steps.call_args_list[1][0][3]
+    assert sum(line.startswith("Observation:") for line in second_turn_history) == 3
+    assert [s["observation"] for s in history.get_structured_history()[:3]] == [
+        "obs-{'query': 'a'}",
+        "obs-{'query': 'b'}",
+        "obs-{'file_path': 'x'}",
+    ]
+
+
+@patch("src.prp_compiler.orchestrator.PlannerAgent")
+def test_run_resumes_from_checkpoint(MockPlannerAgent, mock_knowledge_store, tmp_path):
+    """A failed run's completed steps are replayed instead of re-planned."""
+    from src.prp_compiler.cache import ResultCache
+
+    def step(tool_name, arguments):
+        return ReActStep(
+            thought=Thought(
+                reasoning=tool_name, criticism="",
+                next_action=Action(tool_name=tool_name, arguments=arguments),
+            )
+        )
+
+    mock_planner_instance = MockPlannerAgent.return_value
+    mock_planner_instance.select_strategy.return_value = "simple"
+    mock_planner_instance.plan_steps.side_effect = [
+        [step("retrieve_knowledge", {"query": "a"})],
+        RuntimeError("worker died"),
+        [step("finish", {"schema_choice": "s", "pattern_references": []})],
+    ]
+    mock_loader = MagicMock()
+    mock_loader.primitives = {}
+    mock_loader.get_primitive_content.return_value = "strategy"
+    cache = ResultCache(tmp_path / "cache.sqlite")
+
+    orchestrator = Orchestrator(mock_loader, mock_knowledge_store, cache)
+    orchestrator.execute_action = MagicMock(return_value="obs-a")
+    schema_choice, error = orchestrator.run("goal", "")
+    assert schema_choice == "" and "worker died" in error
+
+    resumed = Orchestrator(
+        mock_loader, mock_knowledge_store, ResultCache(cache.db_path)
+    )
+    resumed.execute_action = MagicMock()
+    schema_choice, final_context, history = resumed.run("goal", "")
+
+    assert schema_choice == "s"
+    assert "Observation: obs-a" in final_context
+    mock_planner_instance.select_strategy.assert_called_once()
+    resumed.execute_action.assert_not_called()
+    replayed = mock_planner_instance.plan_steps.call_args_list[2][0][3]
+    assert "Observation: obs-a" in replayed
+    assert resumed._load_checkpoint(resumed._compute_cache_key("goal")) is None
+
+
+def test_action_cache_policy_from_manifest(tmp_path, mock_knowledge_store):
+    from src.prp_compiler.cache import ResultCache
+
+    loader = MagicMock()
+    loader.primitives = {
+        "actions": {
+            "read_file": {"cache": {"key_on": ["file_mtime"]}},
+            "fetch": {"cache": {"enabled": False}},
+            "pure": {"cache": {"ttl": "forever"}},
+        }
+    }
+    cache = ResultCache(tmp_path / "c.sqlite")
+    orchestrator = Orchestrator(loader, mock_knowledge_store, cache)
+    target = tmp_path / "notes.txt"
+    target.write_text("v1")
+    read = Action(tool_name="read_file", arguments={"file_path": str(target)})
+
+    policy = orchestrator._action_cache_policy(read)
+    key = orchestrator._compute_action_cache_key(read, policy)
+    assert key == orchestrator._compute_action_cache_key(read, policy)
+    target.write_text("version 2")
+    assert key != orchestrator._compute_action_cache_key(read, policy)
+
+    fetch = Action(tool_name="fetch", arguments={})
+    assert not orchestrator._action_cache_policy(fetch).enabled
+    pure = Action(tool_name="pure", arguments={})
+    assert orchestrator._action_cache_policy(pure).ttl_hours == float("inf")
+
+
+@patch("src.prp_compiler.orchestrator.PlannerAgent")
+def test_aexecute_actions_respects_max_parallel_actions(MockPlannerAgent):
+    orchestrator = Orchestrator(
+        MagicMock(primitives={}), MagicMock(), max_parallel_actions=2
+    )
+    running = 0
+    peak = 0
+
+    async def fake_action(action):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return action.tool_name
+
+    orchestrator.aexecute_action = fake_action
+    actions = [Action(tool_name=f"a{i}", arguments={}) for i in range(6)]
+
+    results = asyncio.run(orchestrator.aexecute_actions(actions))
+
+    assert results == [f"a{i}" for i in range(6)]
+    assert peak == 2
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.prp_compiler.config import get_rate_limits
+from src.prp_compiler.embeddings import RateLimitedEmbeddings
+from src.prp_compiler.ratelimit import (
+    AdaptiveConcurrencyLimiter,
+    ModelRateLimiter,
+    TokenBucket,
+    is_throttle_error,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ThrottledError(Exception):
+    code = 429
+
+
+def test_token_bucket_reports_wait_once_exhausted():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, clock=clock)  # one token per second
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)
+
+    clock.now += 10
+    assert bucket.reserve(1) == 0.0  # the debt has been repaid by the refill
+
+
+def test_token_bucket_adjust_refunds_overestimate():
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=600, clock=clock)
+    bucket.reserve(600)
+    bucket.adjust(-300)
+    assert bucket.reserve(300) == 0.0
+
+
+def test_aimd_backs_off_on_throttle_and_ramps_up():
+    limiter = AdaptiveConcurrencyLimiter(initial=8, maximum=16)
+
+    limiter.acquire()
+    limiter.release(throttled=True, succeeded=False)
+    assert limiter.limit == 4
+
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release()
+    assert 4 < limiter.limit <= 16
+
+
+def test_aimd_caps_in_flight_requests():
+    limiter = AdaptiveConcurrencyLimiter(initial=2)
+    peak = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal peak
+        limiter.acquire()
+        with lock:
+            peak = max(peak, limiter.in_flight)
+        time.sleep(0.01)
+        limiter.release(succeeded=False)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak == 2
+
+
+def test_model_rate_limiter_backs_off_on_429():
+    limiter = ModelRateLimiter(initial_concurrency=4)
+    with pytest.raises(ThrottledError):
+        with limiter.limit(10):
+            raise ThrottledError("slow down")
+    assert limiter.concurrency.limit == 2
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_model_rate_limiter_async_releases_slot():
+    limiter = ModelRateLimiter(rpm=600, initial_concurrency=1)
+
+    async def call(i):
+        async with limiter.alimit(1):
+            await asyncio.sleep(0)
+            return i
+
+    async def main():
+        return await asyncio.gather(*(call(i) for i in range(3)))
+
+    assert asyncio.run(main()) == [0, 1, 2]
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_is_throttle_error():
+    assert is_throttle_error(ThrottledError())
+    assert is_throttle_error(Exception("503 Service Unavailable"))
+    assert not is_throttle_error(ValueError("bad request"))
+
+
+def test_get_rate_limits_reads_role_env(monkeypatch):
+    monkeypatch.setenv("PRP_PLANNER_RPM", "15")
+    monkeypatch.setenv("PRP_PLANNER_MAX_CONCURRENCY", "2")
+    limits = get_rate_limits("planner")
+    assert limits["rpm"] == 15
+    assert limits["tpm"] is None
+    assert limits["max_concurrency"] == 2
+    assert limits["initial_concurrency"] == 2
+
+
+def test_rate_limited_embeddings_delegates():
+    inner = MagicMock()
+    inner.embed_documents.return_value = [[0.1], [0.2]]
+    inner.embed_query.return_value = [0.3]
+    embeddings = RateLimitedEmbeddings(inner, ModelRateLimiter())
+
+    assert embeddings.embed_documents(["a", "b"]) == [[0.1], [0.2]]
+    assert embeddings.embed_query("q") == [0.3]
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from src.prp_compiler.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    is_transient_error,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_retry_policy_delays_are_capped_and_jittered():
+    policy = RetryPolicy(max_attempts=6, base_delay=1.0, max_delay=4.0)
+    delays = list(policy.delays())
+    assert len(delays) == 5
+    caps = [1.0, 2.0, 4.0, 4.0, 4.0]
+    assert all(0 <= d <= cap for d, cap in zip(delays, caps))
+
+
+def test_is_transient_error():
+    class ServerError(Exception):
+        code = 500
+
+    class NotFound(Exception):
+        code = 404
+
+    assert is_transient_error(TimeoutError())
+    assert is_transient_error(asyncio.TimeoutError())
+    assert is_transient_error(ConnectionResetError())
+    assert is_transient_error(ServerError())
+    assert not is_transient_error(NotFound())
+    assert not is_transient_error(CircuitOpenError("open"))
+
+
+def test_circuit_breaker_half_open_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 10
+    assert breaker.state == "half-open"
+    breaker.before_call()  # the single trial call
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # others still fail fast during the trial
+
+    breaker.record_failure()  # the trial failed: open for another cool-down
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 20
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
@@ -0,0 +1,98 @@
+from unittest.mock import MagicMock, patch
+
+from src.prp_compiler.cache import ResultCache
+from src.prp_compiler.orchestrator import RUN_CACHE_VERSION, Orchestrator
+from src.prp_compiler.semantic_cache import SemanticCache, SemanticMatch
+
+VOCABULARY = [
+    "add", "jwt", "auth", "authentication", "api", "our", "to", "the", "logging", "cli"
+]
+
+
+class BagOfWordsEmbeddings:
+    def embed_query(self, text):
+        words = text.lower().split()
+        return [float(words.count(term)) for term in VOCABULARY]
+
+
+def test_lookup_matches_near_duplicates_above_threshold(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite")
+    semantic = SemanticCache(cache, BagOfWordsEmbeddings(), threshold=0.7)
+    semantic.add("Add JWT auth to the API", "fp", "key-1")
+
+    match = semantic.lookup("add jwt auth to our API", "fp")
+    assert match.cache_key == "key-1" and 0.7 <= match.similarity < 1
+    assert semantic.lookup("add logging to the cli", "fp") is None
+    assert semantic.lookup("add jwt auth to our API", "other-fp") is None
+
+
+@patch("src.prp_compiler.orchestrator.PlannerAgent")
+def test_run_serves_similar_goal_and_records_hit(MockPlannerAgent, tmp_path):
+    loader = MagicMock()
+    loader.primitives = {}
+    cache = ResultCache(tmp_path / "cache.sqlite")
+    semantic = SemanticCache(cache, BagOfWordsEmbeddings(), threshold=0.7)
+    orchestrator = Orchestrator(loader, MagicMock(), cache, semantic_cache=semantic)
+
+    first_key = orchestrator._compute_cache_key("Add JWT auth to the API")
+    run = {"schema_choice": "s", "final_context": "ctx"}
+    cache.set(first_key, run, namespace="run")
+    semantic.add("Add JWT auth to the API", RUN_CACHE_VERSION, first_key)
+
+    schema_choice, final_context, _ = orchestrator.run(
+        "add jwt auth to our API", "", strategy_name="simple"
+    )
+
+    assert (schema_choice, final_context) == ("s", "ctx")
+    MockPlannerAgent.return_value.plan_steps.assert_not_called()
+    (hit,) = semantic.hits()
+    assert hit["matched_goal"] == "Add JWT auth to the API"
+    assert hit["similarity"] >= 0.7
+
+
+def test_expired_match_is_forgotten(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite")
+    semantic = SemanticCache(cache, BagOfWordsEmbeddings(), threshold=0.7)
+    orchestrator = Orchestrator(
+        MagicMock(primitives={}), MagicMock(), cache, planner=MagicMock(),
+        semantic_cache=semantic,
+    )
+    semantic.add("Add JWT auth to the API", RUN_CACHE_VERSION, "gone")
+
+    assert orchestrator._get_semantic_run("add jwt auth to our API") is None
+    assert semantic.lookup("add jwt auth to our API", RUN_CACHE_VERSION) is None
+
+
+def test_sees_goals_added_by_other_processes(tmp_path):
+    db = tmp_path / "cache.sqlite"
+    reader = SemanticCache(ResultCache(db), BagOfWordsEmbeddings(), threshold=0.7)
+    assert reader.lookup("add jwt auth to our API", "fp") is None  # index loaded, empty
+
+    writer = SemanticCache(ResultCache(db), BagOfWordsEmbeddings(), threshold=0.7)
+    writer.add("Add JWT auth to the API", "fp", "key-1")
+    assert reader.lookup("add jwt auth to our API", "fp").cache_key == "key-1"
+
+
+def test_goals_are_deleted_with_their_run_but_hits_are_kept(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite")
+    semantic = SemanticCache(cache, BagOfWordsEmbeddings(), threshold=0.7)
+    cache.set("key-1", {"schema_choice": "s", "final_context": "ctx"}, namespace="run")
+    cache.flush()
+    semantic.add("Add JWT auth to the API", "fp", "key-1")
+    match = semantic.lookup("add jwt auth to our API", "fp")
+    semantic.record_hit("add jwt auth to our API", match)
+
+    cache.delete("key-1")
+    assert semantic.lookup("add jwt auth to our API", "fp") is None
+    assert [hit["cache_key"] for hit in semantic.hits()] == ["key-1"]
+
+
+def test_hits_are_pruned_after_the_retention_period(tmp_path):
+    cache = ResultCache(tmp_path / "cache.sqlite")
+    semantic = SemanticCache(cache, BagOfWordsEmbeddings(), hit_retention_days=1)
+    match = SemanticMatch("key-1", "Add JWT auth to the API", 0.9)
+    semantic.record_hit("old goal", match)
+    cache.execute("UPDATE semantic_hits SET timestamp = '2000-01-01T00:00:00'")
+
+    semantic.record_hit("new goal", match)
+    assert [hit["goal"] for hit in semantic.hits()] == ["new goal"]
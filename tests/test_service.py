@@ -0,0 +1,148 @@
+import asyncio
+import json
+from pathlib import Path
+
+from src.prp_compiler.service import (
+    SingleFlight,
+    ThroughputStats,
+    consume_jobs,
+    serve_processes,
+)
+
+
+class FakeRuntime:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.reopened = False
+
+    def reopen_stores(self):
+        self.reopened = True
+
+    def close(self):
+        pass
+
+    async def acompile(self, goal, out_path, strategy_name=None):
+        if goal == self.fail_on:
+            raise RuntimeError("boom")
+        out_path.write_text(json.dumps({"goal": goal}))
+        return out_path
+
+
+def test_consume_jobs_counts_successes_and_failures(tmp_path):
+    async def main():
+        queue = asyncio.Queue()
+        for goal in ("a", "bad", "b"):
+            await queue.put((goal, tmp_path / f"{goal}.json"))
+        await queue.put(None)
+        stats = ThroughputStats(label="test")
+        await consume_jobs(FakeRuntime(fail_on="bad"), "w", queue.get, stats)
+        return stats
+
+    stats = asyncio.run(main())
+    assert (stats.completed, stats.failed) == (2, 1)
+    assert (tmp_path / "a.json").exists()
+    assert not (tmp_path / "bad.json").exists()
+
+
+def test_serve_processes_reports_per_process_stats(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    goals = iter(["goal one", "goal two", "goal three", ""])
+
+    started = []
+
+    results = serve_processes(
+        FakeRuntime(), 2, 1, lambda: next(goals), after_fork=lambda: started.append(1)
+    )
+
+    assert started == [1]
+
+    assert len(results) == 2
+    assert len({stats.pid for stats in results}) == 2
+    assert sum(stats.completed for stats in results) == 3
+    assert Path("goal_one.json").exists()
+    assert "jobs/min" in results[0].summary()
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"prp": True}
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(3)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert flight.coalesced == 2
+    assert results == [{"prp": True}] * 3
+    assert not flight.is_inflight("k")
+
+
+def test_single_flight_propagates_errors_to_waiters():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(
+            flight.do("k", work), flight.do("k", work), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_reopen_stores_gives_the_child_its_own_handles(tmp_path, monkeypatch):
+    from src.prp_compiler import service
+    from src.prp_compiler.cache import ResultCache
+
+    class Store:
+        reopened = False
+
+        def reopen(self):
+            self.reopened = True
+
+    monkeypatch.setattr(service, "PlannerAgent", lambda *a, **k: object())
+    monkeypatch.setattr(service, "SynthesizerAgent", lambda: object())
+    cache = ResultCache(tmp_path / "cache.sqlite")
+    store = Store()
+    runtime = service.CompilerRuntime(object(), store, cache)
+
+    runtime.reopen_stores()
+
+    # The loaded store is kept; only its clients are replaced.
+    assert runtime.knowledge_store is store and store.reopened
+    assert runtime.result_cache is not cache
+    assert runtime.result_cache.db_path == cache.db_path
+
+
+def test_compile_claims_coalesce_across_processes(tmp_path):
+    from src.prp_compiler.cache import ResultCache
+    from src.prp_compiler.service import CompileClaims
+
+    db = tmp_path / "cache.sqlite"
+    leader = CompileClaims(ResultCache(db), poll_interval=0.01)
+    follower = CompileClaims(ResultCache(db), poll_interval=0.01)
+    calls = []
+
+    async def work(name):
+        calls.append(name)
+        await asyncio.sleep(0.05)
+        return {"prp": name}
+
+    async def main():
+        first = asyncio.create_task(leader.do("k", lambda: work("leader")))
+        while not calls:
+            await asyncio.sleep(0.001)
+        second = await follower.do("k", lambda: work("follower"))
+        return await first, second
+
+    assert asyncio.run(main()) == ({"prp": "leader"}, {"prp": "leader"})
+    assert calls == ["leader"] and follower.coalesced == 1
+    assert not leader.is_claimed("k")
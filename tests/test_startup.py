@@ -0,0 +1,29 @@
+import time
+
+import pytest
+
+from src.prp_compiler.startup import StagedStartup
+
+
+def test_staged_startup_overlaps_background_stages():
+    with StagedStartup() as startup:
+        store = startup.submit("store", lambda: time.sleep(0.2) or "store")
+        strategy = startup.run("strategy", lambda: time.sleep(0.2) or "simple")
+        assert store.result() == "store"
+        assert strategy == "simple"
+
+    assert set(startup.timings) == {"store", "strategy"}
+    assert startup.wall_time < startup.serial_time
+    assert startup.saved > 0.1
+    assert "saved" in startup.summary()
+
+
+def test_staged_startup_propagates_stage_errors():
+    def fail():
+        raise ValueError("bad primitives")
+
+    with StagedStartup() as startup:
+        future = startup.submit("primitives", fail)
+        with pytest.raises(ValueError, match="bad primitives"):
+            future.result()
+    assert "primitives" in startup.timings